@@ -2,24 +2,33 @@ import torch
 import numpy as np
 import json
 import time
+import logging
 from diabetes_project.data.patient_simulator import PatientDataSimulator
 from diabetes_project.data.loader import RealWorldDataLoader
 from diabetes_project.federated.client import FederatedClient
 from diabetes_project.blockchain.ledger import BlockchainLedger
 from diabetes_project.models.propagation_graph import CausalOrganGraph
+from diabetes_project.models.numpy_backend import BACKEND, NumpyCausalGraph
 from diabetes_project.rag.rag_engine import MultimodalRAG
 
+logger = logging.getLogger(__name__)
+
+DATA_FILE = "diabetes_project/data/samples/patient_data.csv"
+
 class DiagnosticCouncil:
-    def __init__(self, patient_id, use_real_data=True):
-        print(f"Initializing Diagnostic Council for Patient {patient_id}...")
+    def __init__(self, patient_id, use_real_data=True, population=None):
+        """
+        population: optional sharding options for RealWorldDataLoader
+                    (e.g. {"rows_per_patient": 24} or {"id_column": "patient_id"})
+                    so each patient_id gets its own slice of the dataset.
+        """
+        logger.debug("initializing council patient=%s real_data=%s", patient_id, use_real_data)
         
         if use_real_data:
-            print("[INFO] Mode: Real-World Data (Hybrid Injection)")
-            self.loader = RealWorldDataLoader(patient_id, csv_path="diabetes_project/data/samples/patient_data.csv")
+            self.loader = RealWorldDataLoader(patient_id, csv_path=DATA_FILE, **(population or {}))
             self.data = self.loader.load_data()
             self.sim = self.loader.simulator 
         else:
-            print("[INFO] Mode: Pure Simulation")
             self.sim = PatientDataSimulator(patient_id)
             data = self.sim.generate_healthy_baseline()
             self.data = self.sim.inject_drift(data, start_day=150, organ='kidney', intensity=0.3)
@@ -30,9 +39,17 @@ class DiagnosticCouncil:
         self.ledger = BlockchainLedger()
         
         self.graph_model = CausalOrganGraph()
+        # Inference path per DIABETES_INFERENCE_BACKEND (the graph is never retrained)
+        self.graph_inference = NumpyCausalGraph.from_torch(self.graph_model) if BACKEND == "numpy" else None
         
         self.rag = MultimodalRAG()
 
+    def propagate(self, drifts):
+        """Constrained organ risks ({organ: risk}) for a 5-organ drift vector."""
+        if self.graph_inference is not None:
+            return self.graph_inference(drifts)
+        return self.graph_model(torch.tensor(drifts, dtype=torch.float32))
+
     def run_simulation(self, days_to_run=200):
         print("\n--- Starting Monitoring Cycle ---")
         alerts_triggered = False
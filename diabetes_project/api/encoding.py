@@ -0,0 +1,192 @@
+import json
+import math
+import time
+import numpy as np
+from fastapi import Response
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+ARROW = "application/vnd.apache.arrow.stream"
+
+# Accepted spellings per encoding
+MEDIA_TYPES = {
+    JSON: JSON,
+    "application/x-msgpack": MSGPACK,
+    MSGPACK: MSGPACK,
+    ARROW: ARROW,
+    "application/vnd.apache.arrow.file": ARROW
+}
+
+def _available(media_type):
+    try:
+        if media_type == MSGPACK:
+            import msgpack  # noqa: F401
+        elif media_type == ARROW:
+            import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def negotiate(accept):
+    """
+    Picks the response encoding from an Accept header. Binary encodings are only
+    chosen when explicitly requested and their library is installed; JSON otherwise.
+    """
+    if not accept:
+        return JSON
+    candidates = []
+    for position, part in enumerate(accept.split(",")):
+        fields = [f.strip() for f in part.split(";")]
+        q = 1.0
+        for param in fields[1:]:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        media_type = MEDIA_TYPES.get(fields[0].lower())
+        if media_type and q > 0:
+            candidates.append((-q, position, media_type))
+    for _, _, media_type in sorted(candidates):
+        if _available(media_type):
+            return media_type
+    return JSON
+
+def _json_default(obj):
+    # NumPy scalars (np.mean, np.polyfit, ...) and arrays
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def _finite(obj):
+    # NaN / Infinity aren't JSON: they become null
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {key: _finite(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_finite(value) for value in obj]
+    if isinstance(obj, (np.generic, np.ndarray)):
+        return _finite(_json_default(obj))
+    return obj
+
+def dumps_json(payload):
+    """Compact, strictly valid JSON: non-finite floats are sent as null."""
+    try:
+        content = json.dumps(payload, default=_json_default, separators=(",", ":"), allow_nan=False)
+    except ValueError:
+        # Rare: only payloads holding a NaN / Infinity pay for the rewrite
+        content = json.dumps(_finite(payload), default=_json_default, separators=(",", ":"), allow_nan=False)
+    return content.encode()
+
+def typed_columns(history):
+    """
+    Per-day history (array of dicts) -> flat typed columns: float32 for measurements,
+    int32 for day, bool for flags, str for hashes. Nested dicts become 'group.key'.
+    """
+    if not history:
+        return {}
+    columns = {}
+    for key, value in history[0].items():
+        if isinstance(value, dict):
+            for sub in value:
+                columns[f"{key}.{sub}"] = np.fromiter((h[key][sub] for h in history), dtype=np.float32, count=len(history))
+        elif key == "day":
+            columns[key] = np.fromiter((h[key] for h in history), dtype=np.int32, count=len(history))
+        elif isinstance(value, (bool, np.bool_)):
+            columns[key] = np.fromiter((h[key] for h in history), dtype=bool, count=len(history))
+        elif isinstance(value, (int, float, np.number)):
+            columns[key] = np.fromiter((h[key] for h in history), dtype=np.float32, count=len(history))
+        else:
+            columns[key] = [h[key] for h in history]
+    return columns
+
+def _msgpack_column(values):
+    if isinstance(values, np.ndarray):
+        # Raw little-endian buffer: clients view it as a typed array without parsing
+        return {"dtype": values.dtype.str, "data": values.astype(values.dtype.newbyteorder("<"), copy=False).tobytes()}
+    return values
+
+def _split_history(payload):
+    """
+    Separates the per-day history from an analysis payload, either at the top
+    level or under "result" (job responses). Returns (history, rest, path).
+    """
+    if isinstance(payload.get("result"), dict) and "history" in payload["result"]:
+        result = {key: value for key, value in payload["result"].items() if key != "history"}
+        rest = dict(payload, result=result)
+        return payload["result"]["history"], rest, ("result",)
+    rest = {key: value for key, value in payload.items() if key != "history"}
+    return payload.get("history") or [], rest, ()
+
+def encode_msgpack(payload):
+    import msgpack
+    history, body, path = _split_history(payload)
+    target = body[path[0]] if path else body
+    target["history"] = {name: _msgpack_column(values) for name, values in typed_columns(history).items()}
+    return msgpack.packb(body, default=_json_default, use_bin_type=True)
+
+def encode_arrow(payload):
+    """History as an Arrow IPC stream (one record batch); everything else as JSON schema metadata."""
+    import pyarrow as pa
+    history, rest, _ = _split_history(payload)
+    columns = typed_columns(history)
+    table = pa.table({name: pa.array(values) for name, values in columns.items()})
+    table = table.replace_schema_metadata({"payload": dumps_json(rest)})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+def encode_response(payload, media_type=JSON):
+    """
+    Encodes an analysis payload as the (negotiated) media type.
+    JSON keeps the payload's own layout; binary encodings always send the
+    per-day history (a list of day dicts) as typed columns.
+    """
+    if media_type == MSGPACK:
+        content = encode_msgpack(payload)
+    elif media_type == ARROW:
+        content = encode_arrow(payload)
+    else:
+        content = dumps_json(payload)
+    return Response(content=content, media_type=media_type, headers={"Vary": "Accept"})
+
+def benchmark_encoding(n_days=3650, repeats=5):
+    """Encode time and payload size of each encoding vs FastAPI's default jsonable_encoder path."""
+    from fastapi.encoders import jsonable_encoder
+
+    rng = np.random.default_rng(0)
+    history = [{
+        "day": day,
+        "vitals": {name: float(v) for name, v in zip(
+            ["glucose", "gfr", "retina", "hrv", "spo2", "skin_temp", "eda", "activity"], rng.random(8) * 100)},
+        "drift_error": float(rng.random()),
+        "predictions": {organ: float(v) for organ, v in zip(["glucose", "kidney", "retina", "heart", "nerve"], rng.random(5))},
+        "is_anomaly": bool(rng.random() > 0.9),
+        "block_hash": "0"
+    } for day in range(n_days)]
+    payload = {"summary": {"total_days": n_days, "mse_drift": np.float64(0.1), "risk_score": np.mean(rng.random(10))},
+               "history": history, "ledger": []}
+
+    paths = {"fastapi_default": lambda: json.dumps(jsonable_encoder(payload), separators=(",", ":")).encode(),
+             "json": lambda: dumps_json(payload)}
+    if _available(MSGPACK):
+        paths["msgpack"] = lambda: encode_msgpack(payload)
+    if _available(ARROW):
+        paths["arrow"] = lambda: encode_arrow(payload)
+
+    results = {}
+    for name, encode in paths.items():
+        encode() # Warm-up (lazy imports)
+        start = time.perf_counter()
+        for _ in range(repeats):
+            content = encode()
+        results[name] = {"encode_ms": (time.perf_counter() - start) * 1000 / repeats, "bytes": len(content)}
+    return results
+
+if __name__ == "__main__":
+    for name, row in benchmark_encoding().items():
+        print(f"{name:>16}: {row['encode_ms']:8.2f} ms  {row['bytes'] / 1024:9.1f} KiB")
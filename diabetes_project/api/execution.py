@@ -0,0 +1,108 @@
+import asyncio
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+class SessionExecutor:
+    """
+    Execution model for the API: CPU-heavy work (training, scoring, mining, RAG)
+    never runs on the event loop.
+
+    - Work is dispatched to a sized thread pool. Torch kernels, hashing and NumPy
+      release the GIL for most of their time; sessions hold live models, so a
+      process pool would have to re-train them.
+    - At most `max_concurrency` jobs run at once; the rest wait in a FIFO queue.
+    - Per-patient asyncio locks serialize work on one session (an upload can't
+      swap council.data under an in-flight analysis), while other patients proceed.
+    """
+    def __init__(self, max_workers=4, max_concurrency=None):
+        self.max_workers = max_workers
+        self.max_concurrency = max_concurrency or max_workers
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="cpu")
+        self._semaphore = None
+        # Held only while someone uses or waits on them: idle patients' locks are dropped
+        self._locks = weakref.WeakValueDictionary()
+        self._stats_lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.total_wait_s = 0.0
+        self.max_wait_s = 0.0
+
+    def _slots(self):
+        # Created lazily so it binds to the serving event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    def lock(self, patient_id):
+        """The patient's lock. Keep a reference while using it; it is freed once nobody does."""
+        lock = self._locks.get(patient_id)
+        if lock is None:
+            lock = self._locks[patient_id] = asyncio.Lock()
+        return lock
+
+    async def run(self, fn, *args, patient_id=None, on_start=None):
+        """
+        Runs fn(*args) on the pool and awaits the result. With patient_id, the
+        patient's lock is held for the duration. on_start is called (on the loop)
+        once the work leaves the queue.
+        """
+        enqueued = time.perf_counter()
+        self._count(queued=1)
+        lock = self.lock(patient_id) if patient_id is not None else None
+        started = False
+        try:
+            if lock is not None:
+                await lock.acquire()
+            try:
+                async with self._slots():
+                    self._count(queued=-1, running=1, wait=time.perf_counter() - enqueued)
+                    started = True
+                    if on_start is not None:
+                        on_start()
+                    loop = asyncio.get_running_loop()
+                    result = await loop.run_in_executor(self.executor, partial(fn, *args))
+            finally:
+                if lock is not None:
+                    lock.release()
+        except BaseException:
+            self._count(failed=1)
+            raise
+        finally:
+            if started:
+                self._count(running=-1)
+            else:
+                self._count(queued=-1)
+        self._count(completed=1)
+        return result
+
+    def _count(self, queued=0, running=0, completed=0, failed=0, wait=None):
+        with self._stats_lock:
+            self.queued += queued
+            self.running += running
+            self.completed += completed
+            self.failed += failed
+            if wait is not None:
+                self.total_wait_s += wait
+                self.max_wait_s = max(self.max_wait_s, wait)
+
+    def stats(self):
+        with self._stats_lock:
+            started = self.completed + self.running
+            return {
+                "max_workers": self.max_workers,
+                "max_concurrency": self.max_concurrency,
+                "queued": self.queued,
+                "running": self.running,
+                "completed": self.completed,
+                "failed": self.failed,
+                "avg_queue_wait_s": self.total_wait_s / started if started else 0.0,
+                "max_queue_wait_s": self.max_wait_s
+            }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,111 @@
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+class Job:
+    """A long-running analysis tracked by the JobManager."""
+    def __init__(self, patient_id, cache_key):
+        self.id = uuid.uuid4().hex
+        self.patient_id = patient_id
+        self.cache_key = cache_key
+        self.status = "queued"  # queued -> running -> done | failed
+        self.progress = {"days_processed": 0, "total_days": 0, "blocks_mined": 0}
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    def update_progress(self, **progress):
+        self.progress.update(progress)
+
+    def to_dict(self, include_result=True):
+        job = {
+            "job_id": self.id,
+            "patient_id": self.patient_id,
+            "status": self.status,
+            "progress": dict(self.progress),
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at
+        }
+        if self.error:
+            job["error"] = self.error
+        if include_result and self.status == "done":
+            job["result"] = self.result
+        return job
+
+class JobManager:
+    """
+    Runs analyses in the background so HTTP handlers return immediately.
+    Work goes through a SessionExecutor: it runs off the event loop, under the
+    patient's session lock, within the executor's concurrency limit.
+
+    Jobs are keyed by (patient_id, data_version): submitting the same key again
+    returns the queued/running job or the cached finished result instead of
+    recomputing it. Uploading new data bumps the version and so misses the cache.
+    """
+    def __init__(self, executor, max_jobs=1000):
+        self.executor = executor
+        self.max_jobs = max_jobs
+        self.jobs = OrderedDict()
+        self.by_key = {}
+        self._lock = threading.Lock()
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def submit(self, patient_id, cache_key, fn):
+        """
+        Schedules fn(job) (from inside the event loop) and returns (job, reused).
+        fn runs on a worker thread and receives the Job so it can report progress.
+        """
+        with self._lock:
+            existing = self.jobs.get(self.by_key.get(cache_key))
+            if existing is not None and existing.status != "failed":
+                return existing, True
+
+            job = Job(patient_id, cache_key)
+            self.jobs[job.id] = job
+            self.by_key[cache_key] = job.id
+            self._evict()
+
+        # Keep a reference to the task so it isn't garbage-collected mid-run
+        job.task = asyncio.get_running_loop().create_task(self._run(job, fn))
+        return job, False
+
+    async def _run(self, job, fn):
+        def started():
+            job.status = "running"
+            job.started_at = time.time()
+        try:
+            job.result = await self.executor.run(fn, job, patient_id=job.patient_id, on_start=started)
+            job.status = "done"
+        except Exception as e:
+            job.error = str(e)
+            job.status = "failed"
+            logger.warning("job failed job_id=%s patient=%s error=%s", job.id, job.patient_id, e)
+        finally:
+            job.finished_at = time.time()
+
+    def stats(self):
+        counts = {"queued": 0, "running": 0, "done": 0, "failed": 0}
+        for job in list(self.jobs.values()):
+            counts[job.status] += 1
+        return counts
+
+    def _evict(self):
+        # Drop the oldest finished jobs once over capacity; never drop live ones
+        for job_id in list(self.jobs):
+            if len(self.jobs) <= self.max_jobs:
+                break
+            job = self.jobs[job_id]
+            if job.status in ("done", "failed"):
+                del self.jobs[job_id]
+                if self.by_key.get(job.cache_key) == job_id:
+                    del self.by_key[job.cache_key]
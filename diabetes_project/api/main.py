@@ -1,19 +1,47 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, UploadFile, File
+import time
+# Cold-start clock: module import, warm-up and the first response are timed from here
+IMPORT_STARTED = time.perf_counter()
+
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, UploadFile, File, HTTPException, Request
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 import json
 import asyncio
-import torch
-import pandas as pd
 import numpy as np
 import io
-from typing import List
+import os
+import threading
+from contextlib import asynccontextmanager
+from typing import List, Optional
 
 # ... imports ...
-from diabetes_project.agents.council import DiagnosticCouncil
+# torch, pandas and the council graph are imported on first use (or by the
+# warm-up), so importing this module stays cheap for worker restarts.
 from diabetes_project.api.models import ExplanationRequest
+from diabetes_project.api.jobs import JobManager
+from diabetes_project.api.warmup import StartupTimer, parse_targets
+from diabetes_project.api.execution import SessionExecutor
+from diabetes_project.api.series import shape_history
+from diabetes_project.api.encoding import JSON, negotiate, encode_response
+from diabetes_project.api import profiling
 from diabetes_project.blockchain.zk_proof import ZKProver
+from diabetes_project.rag.knowledge_store import KNOWLEDGE_DIR
+from diabetes_project.rag.retrieval_cache import shared_cache_stats
+from diabetes_project.telemetry import REGISTRY, configure_logging
+
+# Level from DIABETES_LOG_LEVEL; per-call records below it cost nothing
+logger = configure_logging().getChild("api")
+
+startup = StartupTimer(IMPORT_STARTED)
+
+@asynccontextmanager
+async def lifespan(app):
+    # The server only reports ready (and takes traffic) once warm-up is done
+    await cpu.run(startup.run, parse_targets(), WARMUP_STEPS)
+    startup.mark_ready()
+    yield
 
-app = FastAPI(title="Neuro-Causal Diabetic API")
+app = FastAPI(title="Neuro-Causal Diabetic API", lifespan=lifespan)
 
 # ... middleware ...
 app.add_middleware(
@@ -44,237 +72,260 @@ manager = ConnectionManager()
 # Global Session Store
 active_sessions = {}
 
+# Population mode: serve each patient_id its own slice of the dataset
+# (DIABETES_PATIENT_ID_COLUMN, or DIABETES_ROWS_PER_PATIENT for ID-less files like Pima)
+POPULATION = None
+if os.environ.get("DIABETES_PATIENT_ID_COLUMN"):
+    POPULATION = {"id_column": os.environ["DIABETES_PATIENT_ID_COLUMN"]}
+elif os.environ.get("DIABETES_ROWS_PER_PATIENT"):
+    POPULATION = {"rows_per_patient": int(os.environ["DIABETES_ROWS_PER_PATIENT"])}
+
+# Sessions are created from worker threads too; one creation lock per patient,
+# dropped once the session exists (later calls never take it)
+_session_locks = {}
+_session_locks_guard = threading.Lock()
+
+def get_session(patient_id):
+    if patient_id not in active_sessions:
+        from diabetes_project.agents.council import DiagnosticCouncil
+        with _session_locks_guard:
+            lock = _session_locks.setdefault(patient_id, threading.Lock())
+        with lock:
+            if patient_id not in active_sessions:
+                active_sessions[patient_id] = {
+                    "council": DiagnosticCouncil(patient_id, use_real_data=True, population=POPULATION),
+                    "zk_prover": ZKProver(patient_id),
+                    "data_version": 0 # Bumped on every upload; part of the analysis cache key
+                }
+        with _session_locks_guard:
+            if _session_locks.get(patient_id) is lock:
+                del _session_locks[patient_id]
+    return active_sessions[patient_id]
+
+# Shared council for /api/explain requests without a session (built once)
+_generic_council = None
+_generic_council_lock = threading.Lock()
+
+def get_generic_council():
+    global _generic_council
+    if _generic_council is None:
+        from diabetes_project.agents.council import DiagnosticCouncil
+        with _generic_council_lock:
+            if _generic_council is None:
+                _generic_council = DiagnosticCouncil("Generic", use_real_data=True, population=POPULATION)
+    return _generic_council
+
+def warm_dataset():
+    from diabetes_project.agents.council import DATA_FILE
+    from diabetes_project.data.loader import RealWorldDataLoader
+    if not os.path.exists(DATA_FILE):
+        return
+    loader = RealWorldDataLoader(None, DATA_FILE, **(POPULATION or {}))
+    # Parses into the process-wide dataset cache (and shards it in population mode)
+    if loader.population_mode:
+        loader.population
+    else:
+        loader._load_cached(DATA_FILE)
+
+def warm_models():
+    # Trains the generic detector, opens the RAG store, and runs each model once
+    # so torch's first-call dispatch costs are paid before traffic arrives
+    council = get_generic_council()
+    drift = np.full(5, 0.1, dtype=np.float32)
+    council.client.detect_drift(council.client.train_data[0])
+    council.graph_model.forward_batch(drift[None, :])
+    council.rag.retrieve_context(drift)
+
+def warm_ledger():
+    get_generic_council().ledger.verify_chain()
+
+WARMUP_STEPS = {"dataset": warm_dataset, "models": warm_models, "ledger": warm_ledger}
+
+# CPU work runs off the event loop: DIABETES_CPU_WORKERS threads, at most
+# DIABETES_MAX_CONCURRENCY tasks at once (the rest queue), one at a time per patient
+cpu = SessionExecutor(
+    max_workers=int(os.environ.get("DIABETES_CPU_WORKERS", min(4, os.cpu_count() or 1))),
+    max_concurrency=int(os.environ["DIABETES_MAX_CONCURRENCY"]) if os.environ.get("DIABETES_MAX_CONCURRENCY") else None
+)
+
+# Background analysis jobs
+jobs = JobManager(cpu)
+
+# Opt-in request profiles (DIABETES_PROFILING=1), retrievable by request ID
+profiles = profiling.ProfileStore()
+
+# Scrape-time gauges for /metrics
+REGISTRY.register_collector("executor", cpu.stats)
+REGISTRY.register_collector("jobs", jobs.stats)
+REGISTRY.register_collector("retrieval_cache", lambda: shared_cache_stats(KNOWLEDGE_DIR))
+REGISTRY.register_collector("startup", startup.stats)
+REQUEST_LATENCY = REGISTRY.histogram("http_request", "HTTP request latency by route")
+
+@app.middleware("http")
+async def time_requests(request: Request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+    startup.mark_response()
+    # Route template, not the raw path, so patient IDs don't explode label cardinality
+    route = request.scope.get("route")
+    REQUEST_LATENCY.observe(time.perf_counter() - start, method=request.method,
+                            route=getattr(route, "path", "unmatched"), status=response.status_code)
+    return response
+
+def parse_upload(content):
+    import pandas as pd
+    df = pd.read_csv(io.BytesIO(content))
+    
+    # Ensure minimal required columns exist
+    required_cols = ['gfr', 'retina_thickness', 'hrv', 'glucose', 'spo2', 'skin_temp', 'eda', 'activity'] 
+    for col in required_cols:
+        if col not in df.columns:
+             # Auto-fill missing cols with defaults if possible, or error
+             df[col] = 0.0 # simplified
+    return df
+
+def start_profile(request, endpoint, patient_id, profile):
+    """A ProfileSession if profiling is enabled and this request asked for it, else None."""
+    mode = profiling.requested_mode(profile, request.headers.get("x-profile"))
+    if mode is None:
+        return None
+    try:
+        return profiles.start(mode, endpoint, patient_id, profile_id=request.headers.get("x-request-id"))
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
 @app.post("/api/upload_data/{patient_id}")
-async def upload_data(patient_id: str, file: UploadFile = File(...)):
-    print(f"Receiving data for {patient_id}")
+async def upload_data(request: Request, patient_id: str, file: UploadFile = File(...), profile: Optional[str] = None):
+    logger.debug("upload received patient=%s", patient_id)
+    prof = start_profile(request, "upload_data", patient_id, profile)
+    parse, create = (parse_upload, get_session) if prof is None else (prof.wrap(parse_upload), prof.wrap(get_session))
     try:
         content = await file.read()
-        df = pd.read_csv(io.BytesIO(content))
-        
-        # Ensure minimal required columns exist
-        required_cols = ['gfr', 'retina_thickness', 'hrv', 'glucose', 'spo2', 'skin_temp', 'eda', 'activity'] 
-        for col in required_cols:
-            if col not in df.columns:
-                 # Auto-fill missing cols with defaults if possible, or error
-                 df[col] = 0.0 # simplified
+        df = await cpu.run(parse, content)
         
-        # Initialize session if not exists
-        if patient_id not in active_sessions:
-            active_sessions[patient_id] = {
-                "council": DiagnosticCouncil(patient_id, use_real_data=True),
-                "zk_prover": ZKProver(patient_id)
-            }
-        
-        # Overwrite the simulation data with uploaded data
-        active_sessions[patient_id]["council"].data = df
-        print(f"Data updated for {patient_id}: {len(df)} rows")
+        # Hold the patient's lock so no analysis sees the swap mid-run
+        async with cpu.lock(patient_id):
+            # Initialize session if not exists
+            session = await cpu.run(create, patient_id)
+            
+            # Overwrite the simulation data with uploaded data
+            session["council"].data = df
+            session["data_version"] += 1
+        logger.info("data updated patient=%s rows=%d", patient_id, len(df))
         
-        return {"status": "success", "rows": len(df), "message": "Simulation updated with custom data."}
+        response = {"status": "success", "rows": len(df), "message": "Simulation updated with custom data."}
     except Exception as e:
-        print(f"Upload failed: {e}")
-        return {"status": "error", "message": str(e)}
+        logger.warning("upload failed patient=%s error=%s", patient_id, e)
+        response = {"status": "error", "message": str(e)}
+    if prof is not None:
+        prof.finish(error=response.get("message") if response["status"] == "error" else None)
+        response["profile_id"] = prof.profile_id
+    return response
 
-@app.post("/api/analyze/{patient_id}")
-async def analyze_patient(patient_id: str):
-    print(f"Starting Full Analysis for {patient_id}")
-    
-    # Initialize/Get Session
-    if patient_id not in active_sessions:
-         active_sessions[patient_id] = {
-            "council": DiagnosticCouncil(patient_id, use_real_data=True),
-            "zk_prover": ZKProver(patient_id)
-        }
-    
-    session = active_sessions[patient_id]
-    council = session["council"]
-    zk_prover = session["zk_prover"]
-    
-    # Run Audit on ALL Data
-    history = []
-    total_drift_error = 0
-    anomalies = 0
-    
-    # Reset ledger for clean analysis? Or keep appending?
-    # For now, let's analyze the current dataset state
-    data_len = len(council.data)
-    
-    for day in range(data_len):
-        # 1. Get Data Logic
-        row = council.data.iloc[day]
-        row_values = [
-            float(row.get('glucose', 100)),
-            float(row.get('gfr', 90)),
-            float(row.get('retina_thickness', 250)),
-            float(row.get('hrv', 50))
-        ]
-        
-        # New Sensors
-        spo2 = float(row.get('spo2', 98))
-        skin_temp = float(row.get('skin_temp', 33.5))
-        eda = float(row.get('eda', 5.0))
-        activity = float(row.get('activity', 5000))
-
-        # 2. Monitor (Drift Detection - Patent 2)
-        # Use explicit row values to ensure alignment
-        is_drift, drift_error = council.client.detect_drift(row_values)
-        if is_drift: anomalies += 1
-        
-        # 3. Propagation (Causal Graph - Patent 1)
-        glucose_norm = 1.0 - (row_values[0] / 200.0)
-        
-        current_drifts = torch.tensor([
-            glucose_norm, 
-            1.0 if is_drift else 0.1, 
-            0.2, 0.1, 0.1
-        ])
-        predictions = council.graph_model(current_drifts)
-        
-        # 4. Ledger 
-        zk_proof = None
-        block_hash = "0"
-        if is_drift:
-             status_payload = {"day": day, "error": drift_error, "msg": "Drift Detected"}
-             zk_proof = zk_prover.generate_proof({"gfr_decay": 0.5}, f"hash_{day}_{patient_id}")
-             block = council.ledger.add_block(status_payload, proof=zk_proof)
-             block_hash = block.hash
-        
-        # Collect Data Point
-        history.append({
-            "day": day,
-            "vitals": {
-                "glucose": row_values[0],
-                "gfr": row_values[1],
-                "retina": row_values[2],
-                "hrv": row_values[3],
-                "spo2": spo2,
-                "skin_temp": skin_temp,
-                "eda": eda,
-                "activity": activity
-            },
-            "drift_error": drift_error,
-            "predictions": predictions,
-            "is_anomaly": is_drift,
-            "block_hash": block_hash
-        })
-        
-        total_drift_error += drift_error
+@app.post("/api/analyze/{patient_id}", status_code=202)
+async def analyze_patient(request: Request, patient_id: str, profile: Optional[str] = None):
+    """
+    Queues a full analysis and returns its job ID immediately.
+    Poll GET /api/jobs/{job_id} for progress and the result. Results are
+    reused until new data is uploaded for the patient.
+    With profiling enabled, ?profile=sampling|cprofile (or an X-Profile header)
+    always runs a fresh analysis under the profiler; fetch the report from
+    GET /api/profiles/{profile_id} once the job is done.
+    """
+    session = active_sessions.get(patient_id)
+    data_version = session["data_version"] if session else 0
+    prof = start_profile(request, "analyze", patient_id, profile)
 
-    # Calculate Aggregate Metrics
-    mse = total_drift_error / data_len if data_len > 0 else 0
-    risk_score = (anomalies / data_len) * 100 if data_len > 0 else 0
-    
-    # Advanced Metrics Calculation
-    
-    # 1. Structural Entropy
-    avg_risks = {
-        'kidney': np.mean([h['predictions']['kidney'] for h in history]) if history else 0,
-        'retina': np.mean([h['predictions']['retina'] for h in history]) if history else 0,
-        'heart': np.mean([h['predictions']['heart'] for h in history]) if history else 0,
-        'nerve': np.mean([h['predictions']['nerve'] for h in history]) if history else 0
-    }
-    total_risk_mass = sum(avg_risks.values())
-    if total_risk_mass > 0:
-        probs = [r / total_risk_mass for r in avg_risks.values()]
-        structural_entropy = -sum([p * np.log2(p) if p > 0 else 0 for p in probs])
-    else:
-        structural_entropy = 0
+    def work(job):
+        from diabetes_project.api.analysis import run_analysis
+        logger.info("analysis started patient=%s job_id=%s", patient_id, job.id)
+        # Initialize/Get Session
+        session = get_session(patient_id)
+        return run_analysis(patient_id, session["council"], session["zk_prover"], progress=job.update_progress)
 
-    # 2. Causal Impact Score
-    causal_impact_score = (avg_risks['kidney'] * 0.4 + avg_risks['retina'] * 0.3 + avg_risks['heart'] * 0.2 + avg_risks['nerve'] * 0.1) * 100
+    if prof is None:
+        job, cached = jobs.submit(patient_id, (patient_id, data_version), work)
+        return {"job_id": job.id, "status": job.status, "cached": cached}
 
-    # 3. Network Stability
-    avg_prop_risk = sum([sum(h['predictions'].values())/5 for h in history]) / data_len if data_len else 0
-    network_stability = max(0, 100 * (1 - avg_prop_risk))
-    
-    # 4. Cascading Risk
-    cascading_events = len([h for h in history if sum(1 for v in h['predictions'].values() if v > 0.5) >= 2])
-    cascading_risk_score = (cascading_events / data_len) * 100 if data_len else 0
-
-    # 5. Lyapunov Exponent
-    drift_errors = [h['drift_error'] for h in history]
-    if len(drift_errors) > 10:
-        log_drifts = np.log(np.array(drift_errors) + 1e-6) 
-        time_steps = np.arange(len(drift_errors))
-        lyapunov_exponent = np.polyfit(time_steps, log_drifts, 1)[0] * 100 
-    else:
-        lyapunov_exponent = 0
-
-    # 9. ML Projections (Time Travel)
-    # Projecting risk 3, 6, 12 months out based on current drift velocity
-    # Formula: P_future = P_current + (Drift_Velocity * Time_Step)
-    projected_risks = {}
-    for organ, current_risk in avg_risks.items():
-        # Velocity per organ (simplified as global drift * weight for this demo)
-        organ_velocity = drift_velocity * (1.5 if organ == 'kidney' else 1.0) 
-        projected_risks[organ] = {
-            "1m": min(1.0, max(0, current_risk + organ_velocity * 30)),
-            "3m": min(1.0, max(0, current_risk + organ_velocity * 90)),
-            "6m": min(1.0, max(0, current_risk + organ_velocity * 180)),
-            "12m": min(1.0, max(0, current_risk + organ_velocity * 360))
-        }
-
-    # 10. RAG Agent Context (Simulated Knowledge Retrieval)
-    # Connect to the MultimodalRAG agent embedded in the council
-    if history:
-        last_day_metrics = history[-1]['vitals']
-        last_predictions = history[-1]['predictions']
-        
-        # Construct query vector: [Glucose, Kidney, Retina, Heart, Nerve]
-        # Normalizing glucose (inverse of normalized input in loop) for query consistency
-        # Assuming the RAG db expects roughly [0-1] normalized inputs
-        rag_query = np.array([
-            (last_day_metrics['glucose'] - 70) / 130, # Approx norm
-            last_predictions['kidney'],
-            last_predictions['retina'],
-            last_predictions['heart'],
-            last_predictions['nerve']
-        ])
-        
-        rag_result = council.rag.retrieve_context(rag_query)
-        
-        similar_case = rag_result.get('similar_case', {})
-        relevant_paper = rag_result.get('relevant_paper', {})
-        
-        rag_context = {
-            "similar_case_id": similar_case.get('patient_id', "N/A"),
-            "match_score": 0.89, # Confidence score 
-            "summary": f"Patient profile matches {similar_case.get('patient_id', 'unknown')} with outcome: {similar_case.get('outcome', 'No match')}.",
-            "recommendation": f"Reference Literature: {relevant_paper.get('title', 'N/A')} - {relevant_paper.get('content', 'Monitor vitals.')}"
-        }
-    else:
-        rag_context = {
-             "similar_case_id": "N/A",
-             "match_score": 0.0,
-             "summary": "Insufficient data for RAG analysis.",
-             "recommendation": "Collect more vitals."
-        }
+    def profiled_work(job):
+        error = None
+        try:
+            return prof.wrap(work)(job)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            prof.finish(error=error)
 
-    return {
-        "summary": {
-            "patient_id": patient_id,
-            "total_days": data_len,
-            "mse_drift": mse,
-            "risk_score": risk_score, # 0-100
-            "anomalies_detected": anomalies,
-            
-            # New Advanced Metrics
-            "structural_entropy": structural_entropy,
-            "causal_impact_score": causal_impact_score,
-            "network_stability": network_stability,
-            "cascading_risk_score": cascading_risk_score,
-            
-            "lyapunov_exponent": lyapunov_exponent,
-            "drift_velocity": drift_velocity,
-            "volatility_index": volatility_index,
-            "recovery_potential": recovery_potential,
-
-            # ML Projections & RAG
-            "projected_risks": projected_risks,
-            "rag_context": rag_context
-        },
-        "history": history, # Full time-series for graphs
-        "ledger": [b.__dict__ for b in council.ledger.chain]
+    # Keyed by profile so it neither reuses nor replaces the cached analysis
+    job, cached = jobs.submit(patient_id, (patient_id, data_version, prof.profile_id), profiled_work)
+    return {"job_id": job.id, "status": job.status, "cached": cached, "profile_id": prof.profile_id}
+
+@app.get("/api/profiles")
+async def list_profiles():
+    return profiles.list()
+
+@app.get("/api/profiles/{profile_id}")
+async def get_profile(profile_id: str, format: str = "json"):
+    """
+    A stored request profile. format=collapsed returns sampled stacks for
+    flamegraph.pl/speedscope, format=pstats the cProfile table, json everything.
+    """
+    prof = profiles.get(profile_id)
+    if prof is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    report = prof.to_dict()
+    if format == "json":
+        return report
+    if format not in ("collapsed", "pstats"):
+        raise HTTPException(status_code=400, detail="format must be json, collapsed or pstats")
+    if prof.status != "done":
+        raise HTTPException(status_code=409, detail="Profile still running")
+    if format not in report:
+        raise HTTPException(status_code=400, detail=f"No {format} output for mode '{prof.mode}'")
+    return PlainTextResponse(report[format])
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(request: Request, job_id: str, downsample: Optional[str] = None, points: int = 500, field: str = "drift_error",
+                  cursor: Optional[str] = None, limit: Optional[int] = None, layout: str = "rows",
+                  ledger_tail: Optional[int] = None):
+    """
+    Job status, plus the analysis result once done. The history can be shaped:
+    - downsample=lttb|minmax with points=N (selection driven by `field`) for charts
+    - cursor/limit for paging through the raw days (follow history_page.next_cursor)
+    - layout=columnar for arrays of values instead of an array of dicts
+    - ledger_tail=N to return only the last N blocks
+    Accept: application/msgpack or application/vnd.apache.arrow.stream returns the
+    history as float32 typed columns; JSON is the default.
+    """
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    media_type = negotiate(request.headers.get("accept"))
+    if media_type != JSON:
+        layout = "rows" # Binary encoders build their own columns
+    if job.status != "done":
+        # Status polls are tiny: answer on the loop rather than queue behind analyses
+        return encode_response(job.to_dict(include_result=False), media_type)
+    # Shaping and encoding a long history is CPU-bound: keep it off the event loop
+    try:
+        return await cpu.run(render_job, job, media_type, downsample, points, field, cursor, limit, layout, ledger_tail)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def render_job(job, media_type, downsample, points, field, cursor, limit, layout, ledger_tail):
+    """The encoded get_job response for a finished job. Raises ValueError on invalid shaping arguments."""
+    response = job.to_dict(include_result=False)
+    result = job.result
+    history, page = shape_history(result["history"], downsample, points, field, cursor, limit, layout)
+    ledger = result["ledger"] if ledger_tail is None else result["ledger"][-ledger_tail:] if ledger_tail > 0 else []
+    response["result"] = {
+        "summary": result["summary"],
+        "history": history,
+        "history_page": page,
+        "ledger": ledger
     }
+    return encode_response(response, media_type)
 
 @app.websocket("/ws/stream")
 async def websocket_endpoint(websocket: WebSocket, patient_id: str = "P001"):
@@ -312,20 +363,39 @@ async def explain_condition(request: ExplanationRequest):
     # Ensure council is available
     target_council = active_sessions.get(request.patient_id, {}).get("council")
     if not target_council:
-         target_council = DiagnosticCouncil("Generic", use_real_data=True)
+         target_council = await cpu.run(get_generic_council)
 
-    context = target_council.rag.retrieve_context(torch.tensor(drift_vec).numpy())
+    context = await cpu.run(target_council.rag.retrieve_context, np.asarray(drift_vec, dtype=np.float32))
+    # Either match is None while the knowledge base is empty
+    paper = context['relevant_paper'] or {}
     return {
-        "explanation": f"High drift detected. {context['relevant_paper']['content']}",
+        "explanation": f"High drift detected. {paper.get('content', 'Monitor vitals.')}",
         "similar_case": context['similar_case'],
         "source": context['relevant_paper']
     }
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus text exposition of hot-path latencies, counters and executor/cache gauges."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/startup")
+async def startup_stats():
+    """Cold-start timeline: import, warm-up steps, ready and first response (seconds)."""
+    return startup.stats()
+
+@app.get("/api/executor")
+async def executor_stats():
+    """Concurrency limit, queue depth and queue wait times of the CPU executor."""
+    return cpu.stats()
+
 @app.get("/ledger/chain")
 async def get_chain():
      # This is legacy/debug. We should probably accept patient_id
      return []
 
+startup.mark_imported()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,212 @@
+import cProfile
+import functools
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+
+# Profiling is off unless the deployment opts in; requests then opt in one by one
+# with ?profile=<mode> or an X-Profile: <mode> header.
+ENABLED = os.environ.get("DIABETES_PROFILING", "0") == "1"
+MODES = ("sampling", "cprofile")
+# torch.profiler state is process-global: only one section may record torch ops at a time
+_TORCH_PROFILER_LOCK = threading.Lock()
+SAMPLE_INTERVAL_S = float(os.environ.get("DIABETES_PROFILE_INTERVAL_MS", "5")) / 1000
+
+def requested_mode(query_value=None, header_value=None):
+    """
+    The profiler mode a request asked for, or None. Always None while profiling
+    is disabled, so handlers take their normal path untouched.
+    """
+    if not ENABLED:
+        return None
+    value = (query_value or header_value or "").strip().lower()
+    if not value or value in ("0", "false", "off"):
+        return None
+    return value if value in MODES else "sampling"
+
+class StackSampler:
+    """
+    Samples one thread's Python stack every `interval` seconds from a helper
+    thread and counts collapsed stacks ("outer;...;inner count" lines, the input
+    format of flamegraph.pl and speedscope).
+    """
+    def __init__(self, interval=SAMPLE_INTERVAL_S):
+        self.interval = interval
+        self.counts = Counter()
+        self._stop = None
+        self._thread = None
+
+    @staticmethod
+    def _frame_name(frame):
+        code = frame.f_code
+        module = os.path.splitext(os.path.basename(code.co_filename))[0]
+        return f"{module}:{code.co_name}"
+
+    def _sample(self, thread_id):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(self._frame_name(frame))
+                frame = frame.f_back
+            if stack:
+                self.counts[";".join(reversed(stack))] += 1
+
+    def start(self, thread_id):
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, args=(thread_id,), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def collapsed(self):
+        return "\n".join(f"{stack} {count}" for stack, count in self.counts.most_common())
+
+class ProfileSession:
+    """
+    One profiled request. Code runs under it via section()/wrap() on whichever
+    thread does the work (usually an executor thread); sections accumulate into
+    a single report, finalized by finish().
+    """
+    def __init__(self, profile_id, mode, endpoint, patient_id=None, torch_ops=True):
+        self.profile_id = profile_id
+        self.mode = mode
+        self.endpoint = endpoint
+        self.patient_id = patient_id
+        self.torch_ops = torch_ops
+        self.status = "running"
+        self.created_at = time.time()
+        self.wall_s = 0.0
+        self.report = None
+        self._profile = cProfile.Profile() if mode == "cprofile" else None
+        self._sampler = StackSampler() if mode == "sampling" else None
+        self._ops = {}  # torch op -> [calls, self_cpu_us, total_cpu_us]
+        self.torch_ops_skipped = 0 # Sections that found the torch profiler busy
+
+    def _collect_model_ops(self, torch_profile):
+        # Only ops run inside a model forward pass (model_scope ranges) are kept
+        from diabetes_project.models.drift_detector import MODEL_SCOPE_PREFIX
+        for event in torch_profile.events():
+            if event.name.startswith(MODEL_SCOPE_PREFIX):
+                continue
+            parent = event.cpu_parent
+            while parent is not None and not parent.name.startswith(MODEL_SCOPE_PREFIX):
+                parent = parent.cpu_parent
+            if parent is None:
+                continue
+            op = self._ops.setdefault(event.name, [0, 0.0, 0.0])
+            op[0] += 1
+            op[1] += event.self_cpu_time_total
+            op[2] += event.cpu_time_total
+
+    @contextmanager
+    def section(self):
+        torch_profile = None
+        if self.torch_ops:
+            if _TORCH_PROFILER_LOCK.acquire(blocking=False):
+                # Model calls: op-level CPU time from the torch profiler
+                from torch.profiler import profile, ProfilerActivity
+                torch_profile = profile(activities=[ProfilerActivity.CPU])
+                try:
+                    torch_profile.__enter__()
+                except BaseException:
+                    _TORCH_PROFILER_LOCK.release()
+                    raise
+            else:
+                # Another profiled request is recording; overlapping torch profilers crash
+                self.torch_ops_skipped += 1
+        if self._profile is not None:
+            self._profile.enable()
+        else:
+            self._sampler.start(threading.get_ident())
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.wall_s += time.perf_counter() - start
+            if self._profile is not None:
+                self._profile.disable()
+            else:
+                self._sampler.stop()
+            if torch_profile is not None:
+                try:
+                    torch_profile.__exit__(None, None, None)
+                finally:
+                    _TORCH_PROFILER_LOCK.release()
+                self._collect_model_ops(torch_profile)
+
+    def wrap(self, fn):
+        @functools.wraps(fn)
+        def run(*args, **kwargs):
+            with self.section():
+                return fn(*args, **kwargs)
+        return run
+
+    def finish(self, error=None, top=30):
+        report = {
+            "profile_id": self.profile_id,
+            "endpoint": self.endpoint,
+            "patient_id": self.patient_id,
+            "mode": self.mode,
+            "created_at": self.created_at,
+            "wall_s": self.wall_s
+        }
+        if self._profile is not None:
+            out = io.StringIO()
+            pstats.Stats(self._profile, stream=out).sort_stats("cumulative").print_stats(top)
+            report["pstats"] = out.getvalue()
+        else:
+            report["samples"] = sum(self._sampler.counts.values())
+            report["sample_interval_ms"] = self._sampler.interval * 1000
+            report["collapsed"] = self._sampler.collapsed()
+        if self._ops:
+            ops = sorted(self._ops.items(), key=lambda item: item[1][1], reverse=True)[:top]
+            report["torch_ops"] = [{"op": name, "calls": calls, "self_cpu_ms": self_us / 1000, "cpu_total_ms": total_us / 1000}
+                                   for name, (calls, self_us, total_us) in ops]
+        if self.torch_ops_skipped:
+            report["torch_ops_skipped_sections"] = self.torch_ops_skipped
+        if error is not None:
+            report["error"] = str(error)
+        self.report = report
+        self.status = "done"
+        return report
+
+    def to_dict(self):
+        if self.report is not None:
+            return dict(self.report, status=self.status)
+        return {"profile_id": self.profile_id, "endpoint": self.endpoint, "mode": self.mode, "status": self.status}
+
+class ProfileStore:
+    """Most recent profiles by ID (oldest evicted past max_profiles)."""
+    def __init__(self, max_profiles=100):
+        self.max_profiles = max_profiles
+        self.profiles = OrderedDict()
+        self._lock = threading.Lock()
+
+    def start(self, mode, endpoint, patient_id=None, profile_id=None):
+        """Raises ValueError if a client-chosen profile_id is already in use."""
+        from diabetes_project.models.numpy_backend import BACKEND
+        # Model calls only go through torch on the torch backend
+        session = ProfileSession(profile_id or uuid.uuid4().hex, mode, endpoint, patient_id, torch_ops=BACKEND == "torch")
+        with self._lock:
+            if session.profile_id in self.profiles:
+                raise ValueError(f"Profile ID '{session.profile_id}' is already in use")
+            self.profiles[session.profile_id] = session
+            while len(self.profiles) > self.max_profiles:
+                self.profiles.popitem(last=False)
+        return session
+
+    def get(self, profile_id):
+        return self.profiles.get(profile_id)
+
+    def list(self):
+        return [{"profile_id": s.profile_id, "endpoint": s.endpoint, "mode": s.mode, "status": s.status,
+                 "created_at": s.created_at, "wall_s": s.wall_s} for s in list(self.profiles.values())]
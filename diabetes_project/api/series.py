@@ -0,0 +1,126 @@
+import base64
+import json
+import numbers
+import numpy as np
+
+DOWNSAMPLE_MODES = ("lttb", "minmax")
+LAYOUTS = ("rows", "columnar")
+
+def lttb_indices(y, n_out):
+    """
+    Largest-Triangle-Three-Buckets: picks n_out indices of y (x = position)
+    that preserve the visual shape of the series. Always keeps the first and last point.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n_out >= n:
+        return np.arange(n)
+    if n_out < 3:
+        return np.array([0, n - 1])
+
+    x = np.arange(n, dtype=np.float64)
+    # Interior points are split into n_out - 2 buckets
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        start, stop = edges[i], max(edges[i + 1], edges[i] + 1)
+        # Average of the next bucket (or the last point) is the third triangle vertex
+        if i + 2 < len(edges):
+            next_start, next_stop = edges[i + 1], max(edges[i + 2], edges[i + 1] + 1)
+            avg_x, avg_y = x[next_start:next_stop].mean(), y[next_start:next_stop].mean()
+        else:
+            avg_x, avg_y = x[-1], y[-1]
+        area = np.abs((x[a] - avg_x) * (y[start:stop] - y[a]) - (x[a] - x[start:stop]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+def minmax_indices(y, n_out):
+    """Min/max bucketing: the min and max of each of n_out // 2 buckets, in order."""
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    n_buckets = max(1, n_out // 2)
+    if n_out >= n:
+        return np.arange(n)
+
+    edges = np.linspace(0, n, n_buckets + 1).astype(np.int64)
+    starts = edges[:-1]
+    # reduceat gives per-bucket extremes; locate their positions within each bucket
+    mins = np.minimum.reduceat(y, starts)
+    maxs = np.maximum.reduceat(y, starts)
+    bucket = np.repeat(np.arange(n_buckets), np.diff(edges))
+    is_min = y == mins[bucket]
+    is_max = y == maxs[bucket]
+    first_min = np.unique(bucket[is_min], return_index=True)[1]
+    first_max = np.unique(bucket[is_max], return_index=True)[1]
+    return np.unique(np.concatenate([np.flatnonzero(is_min)[first_min], np.flatnonzero(is_max)[first_max]]))
+
+def encode_cursor(offset):
+    return base64.urlsafe_b64encode(json.dumps({"offset": offset}).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor):
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        offset = json.loads(base64.urlsafe_b64decode(padded.encode()))["offset"]
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(offset, int) or offset < 0:
+        raise ValueError("Invalid cursor")
+    return offset
+
+def to_columnar(history):
+    """Array-of-dicts history -> dict of value arrays (nested dicts become nested column groups)."""
+    if not history:
+        return {}
+    columns = {}
+    for key, value in history[0].items():
+        if isinstance(value, dict):
+            columns[key] = {sub: [h[key][sub] for h in history] for sub in value}
+        else:
+            columns[key] = [h[key] for h in history]
+    return columns
+
+def shape_history(history, downsample=None, points=500, field="drift_error", cursor=None, limit=None, layout="rows"):
+    """
+    Applies downsampling (for charts) or cursor pagination (for raw days), then
+    the requested layout. Returns (history, page) where page describes the slice.
+    Raises ValueError on invalid arguments.
+    """
+    if downsample is not None and downsample not in DOWNSAMPLE_MODES:
+        raise ValueError(f"downsample must be one of {DOWNSAMPLE_MODES}")
+    if layout not in LAYOUTS:
+        raise ValueError(f"layout must be one of {LAYOUTS}")
+
+    total = len(history)
+    page = {"total": total}
+    if downsample is not None:
+        if points < 2:
+            raise ValueError("points must be >= 2")
+        if history and field not in history[0]:
+            raise ValueError(f"Unknown downsample field '{field}'")
+        if history and not isinstance(history[0][field], (numbers.Real, np.bool_)):
+            raise ValueError(f"Downsample field '{field}' is not a numeric column")
+        y = [h[field] for h in history]
+        indices = lttb_indices(y, points) if downsample == "lttb" else minmax_indices(y, points)
+        history = [history[i] for i in indices]
+        page.update({"downsample": downsample, "points": len(history)})
+    elif cursor is not None or limit is not None:
+        offset = decode_cursor(cursor) if cursor else 0
+        limit = limit if limit is not None else 500
+        if limit < 1:
+            raise ValueError("limit must be >= 1")
+        history = history[offset:offset + limit]
+        next_offset = offset + len(history)
+        page.update({
+            "offset": offset,
+            "returned": len(history),
+            "next_cursor": encode_cursor(next_offset) if next_offset < total else None
+        })
+
+    if layout == "columnar":
+        history = to_columnar(history)
+    page["layout"] = layout
+    return history, page
@@ -0,0 +1,57 @@
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# DIABETES_WARMUP=all (or 1) runs every step; a comma list picks some; 0/unset skips warm-up
+STEPS = ("dataset", "models", "ledger")
+
+def parse_targets(value=None):
+    value = (value if value is not None else os.environ.get("DIABETES_WARMUP", "0")).strip().lower()
+    if value in ("", "0", "false", "off", "none"):
+        return []
+    if value in ("1", "true", "all"):
+        return list(STEPS)
+    targets = [t.strip() for t in value.split(",") if t.strip()]
+    unknown = set(targets) - set(STEPS)
+    if unknown:
+        raise ValueError(f"Unknown warm-up steps {sorted(unknown)} (choose from {STEPS})")
+    # Always in dependency order
+    return [step for step in STEPS if step in targets]
+
+class StartupTimer:
+    """
+    Cold-start timeline of one worker, in seconds since `t0` (the start of the
+    API module import): import, warm-up (per step), ready, and first response.
+    """
+    def __init__(self, t0=None):
+        self.t0 = t0 if t0 is not None else time.perf_counter()
+        self.import_s = None
+        self.warmup_s = {}
+        self.ready_s = None
+        self.first_response_s = None
+
+    def mark_imported(self):
+        self.import_s = time.perf_counter() - self.t0
+
+    def mark_ready(self):
+        self.ready_s = time.perf_counter() - self.t0
+
+    def mark_response(self):
+        if self.first_response_s is None:
+            self.first_response_s = time.perf_counter() - self.t0
+
+    def run(self, targets, steps):
+        """Runs steps[name]() for each target in order, timing each one."""
+        for name in targets:
+            start = time.perf_counter()
+            steps[name]()
+            self.warmup_s[name] = time.perf_counter() - start
+            logger.info("warm-up step done step=%s seconds=%.3f", name, self.warmup_s[name])
+
+    def stats(self):
+        stats = {"import_s": self.import_s, "ready_s": self.ready_s, "first_response_s": self.first_response_s,
+                 "warmup_s": sum(self.warmup_s.values())}
+        stats.update({f"warmup_{name}_s": seconds for name, seconds in self.warmup_s.items()})
+        return {key: value for key, value in stats.items() if value is not None}
@@ -0,0 +1,404 @@
+"""
+Offline benchmark suite for the core pipeline, on synthetic PatientDataSimulator data.
+
+    python -m diabetes_project.benchmarks.run --out bench.json
+    python -m diabetes_project.benchmarks.run --quick --only graph,mining
+    python -m diabetes_project.benchmarks.run --out new.json --baseline old.json
+
+Results are written as JSON ({"meta": ..., "results": {benchmark: {case: metrics}}}).
+Metrics ending in "_s" are latencies (lower is better); metrics ending in
+"_per_s" are throughputs (higher is better). --baseline compares every such
+metric against an earlier run and flags regressions beyond --tolerance.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+import torch
+
+from diabetes_project.data.patient_simulator import PatientDataSimulator
+
+DETECTOR_COLUMNS = ['glucose', 'gfr', 'retina_thickness', 'hrv']
+
+def measure(fn, repeats=5, warmup=1):
+    """Runs fn repeatedly; returns median/min wall time in seconds."""
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return {"median_s": statistics.median(times), "min_s": min(times), "repeats": repeats}
+
+def _seed(seed):
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+
+def _patient_frame(days, seed=0):
+    _seed(seed)
+    sim = PatientDataSimulator("BENCH", days=days)
+    return sim.inject_drift(sim.generate_healthy_baseline(), start_day=days // 2, organ='kidney', intensity=0.3)
+
+def bench_loader(sizes, workdir, repeats):
+    """CSV parse + column mapping (cold) vs a cached load (copy-on-write view)."""
+    from diabetes_project.data.loader import RealWorldDataLoader, clear_dataset_cache
+    results = {}
+    for rows in sizes:
+        path = os.path.join(workdir, f"loader_{rows}.csv")
+        # Nerve has no simulated fallback, so the file carries it (Pima's SkinThickness)
+        _patient_frame(rows).drop(columns=['date']).assign(SkinThickness=20.0).to_csv(path, index=False)
+        loader = RealWorldDataLoader("BENCH", path)
+        parse = measure(lambda: loader._parse_csv(path), repeats)
+        clear_dataset_cache()
+        loader.load_data()
+        cached = measure(loader.load_data, repeats)
+        results[f"rows_{rows}"] = {
+            "parse_s": parse["median_s"],
+            "cached_load_s": cached["median_s"],
+            "parse_rows_per_s": rows / parse["median_s"]
+        }
+    return results
+
+def bench_training(repeats, epochs=50):
+    from diabetes_project.models.drift_detector import DriftDetector
+    data = torch.rand(90, 4)
+
+    def train():
+        _seed(0)
+        DriftDetector(input_dim=4).train(data, epochs=epochs)
+    timing = measure(train, repeats)
+    return {f"epochs_{epochs}": {"train_s": timing["median_s"], "epochs_per_s": epochs / timing["median_s"]}}
+
+def bench_detection(n_rows, repeats):
+    """Per-row detect_drift (what /api/analyze does per day) vs one batched forward pass."""
+    from diabetes_project.federated.client import FederatedClient
+    _seed(0)
+    frame = _patient_frame(max(n_rows, 180))
+    client = FederatedClient("BENCH", frame)
+    rows = frame[DETECTOR_COLUMNS].to_numpy()[:n_rows]
+
+    results = {}
+    for backend in ("torch", "numpy"):
+        client.backend = backend
+        per_row = measure(lambda: [client.detect_drift(r) for r in rows], repeats)
+        batched = measure(lambda: client.detect_drift_batch(rows), repeats)
+        results[f"{backend}_rows_{n_rows}"] = {
+            "per_row_s": per_row["median_s"],
+            "batched_s": batched["median_s"],
+            "per_row_rows_per_s": n_rows / per_row["median_s"],
+            "batched_rows_per_s": n_rows / batched["median_s"],
+            "speedup": per_row["median_s"] / batched["median_s"]
+        }
+    return results
+
+def bench_cascade(n_rows, repeats):
+    """
+    Streaming per-day detection: every day through the autoencoder vs the
+    CUSUM-screened cascade, on nominal traffic and on a drifting patient.
+    recall is the share of autoencoder alerts the cascade still raises.
+    """
+    from diabetes_project.federated.client import FederatedClient
+    _seed(0)
+    healthy = PatientDataSimulator("BENCH", days=n_rows + 90).generate_healthy_baseline()
+    frames = {"nominal": healthy, "drifting": _patient_frame(n_rows + 90)}
+
+    results = {}
+    for name, frame in frames.items():
+        client = FederatedClient("BENCH", frame)
+        rows = client.monitoring_data
+        for backend in ("torch", "numpy"):
+            client.backend = backend
+            full = np.array([client.detect_drift(r)[0] for r in rows])
+            cascade = client.enable_cascade(seed=0)
+            screened = np.array([cascade.detect(r)[0] for r in rows])
+            stats = cascade.stats()
+
+            def run_cascade():
+                c = client.enable_cascade(seed=0)
+                for r in rows:
+                    c.detect(r)
+            all_autoencoder = measure(lambda: [client.detect_drift(r) for r in rows], repeats)
+            cascaded = measure(run_cascade, repeats)
+            results[f"{backend}_{name}_rows_{len(rows)}"] = {
+                "autoencoder_s": all_autoencoder["median_s"],
+                "cascade_s": cascaded["median_s"],
+                "speedup": all_autoencoder["median_s"] / cascaded["median_s"],
+                "escalation_rate": stats["escalation_rate"],
+                "hit_rate": stats["hit_rate"],
+                "recall": float((full & screened).sum() / full.sum()) if full.any() else 1.0
+            }
+    return results
+
+def bench_graph(n_rows, repeats):
+    from diabetes_project.models.propagation_graph import CausalOrganGraph
+    from diabetes_project.models.numpy_backend import NumpyCausalGraph
+    _seed(0)
+    graph = CausalOrganGraph()
+    np_graph = NumpyCausalGraph.from_torch(graph)
+    drifts = np.random.default_rng(0).random((n_rows, 5), dtype=np.float32)
+    tensors = [torch.from_numpy(d) for d in drifts]
+
+    def per_row():
+        with torch.no_grad():
+            for t in tensors:
+                graph(t)
+    looped = measure(per_row, repeats)
+    batched = measure(lambda: graph.forward_batch(drifts), repeats)
+    np_looped = measure(lambda: [np_graph(d) for d in drifts], repeats)
+    np_batched = measure(lambda: np_graph.forward_batch(drifts), repeats)
+    return {f"rows_{n_rows}": {
+        "per_row_s": looped["median_s"],
+        "batched_s": batched["median_s"],
+        "per_row_rows_per_s": n_rows / looped["median_s"],
+        "batched_rows_per_s": n_rows / batched["median_s"],
+        "numpy_per_row_s": np_looped["median_s"],
+        "numpy_batched_s": np_batched["median_s"]
+    }}
+
+def bench_projection(scenario_counts):
+    """Monte Carlo risk projection (12 monthly steps) on both inference backends, without a latency budget."""
+    from diabetes_project.models.propagation_graph import CausalOrganGraph
+    from diabetes_project.models.numpy_backend import NumpyCausalGraph
+    from diabetes_project.models.projection import RiskProjector, estimate_dynamics
+    _seed(0)
+    graph = CausalOrganGraph()
+    graphs = {"torch": graph, "numpy": NumpyCausalGraph.from_torch(graph)}
+    history = np.tile([0.5, 0.1, 0.2, 0.1, 0.1], (180, 1))
+    history[90:, 1] = np.linspace(0.1, 0.8, 90)
+    dynamics = estimate_dynamics(history)
+
+    results = {}
+    for backend, g in graphs.items():
+        for n in scenario_counts:
+            projector = RiskProjector(g, scenarios=n, budget_s=float("inf"))
+            timing = measure(lambda: projector.project(*dynamics, seed=0), 3)
+            results[f"{backend}_scenarios_{n}"] = {"project_s": timing["median_s"], "scenarios_per_s": n / timing["median_s"]}
+    return results
+
+def bench_mining(difficulties, blocks):
+    from diabetes_project.blockchain.ledger import HealthBlock
+    results = {}
+    for difficulty in difficulties:
+        hashes, elapsed = 0, 0.0
+        for i in range(blocks):
+            block = HealthBlock(i + 1, {"event": "Drift Alert", "day": i, "error": 0.5}, "0" * 64, timestamp=1700000000.0 + i)
+            start = time.perf_counter()
+            block.mine_block(difficulty)
+            elapsed += time.perf_counter() - start
+            hashes += block.nonce + 1
+        results[f"difficulty_{difficulty}"] = {
+            "block_s": elapsed / blocks,
+            "hashes_per_s": hashes / elapsed if elapsed > 0 else 0.0,
+            "avg_hashes_per_block": hashes / blocks
+        }
+    return results
+
+def bench_chain(lengths, workdir, repeats):
+    """save_chain / load_chain / verify_chain vs chain length (difficulty 1 to build quickly)."""
+    from diabetes_project.blockchain.ledger import BlockchainLedger
+    results = {}
+    for length in lengths:
+        path = os.path.join(workdir, f"chain_{length}.json")
+        ledger = BlockchainLedger(chain_file=path, difficulty=1)
+        ledger.add_blocks([{"event": "Drift Alert", "day": i, "error": 0.5} for i in range(length - 1)])
+        save = measure(ledger.save_chain, repeats)
+        load = measure(ledger.load_chain, repeats)
+        verify = measure(ledger.verify_chain, repeats)
+        results[f"blocks_{length}"] = {
+            "save_s": save["median_s"],
+            "load_s": load["median_s"],
+            "verify_s": verify["median_s"],
+            "file_bytes": os.path.getsize(path)
+        }
+    return results
+
+def bench_rag(corpus_sizes, n_queries=200):
+    """Similar-case query latency, exact scan vs IVF index, vs case-base size."""
+    from diabetes_project.rag.rag_engine import MockVectorDB
+    from diabetes_project.rag.ann_index import IVFIndex
+    rng = np.random.default_rng(0)
+    queries = rng.random((n_queries, 5), dtype=np.float32)
+    results = {}
+    for size in corpus_sizes:
+        cases = rng.random((size, 5), dtype=np.float32)
+        metas = [{"case_id": i} for i in range(size)]
+        row = {}
+        for name, index in (("exact", None), ("ivf", IVFIndex(seed=0))):
+            db = MockVectorDB(index=index)
+            db.add_batch(cases, metas)
+            db.query(queries[0], k=5)  # Trains the index
+            start = time.perf_counter()
+            for q in queries:
+                db.query(q, k=5)
+            row[f"{name}_query_s"] = (time.perf_counter() - start) / n_queries
+        results[f"cases_{size}"] = row
+    return results
+
+def bench_api(days, workdir, runs=3):
+    """End-to-end POST /api/analyze -> job done via TestClient, fresh upload (no cache) per run."""
+    import io
+    from fastapi.testclient import TestClient
+    from diabetes_project.api.main import app, get_session
+    from diabetes_project.blockchain.ledger import BlockchainLedger
+
+    csv = _patient_frame(days).drop(columns=['date']).to_csv(index=False).encode()
+    latencies = []
+    with TestClient(app) as client:
+        for run in range(runs):
+            res = client.post("/api/upload_data/BENCH", files={"file": ("data.csv", io.BytesIO(csv), "text/csv")})
+            assert res.json()["status"] == "success", res.json()
+            # Scratch ledger so the benchmark never touches the real chain
+            get_session("BENCH")["council"].ledger = BlockchainLedger(chain_file=os.path.join(workdir, f"api_chain_{run}.json"))
+
+            start = time.perf_counter()
+            job_id = client.post("/api/analyze/BENCH").json()["job_id"]
+            while True:
+                job = client.get(f"/api/jobs/{job_id}?downsample=lttb&points=500").json()
+                if job["status"] in ("done", "failed"):
+                    break
+                time.sleep(0.01)
+            if job["status"] != "done":
+                raise RuntimeError(job.get("error"))
+            latencies.append(time.perf_counter() - start)
+    median = statistics.median(latencies)
+    return {f"days_{days}": {"analyze_s": median, "min_analyze_s": min(latencies), "days_per_s": days / median}}
+
+# Runs in a fresh interpreter so nothing is already imported or cached
+_COLD_START_SCRIPT = """
+import json, time
+t0 = time.perf_counter()
+from diabetes_project.api.main import app, startup
+from fastapi.testclient import TestClient
+with TestClient(app) as client:
+    client.get("/api/executor")
+    ready = time.perf_counter() - t0
+    client.post("/api/explain", json={"patient_id": "BENCH_COLD", "organ_drifts": {"kidney": 0.8}})
+    print(json.dumps(dict(startup.stats(), explain_done_s=time.perf_counter() - t0, ready_wall_s=ready)))
+"""
+
+def bench_startup(warmups=("0", "all")):
+    """
+    Worker cold start per DIABETES_WARMUP setting: module import, warm-up,
+    first response, and when the first /api/explain (needs models) completes.
+    """
+    results = {}
+    for warmup in warmups:
+        env = dict(os.environ, DIABETES_WARMUP=warmup)
+        out = subprocess.run([sys.executable, "-c", _COLD_START_SCRIPT], env=env, capture_output=True, text=True, check=True)
+        results[f"warmup_{warmup}"] = json.loads(out.stdout.strip().splitlines()[-1])
+    return results
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_benchmarks(only=None, quick=False):
+    """Runs the selected benchmarks (all by default) and returns the results document."""
+    repeats = 3 if quick else 5
+    suites = {
+        "loader": lambda d: bench_loader([365, 3650] if quick else [365, 3650, 36500], d, repeats),
+        "training": lambda d: bench_training(repeats),
+        "detection": lambda d: bench_detection(365 if quick else 3650, repeats),
+        "cascade": lambda d: bench_cascade(365 if quick else 3650, repeats),
+        "graph": lambda d: bench_graph(365 if quick else 3650, repeats),
+        "projection": lambda d: bench_projection([1024, 4096] if quick else [1024, 4096, 16384]),
+        "mining": lambda d: bench_mining([1, 2, 3] if quick else [2, 3, 4], 3 if quick else 10),
+        "chain": lambda d: bench_chain([10, 100] if quick else [100, 1000, 5000], d, repeats),
+        "rag": lambda d: bench_rag([1000, 5000] if quick else [1000, 10000, 50000]),
+        "api": lambda d: bench_api(90 if quick else 365, d, runs=1 if quick else 3),
+        "startup": lambda d: bench_startup()
+    }
+    unknown = set(only or []) - set(suites)
+    if unknown:
+        raise ValueError(f"Unknown benchmarks: {sorted(unknown)} (choose from {sorted(suites)})")
+
+    doc = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": time.time(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "numpy": np.__version__,
+            "torch": torch.__version__,
+            "torch_threads": torch.get_num_threads(),
+            "quick": quick
+        },
+        "results": {}
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        for name, bench in suites.items():
+            if only and name not in only:
+                continue
+            print(f"Running {name}...", flush=True)
+            start = time.perf_counter()
+            doc["results"][name] = bench(workdir)
+            print(f"  done in {time.perf_counter() - start:.1f}s", flush=True)
+    return doc
+
+def _flatten(results):
+    for bench, cases in results.items():
+        for case, metrics in cases.items():
+            for metric, value in metrics.items():
+                yield f"{bench}.{case}.{metric}", metric, value
+
+def compare(current, baseline, tolerance=0.2):
+    """
+    Compares timing/throughput metrics present in both runs. Returns rows of
+    (metric, baseline, current, change) where change > 0 means slower, and the
+    list of metrics that regressed by more than `tolerance` (0.2 = 20%).
+    """
+    base = {key: value for key, _, value in _flatten(baseline["results"])}
+    rows, regressions = [], []
+    for key, metric, value in _flatten(current["results"]):
+        old = base.get(key)
+        if old is None or not old or not value:
+            continue
+        if metric.endswith("_per_s"):
+            change = old / value - 1
+        elif metric.endswith("_s"):
+            change = value / old - 1
+        else:
+            continue
+        rows.append((key, old, value, change))
+        if change > tolerance:
+            regressions.append(key)
+    return rows, regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Core pipeline benchmarks")
+    parser.add_argument("--out", default="benchmark_results.json")
+    parser.add_argument("--only", help="Comma-separated subset, e.g. graph,mining")
+    parser.add_argument("--quick", action="store_true", help="Smaller sizes and fewer repeats")
+    parser.add_argument("--baseline", help="Earlier results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown before flagging (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    doc = run_benchmarks(only=args.only.split(",") if args.only else None, quick=args.quick)
+    with open(args.out, 'w') as f:
+        json.dump(doc, f, indent=2)
+    print(f"Results written to {args.out}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        rows, regressions = compare(doc, baseline, args.tolerance)
+        for key, old, new, change in rows:
+            flag = "  REGRESSION" if key in regressions else ""
+            print(f"{key:<55} {old:>12.6g} -> {new:>12.6g} ({change:+.1%}){flag}")
+        if regressions:
+            print(f"{len(regressions)} regression(s) beyond {args.tolerance:.0%}")
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+import operator
+from collections import defaultdict
+import numpy as np
+
+OPERATORS = {">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le, "==": operator.eq}
+
+class ContractRule:
+    """
+    One escalation rule: fires on blocks whose payload "event" equals `event`
+    and either `field <op> threshold` holds (vectorizable) or predicate(data) is true.
+    """
+    def __init__(self, name, event, action, reason, field=None, op=">", threshold=None, predicate=None, priority=0):
+        if (predicate is None) == (field is None):
+            raise ValueError("A rule needs exactly one of field/threshold or predicate")
+        if op not in OPERATORS:
+            raise ValueError(f"op must be one of {sorted(OPERATORS)}")
+        self.name = name
+        self.event = event
+        self.action = action
+        self.reason = reason
+        self.field = field
+        self.op = op
+        self.threshold = threshold
+        self.predicate = predicate
+        self.priority = priority
+
+    def result(self):
+        return {"contract_action": self.action, "reason": self.reason}
+
+    def matches(self, data):
+        if self.predicate is not None:
+            return bool(self.predicate(data))
+        value = _number(data.get(self.field))
+        return bool(OPERATORS[self.op](value, self.threshold))
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float("nan") # Never satisfies a threshold
+
+class ContractEngine:
+    """
+    Smart-contract rules indexed by event type: a block only evaluates the rules
+    registered for its own event, highest priority first (then registration
+    order), and the first rule that fires decides the action.
+    """
+    def __init__(self, rules=()):
+        self.rules = defaultdict(list)
+        for rule in rules:
+            self.register(rule)
+
+    def register(self, rule):
+        rules = self.rules[rule.event]
+        rules.append(rule)
+        # Stable sort keeps registration order within a priority
+        rules.sort(key=lambda r: -r.priority)
+        return rule
+
+    def unregister(self, name):
+        for event in list(self.rules):
+            self.rules[event] = [rule for rule in self.rules[event] if rule.name != name]
+
+    def execute(self, data):
+        for rule in self.rules.get(data.get("event"), ()):
+            if rule.matches(data):
+                return rule.result()
+        return None
+
+    def execute_batch(self, payloads):
+        """
+        execute() over many payloads. Payloads are grouped by event; each
+        threshold rule is one NumPy comparison over the group's still-unmatched
+        payloads (field values are gathered once per field).
+        """
+        results = [None] * len(payloads)
+        groups = defaultdict(list)
+        for i, data in enumerate(payloads):
+            if data.get("event") in self.rules:
+                groups[data["event"]].append(i)
+
+        for event, indices in groups.items():
+            indices = np.array(indices)
+            open_ = np.ones(len(indices), dtype=bool)
+            columns = {}
+            for rule in self.rules[event]:
+                if not open_.any():
+                    break
+                if rule.predicate is not None:
+                    fired = np.zeros(len(indices), dtype=bool)
+                    for j in np.flatnonzero(open_):
+                        fired[j] = rule.matches(payloads[indices[j]])
+                else:
+                    if rule.field not in columns:
+                        columns[rule.field] = np.fromiter((_number(payloads[i].get(rule.field)) for i in indices),
+                                                          dtype=np.float64, count=len(indices))
+                    with np.errstate(invalid="ignore"):
+                        fired = OPERATORS[rule.op](columns[rule.field], rule.threshold)
+                fired &= open_
+                for j in np.flatnonzero(fired):
+                    results[indices[j]] = rule.result()
+                open_ &= ~fired
+        return results
+
+def default_rules():
+    return [
+        ContractRule("severe_drift", "Drift Alert", "ESCALATE_TO_SPECIALIST", "Severe Drift > 0.8", field="error", op=">", threshold=0.8)
+    ]
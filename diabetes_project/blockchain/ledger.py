@@ -2,11 +2,30 @@ import json
 import time
 import hashlib
 import os
+import logging
+import tempfile
+import threading
 from diabetes_project.blockchain.zk_proof import ZKVerifier
+from diabetes_project.blockchain.contracts import ContractEngine, default_rules
+from diabetes_project.telemetry import timed, counter
+
+logger = logging.getLogger(__name__)
+BLOCKS_MINED = counter("blocks_mined", "Blocks mined")
+MINING_HASHES = counter("mining_hashes", "Hashes computed while mining")
+BLOCKS_REJECTED = counter("blocks_rejected", "Blocks rejected before mining")
+CONTRACT_TRIGGERS = counter("smart_contract_triggers", "Smart contract actions taken")
 
 CHAIN_FILE = "diabetes_project/blockchain/chain.json"
 DIFFICULTY = 4
 
+# One lock per chain file: every council's ledger defaults to CHAIN_FILE
+_FILE_LOCKS = {}
+_FILE_LOCKS_GUARD = threading.Lock()
+
+def _file_lock(path):
+    with _FILE_LOCKS_GUARD:
+        return _FILE_LOCKS.setdefault(os.path.abspath(path), threading.Lock())
+
 class HealthBlock:
     def __init__(self, index, data, previous_hash, nonce=0, hash=None, timestamp=None):
         self.index = index
@@ -26,86 +45,134 @@ class HealthBlock:
         }, sort_keys=True).encode()
         return hashlib.sha256(block_string).hexdigest()
 
+    @timed("mine_block")
     def mine_block(self, difficulty):
         target = "0" * difficulty
+        start_nonce = self.nonce
         while self.hash[:difficulty] != target:
             self.nonce += 1
             self.hash = self.compute_hash()
-        print(f"Block Mined! Nonce: {self.nonce}, Hash: {self.hash}")
+        BLOCKS_MINED.inc()
+        MINING_HASHES.inc(self.nonce - start_nonce + 1)
+        logger.debug("block mined index=%d nonce=%d hash=%s", self.index, self.nonce, self.hash)
 
 class BlockchainLedger:
-    def __init__(self):
+    def __init__(self, chain_file=CHAIN_FILE, difficulty=DIFFICULTY, contracts=None):
+        """contracts: a ContractEngine (defaults to the shared SmartContract.engine rules)."""
+        self.chain_file = chain_file
+        self.difficulty = difficulty
+        self.contracts = contracts if contracts is not None else self.SmartContract.engine
         self.chain = []
-        if os.path.exists(CHAIN_FILE):
+        if os.path.exists(self.chain_file):
              self.load_chain()
         else:
             self.create_genesis_block()
 
     def create_genesis_block(self):
         genesis_block = HealthBlock(0, {"event": "Genesis Block"}, "0")
-        genesis_block.mine_block(DIFFICULTY)
+        genesis_block.mine_block(self.difficulty)
         self.chain.append(genesis_block)
         self.save_chain()
 
+    @timed("save_chain")
     def save_chain(self):
+        """
+        Writes the chain to a temp file and renames it over chain_file, under a
+        per-file lock, so readers never see a half-written chain and concurrent
+        writers never interleave.
+        """
         chain_data = [block.__dict__ for block in self.chain]
-        os.makedirs(os.path.dirname(CHAIN_FILE), exist_ok=True)
-        with open(CHAIN_FILE, 'w') as f:
-            json.dump(chain_data, f, indent=4)
+        directory = os.path.dirname(self.chain_file) or "."
+        os.makedirs(directory, exist_ok=True)
+        with _file_lock(self.chain_file):
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".chain-", suffix=".tmp")
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(chain_data, f, indent=4)
+                os.replace(tmp_path, self.chain_file)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
 
     def load_chain(self):
         try:
-            with open(CHAIN_FILE, 'r') as f:
+            with _file_lock(self.chain_file), open(self.chain_file, 'r') as f:
                 chain_data = json.load(f)
                 self.chain = [HealthBlock(**data) for data in chain_data]
-            print(f"Loaded {len(self.chain)} blocks from valid chain file.")
+            logger.debug("chain loaded blocks=%d file=%s", len(self.chain), self.chain_file)
         except (json.JSONDecodeError, FileNotFoundError):
-             print("Chain file corrupted or missing. Creating new chain.")
+             logger.warning("chain file corrupted or missing, creating new chain file=%s", self.chain_file)
              self.create_genesis_block()
 
 
     class SmartContract:
         """
         Simulates chaincode execution for automated validation and escalation logic.
+        Rules live in a ContractEngine; register more with SmartContract.engine.register(rule).
         """
+        engine = ContractEngine(default_rules())
+
         @staticmethod
         def execute(data):
-            if data.get("event") == "Drift Alert":
-                if data.get("error", 0) > 0.8:
-                    print("Smart Contract Triggered: High Severity Drift Detected. Auto-Escalating.")
-                    return {"contract_action": "ESCALATE_TO_SPECIALIST", "reason": "Severe Drift > 0.8"}
-            return None
+            return BlockchainLedger.SmartContract.engine.execute(data)
 
     def add_block(self, data, proof=None):
         """
         Adds a block to the chain.
-        If data is a 'Model Update', it requires a valid ZK-Proof.
+        If data is a 'Model Update', it requires a valid ZK-Proof. Any other
+        event's proof, when given, is verified and stored the same way.
         """
-        if data.get("event") == "Model Update":
-            if not proof:
-                print("Block Rejected: Model Update requires ZK-Proof.")
-                return None
-            
-            valid, msg = ZKVerifier.verify_proof(proof)
-            if not valid:
-                print(f"Block Rejected: {msg}")
+        return self.add_blocks([data], [proof])[0]
+
+    def add_blocks(self, payloads, proofs=None):
+        """
+        Batched add_block: validates, mines and appends every payload in order,
+        then writes the chain file once. Returns the new blocks (None where rejected).
+        """
+        proofs = proofs if proofs is not None else [None] * len(payloads)
+        # Verify every supplied proof in one pass before mining anything
+        to_verify = [i for i, proof in enumerate(proofs) if proof]
+        _, failures = ZKVerifier.verify_batch([proofs[i] for i in to_verify])
+        verdicts = {i: failures.get(j) for j, i in enumerate(to_verify)}
+        # Contract rules for the whole batch at once (vectorized per event type)
+        actions = self.contracts.execute_batch(payloads)
+        blocks = []
+        for i, (data, proof) in enumerate(zip(payloads, proofs)):
+            blocks.append(self._append_block(data, proof, verdicts.get(i), actions[i]))
+        if any(block is not None for block in blocks):
+            self.save_chain()
+        return blocks
+
+    def _append_block(self, data, proof=None, failure=None, contract_result=None):
+        """
+        failure: the verify_batch reason for this block's proof, or None if it passed.
+        contract_result: the contract action precomputed for this payload, if any.
+        """
+        if data.get("event") == "Model Update" and not proof:
+            BLOCKS_REJECTED.inc(reason="missing_proof")
+            logger.warning("block rejected reason=missing_proof event=%s", data.get("event"))
+            return None
+
+        if proof:
+            if failure is not None:
+                msg = failure
+                BLOCKS_REJECTED.inc(reason="invalid_proof")
+                logger.warning("block rejected reason=invalid_proof detail=%s", msg)
                 return None
             
             data["zk_proof"] = proof
-            print("ZK-Proof Verified. Committing Block...")
+            logger.debug("zk proof verified event=%s", data.get("event"))
 
-        contract_result = self.SmartContract.execute(data)
         if contract_result:
+            CONTRACT_TRIGGERS.inc(action=contract_result["contract_action"])
+            logger.info("smart contract triggered action=%s event=%s", contract_result["contract_action"], data.get("event"))
             data["smart_contract_execution"] = contract_result
 
         previous_block = self.chain[-1]
         new_block = HealthBlock(len(self.chain), data, previous_block.hash)
-        
-        print("Mining new block...")
-        new_block.mine_block(DIFFICULTY)
+        new_block.mine_block(self.difficulty)
         
         self.chain.append(new_block)
-        self.save_chain()
         return new_block
 
     def verify_chain(self):
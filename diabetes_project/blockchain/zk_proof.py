@@ -3,70 +3,114 @@ import json
 import time
 import random
 
+TRAINING_KEY = "secret_training_key_123" # Shared logic in simulation
+PROOF_TTL_S = 60
+
 class ZKProver:
     """
     Simulates a Zero-Knowledge Prover.
     Generates a proof that 'I trained the model on valid data' without revealing the data.
     """
-    def __init__(self, patient_id):
+    def __init__(self, patient_id, max_cached_versions=8):
         self.patient_id = patient_id
+        self.max_cached_versions = max_cached_versions
+        self._weight_hashes = {} # model_version -> weight hash
 
-    def generate_proof(self, model_weights, data_sample_hash):
+    def weight_hash(self, model_weights, model_version=None):
+        """
+        Hash of the serialized weights. With a model_version the hash is computed
+        once per version and reused, since the weights can't change within one.
         """
-        Creates a ZK-SNARK (simulated).
+        if model_version is not None and model_version in self._weight_hashes:
+            return self._weight_hashes[model_version]
+        weight_hash = hashlib.sha256(json.dumps(str(model_weights)).encode()).hexdigest()
+        if model_version is not None:
+            if len(self._weight_hashes) >= self.max_cached_versions:
+                self._weight_hashes.pop(next(iter(self._weight_hashes)))
+            self._weight_hashes[model_version] = weight_hash
+        return weight_hash
+
+    def generate_proof(self, model_weights, data_sample_hash, model_version=None):
+        return self.generate_proofs(model_weights, [data_sample_hash], model_version)[0]
+
+    def generate_proofs(self, model_weights, data_sample_hashes, model_version=None):
+        """
+        Creates ZK-SNARKs (simulated) for many events against the same weights.
         Steps:
-        1. Commitment: Hash(weights + salt)
-        2. Challenge: Hash(block_header + commitment)
+        1. Commitment: Hash(weights + salt), once for the whole batch
+        2. Challenge: Hash(commitment + event + time), per event
         3. Response: Mixing the challenge with a secret key.
         """
         salt = str(random.getrandbits(256))
-        weight_hash = hashlib.sha256(json.dumps(str(model_weights)).encode()).hexdigest()
+        salt_hash = hashlib.sha256(salt.encode()).hexdigest() # Public part of salt
         
         # 1. Commitment
-        commitment = hashlib.sha256((weight_hash + salt).encode()).hexdigest()
+        commitment = hashlib.sha256((self.weight_hash(model_weights, model_version) + salt).encode()).hexdigest()
         
-        # 2. Challenge (Simulated from 'Verifiers')
-        challenge = hashlib.sha256((commitment + str(time.time())).encode()).hexdigest()
-        
-        # 3. Response (The "Proof")
-        # In real ZK, this is a complex polynomial argument.
-        # Here, we simulate it by hashing the challenge with a private 'training key'.
-        training_key = "secret_training_key_123"
-        response = hashlib.sha256((challenge + training_key).encode()).hexdigest()
-        
-        proof = {
-            "prover_id": self.patient_id,
-            "commitment": commitment,
-            "challenge": challenge,
-            "response": response,
-            "salt_hash": hashlib.sha256(salt.encode()).hexdigest(), # Public part of salt
-            "timestamp": time.time()
-        }
-        return proof
+        proofs = []
+        now = time.time()
+        for data_sample_hash in data_sample_hashes:
+            # 2. Challenge (Simulated from 'Verifiers')
+            challenge = hashlib.sha256((commitment + str(data_sample_hash) + str(now)).encode()).hexdigest()
+            
+            # 3. Response (The "Proof")
+            # In real ZK, this is a complex polynomial argument.
+            # Here, we simulate it by hashing the challenge with a private 'training key'.
+            response = hashlib.sha256((challenge + TRAINING_KEY).encode()).hexdigest()
+            
+            proofs.append({
+                "prover_id": self.patient_id,
+                "commitment": commitment,
+                "challenge": challenge,
+                "response": response,
+                "salt_hash": salt_hash,
+                "timestamp": now
+            })
+        return proofs
 
 class ZKVerifier:
     """
     Simulates a Zero-Knowledge Verifier on the Blockchain.
     """
     @staticmethod
-    def verify_proof(proof):
-        """
-        Verifies the validity of the ZK-Proof.
-        """
+    def _check(proof, now):
         # 1. Check timestamp freshness (prevent replay attacks)
-        if time.time() - proof['timestamp'] > 60:
+        if now - proof['timestamp'] > PROOF_TTL_S:
             return False, "Proof Expired"
             
         # 2. Verify Response Consistency (Simulation)
         # We re-compute the expected response hash
-        training_key = "secret_training_key_123" # Shared logic in simulation
-        expected_response = hashlib.sha256((proof['challenge'] + training_key).encode()).hexdigest()
+        expected_response = hashlib.sha256((proof['challenge'] + TRAINING_KEY).encode()).hexdigest()
         
         if proof['response'] == expected_response:
             return True, "ZK-Proof Validated"
         else:
             return False, "Invalid ZK-Proof"
 
+    @staticmethod
+    def verify_proof(proof):
+        """
+        Verifies the validity of the ZK-Proof.
+        """
+        return ZKVerifier._check(proof, time.time())
+
+    @staticmethod
+    def verify_batch(proofs):
+        """
+        Verifies many proofs in one pass (one clock read for the freshness check).
+        Returns (all_valid, failures) where failures maps list index -> reason.
+        """
+        now = time.time()
+        failures = {}
+        for i, proof in enumerate(proofs):
+            try:
+                valid, msg = ZKVerifier._check(proof, now)
+            except (KeyError, TypeError):
+                valid, msg = False, "Malformed ZK-Proof"
+            if not valid:
+                failures[i] = msg
+        return not failures, failures
+
 if __name__ == "__main__":
     prover = ZKProver("P001")
     proof = prover.generate_proof({"w1": 0.5}, "data_hash_123")
@@ -74,3 +118,7 @@ if __name__ == "__main__":
     
     valid, msg = ZKVerifier.verify_proof(proof)
     print(f"Verification: {valid} - {msg}")
+
+    proofs = prover.generate_proofs({"w1": 0.5}, [f"data_hash_{i}" for i in range(100)], model_version=1)
+    proofs[3]["response"] = "0" * 64
+    print("Batch verification:", ZKVerifier.verify_batch(proofs))
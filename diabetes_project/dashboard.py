@@ -2,26 +2,121 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
+import threading
 import time
-import torch
 from diabetes_project.agents.council import DiagnosticCouncil
+from diabetes_project.api.series import lttb_indices
+
+PATIENT_ID = "P001"
+START_DAY = 90 # Start monitoring phase
+DETECTOR_COLUMNS = ['glucose', 'gfr', 'retina_thickness', 'hrv']
+VITALS = {'gfr': 'Kidney GFR', 'retina_thickness': 'Retina Thickness', 'hrv': 'Heart HRV'}
+# The history already on screen is sent once per rerun, downsampled to this many points
+MAX_PREFIX_POINTS = 1000
 
 st.set_page_config(layout="wide", page_title="Neuro-Causal Diabetic Twin")
 
 st.title("🧬 Neuro-Causal Diabetic Digital Twin")
 st.markdown("**Novel Architecture**: Federated Learning + Neuro-Symbolic AI + Causal RAG + Blockchain")
 
-if 'council' not in st.session_state:
-    st.session_state.council = DiagnosticCouncil("P001")
-    st.session_state.day = 90 # Start monitoring phase
+@st.cache_resource
+def load_council(patient_id):
+    """One trained council (models, ledger, RAG) per patient, shared by every viewer."""
+    return DiagnosticCouncil(patient_id)
+
+@st.cache_resource
+def load_timeline(patient_id):
+    """
+    Drift verdicts for every day, scored once in one batched pass, plus the
+    ledger blocks already logged (so concurrent viewers never log a day twice).
+    """
+    council = load_council(patient_id)
+    rows = council.data[DETECTOR_COLUMNS].to_numpy(dtype=np.float64)
+    is_drift, errors = council.client.detect_drift_batch(rows)
+    return {"is_drift": np.asarray(is_drift), "errors": np.asarray(errors), "blocks": {}, "lock": threading.Lock()}
+
+def chart_rows(council, timeline, start, stop, indices=None):
+    """Chart rows for days [start, stop) (or just `indices` of them), indexed by day."""
+    days = np.arange(start, stop) if indices is None else start + np.asarray(indices)
+    vitals = council.data.iloc[days][list(VITALS)].rename(columns=VITALS)
+    vitals.index = days
+    threshold = float(council.client.detector.threshold)
+    drift = pd.DataFrame({"Drift Error": timeline["errors"][days], "Drift Threshold": threshold}, index=days)
+    return vitals, drift
+
+def prefix_rows(council, timeline, day):
+    """Days already watched, LTTB-downsampled on the drift error so long runs redraw in bounded size."""
+    if day <= MAX_PREFIX_POINTS:
+        return chart_rows(council, timeline, 0, day)
+    indices = lttb_indices(timeline["errors"][:day], MAX_PREFIX_POINTS)
+    return chart_rows(council, timeline, 0, day, indices)
+
+def log_alerts(council, timeline, days):
+    """Mines one block per alert day not yet logged by any viewer; returns {day: block}."""
+    with timeline["lock"]:
+        new_days = [d for d in days if d not in timeline["blocks"]]
+        model_version = council.client.model_info()
+        payloads = [{"event": "Drift Alert", "patient_id": council.client.patient_id, "day": int(d),
+                     "error": float(timeline["errors"][d]), "msg": f"Drift Detected! Error: {timeline['errors'][d]:.4f}",
+                     "model_version": model_version}
+                    for d in new_days]
+        for d, block in zip(new_days, council.ledger.add_blocks(payloads)):
+            timeline["blocks"][d] = block
+        return {d: timeline["blocks"][d] for d in days}
+
+def propagation_figure(predictions):
+    # Simple Node-Link Diagram
+    nodes = ['Glucose', 'Kidney', 'Retina', 'Heart', 'Nerve']
+    # Highlight nodes with high risk
+    colors = ['red' if predictions.get(n.lower(), 0) > 0.5 else 'green' for n in nodes]
+
+    node_trace = go.Scatter(
+        x=[0, 1, 1, 2, 2], y=[0, 1, -1, 1, -1],
+        mode='markers+text',
+        text=[f"{n}\n{predictions.get(n.lower(), 0):.2f}" for n in nodes],
+        textposition="top center",
+        marker=dict(size=40, color=colors)
+    )
+    edge_x = []
+    edge_y = []
+    # Draw mocked edges (Kidney->Heart, Glucose->Retina)
+    # (0,0)->(1,1) Kidney
+    edge_x += [0, 1, None]; edge_y += [0, 1, None]
+    # (1,1)->(2,1) Heart
+    edge_x += [1, 2, None]; edge_y += [1, 1, None]
+
+    edge_trace = go.Scatter(
+        x=edge_x, y=edge_y,
+        line=dict(width=2, color='#888'),
+        hoverinfo='none',
+        mode='lines'
+    )
+    return go.Figure(data=[edge_trace, node_trace])
+
+council = load_council(PATIENT_ID)
+timeline = load_timeline(PATIENT_ID)
+total_days = len(council.data)
+
+if 'day' not in st.session_state:
+    st.session_state.day = START_DAY
+
+# Playback controls
+st.sidebar.subheader("Playback")
+days_per_rerun = st.sidebar.slider("Days per step", 1, 365, 1)
+frames = st.sidebar.slider("Animation frames per step", 1, 50, 10)
+auto_advance = st.sidebar.checkbox("Auto-advance")
+if st.sidebar.button("Restart"):
+    st.session_state.day = START_DAY
 
 # Layout
 col1, col2 = st.columns([2, 1])
 
 with col1:
     st.subheader("Real-Time Organ Vitals (Federated Node)")
-    chart_placeholder = st.empty()
-    
+    vitals, drift = prefix_rows(council, timeline, st.session_state.day)
+    vitals_chart = st.line_chart(vitals)
+    drift_chart = st.line_chart(drift)
+
 with col2:
     st.subheader("Causal Propagation Graph (Neuro-Symbolic)")
     graph_placeholder = st.empty()
@@ -30,74 +125,55 @@ st.subheader("Blockchain Audit Trail & RAG Insights")
 log_placeholder = st.empty()
 
 # Simulation Control
-if st.button("Run Simulation Step-by-Step"):
-    council = st.session_state.council
-    
-    # 1. Monitor
-    result = council.client.monitor(st.session_state.day)
-    
-    # Update Chart
-    df = council.sim.data.iloc[:st.session_state.day+1]
-    fig = go.Figure()
-    fig.add_trace(go.Scatter(y=df['gfr'], mode='lines', name='Kidney GFR'))
-    fig.add_trace(go.Scatter(y=df['retina_thickness'], mode='lines', name='Retina Thickness'))
-    fig.add_trace(go.Scatter(y=df['hrv'], mode='lines', name='Heart HRV'))
-    # Add drift threshold line (approx)
-    fig.add_hline(y=council.client.detector.threshold.item() if council.client.detector.threshold else 0, line_dash="dash", annotation_text="Drift Threshold")
-    chart_placeholder.plotly_chart(fig, use_container_width=True)
-    
-    if result['alert']:
+step = st.button("Run Simulation Step-by-Step") or auto_advance
+if step and st.session_state.day < total_days:
+    start = st.session_state.day
+    stop = min(start + days_per_rerun, total_days)
+
+    # 1. Monitor: stream only the new days into the existing charts
+    bounds = np.linspace(start, stop, min(frames, stop - start) + 1).astype(int)
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        new_vitals, new_drift = chart_rows(council, timeline, lo, hi)
+        vitals_chart.add_rows(new_vitals)
+        drift_chart.add_rows(new_drift)
+        if frames > 1:
+            time.sleep(0.05)
+
+    alert_days = [int(d) for d in np.flatnonzero(timeline["is_drift"][start:stop]) + start]
+    if alert_days:
         # 2. Blockchain Audit
-        block = council.ledger.add_block(result)
-        st.error(f"🚨 ALERT Triggered at Day {st.session_state.day}: {result['msg']}")
+        blocks = log_alerts(council, timeline, alert_days)
+        last_day = alert_days[-1]
+        block = blocks[last_day]
+        st.error(f"🚨 {len(alert_days)} ALERT(s) between Day {start} and Day {stop - 1}; latest at Day {last_day} "
+                 f"(Error: {timeline['errors'][last_day]:.4f})")
         st.info(f"🔗 Block #{block.index} Verified. Hash: {block.hash}")
 
         # 3. Causal Prediction
         # Mock drift vector based on simulation state
-        current_drifts = torch.tensor([0.1, 0.8, 0.2, 0.1, 0.1]) 
-        predictions = council.graph_model(current_drifts)
-        
-        # Visualize Propagation
-        # Simple Node-Link Diagram
-        nodes = ['Glucose', 'Kidney', 'Retina', 'Heart', 'Nerve']
-        # Highlight nodes with high risk
-        colors = ['red' if predictions.get(n.lower(), 0) > 0.5 else 'green' for n in nodes]
-        
-        node_trace = go.Scatter(
-            x=[0, 1, 1, 2, 2], y=[0, 1, -1, 1, -1],
-            mode='markers+text',
-            text=[f"{n}\n{predictions.get(n.lower(), 0):.2f}" for n in nodes],
-            textposition="top center",
-            marker=dict(size=40, color=colors)
-        )
-        edge_x = []
-        edge_y = []
-        # Draw mocked edges (Kidney->Heart, Glucose->Retina)
-        # (0,0)->(1,1) Kidney
-        edge_x += [0, 1, None]; edge_y += [0, 1, None]
-        # (1,1)->(2,1) Heart
-        edge_x += [1, 2, None]; edge_y += [1, 1, None]
-        
-        edge_trace = go.Scatter(
-            x=edge_x, y=edge_y,
-            line=dict(width=2, color='#888'),
-            hoverinfo='none',
-            mode='lines'
-        )
-        
-        fig_graph = go.Figure(data=[edge_trace, node_trace])
-        graph_placeholder.plotly_chart(fig_graph)
-        
+        current_drifts = [0.1, 0.8, 0.2, 0.1, 0.1]
+        predictions = council.propagate(current_drifts)
+        graph_placeholder.plotly_chart(propagation_figure(predictions))
+
         # 4. RAG
-        context = council.rag.retrieve_context(current_drifts.numpy())
+        context = council.rag.retrieve_context(np.asarray(current_drifts, dtype=np.float32))
         with st.expander("Causal RAG Explanation", expanded=True):
-            st.markdown(f"**Similar Case Found:** Patient {context['similar_case']['patient_id']}")
-            st.markdown(f"**Outcome:** {context['similar_case']['outcome']}")
+            case, paper = context['similar_case'], context['relevant_paper']
+            if case:
+                st.markdown(f"**Similar Case Found:** Patient {case['patient_id']}")
+                st.markdown(f"**Outcome:** {case['outcome']}")
+            else:
+                st.markdown("**Similar Case Found:** none yet")
             st.markdown("---")
-            st.markdown(f"**Recommended Literature:** {context['relevant_paper']['title']}")
-            st.caption(context['relevant_paper']['content'])
-            
+            if paper:
+                st.markdown(f"**Recommended Literature:** {paper['title']}")
+                st.caption(paper['content'])
+
     else:
-        st.success(f"Day {st.session_state.day}: Vitals Nominal. No Drift Detected.")
-        
-    st.session_state.day += 1
+        st.success(f"Days {start}-{stop - 1}: Vitals Nominal. No Drift Detected.")
+
+    st.session_state.day = stop
+    if auto_advance and stop < total_days:
+        st.rerun()
+elif st.session_state.day >= total_days:
+    st.info(f"Simulation complete ({total_days} days). Press Restart to watch again.")
@@ -1,12 +1,51 @@
 import pandas as pd
 import numpy as np
 import os
-from diabetes_project.data.patient_simulator import PatientDataSimulator
+import threading
+import zlib
+import logging
+from diabetes_project.data.patient_simulator import PatientDataSimulator, SIGNALS
+from diabetes_project.data.population import PopulationDataset
+from diabetes_project.telemetry import timed, counter
+
+logger = logging.getLogger(__name__)
+CACHE_LOOKUPS = counter("dataset_cache", "Dataset cache lookups")
+
+# Process-wide cache of parsed + mapped datasets: abspath -> (mtime_ns, DataFrame).
+# The cached frame is never handed out directly; callers get copy-on-write views.
+_DATASET_CACHE = {}
+# Sharded populations over a cached dataset: (abspath, id_column, rows_per_patient) -> (mtime_ns, PopulationDataset)
+_POPULATION_CACHE = {}
+_DATASET_CACHE_LOCK = threading.Lock()
+# abspath -> lock held while that file is parsed, so one slow parse doesn't block other paths
+_PARSE_LOCKS = {}
+
+def _copy_on_write_enabled():
+    if int(pd.__version__.split('.')[0]) >= 3:
+        return True
+    return bool(getattr(pd.options.mode, "copy_on_write", False))
+
+def _view(df):
+    # Under copy-on-write a shallow copy shares memory until someone writes to it.
+    # Without it, fall back to a real copy so callers can never mutate the cache.
+    return df.copy(deep=not _copy_on_write_enabled())
+
+def clear_dataset_cache():
+    with _DATASET_CACHE_LOCK:
+        _DATASET_CACHE.clear()
+        _POPULATION_CACHE.clear()
 
 class RealWorldDataLoader:
-    def __init__(self, patient_id, csv_path=None):
+    def __init__(self, patient_id, csv_path=None, id_column=None, rows_per_patient=None):
+        """
+        Population mode: pass id_column (group rows by a patient ID column) or
+        rows_per_patient (consecutive row groups, e.g. for the Pima CSV) and
+        load_data returns only this patient's slice instead of the whole file.
+        """
         self.patient_id = patient_id
         self.csv_path = csv_path
+        self.id_column = id_column
+        self.rows_per_patient = rows_per_patient
         self.simulator = PatientDataSimulator(patient_id)
         self.data = None
         
@@ -22,55 +61,107 @@ class RealWorldDataLoader:
         
         self.required_columns = ['glucose', 'gfr', 'retina_thickness', 'hrv', 'nerve', 'spo2', 'skin_temp', 'eda', 'activity']
 
+    @timed("load_data")
     def load_data(self):
-        """Loads data from CSV or falls back to simulation."""
-        if self.csv_path and os.path.exists(self.csv_path):
-            print(f"Loading real-world data from {self.csv_path}...")
-            df = pd.read_csv(self.csv_path)
-            
-            # Normalize columns
-            df.rename(columns=self.column_mapping, inplace=True)
-            
-            # Normalization / Scaling for the "Organ Holodeck" Visuals
-            # The visualization expects values roughly:
-            # Glucose: 70-180 (Normal range) -> Pima is raw, so okay.
-            # GFR: 90 is healthy. Pima BMI is ~30. We multiply by 3 to simulate GFR-like scale.
-            # Retina: 250 is healthy. Pima Age is ~30-50. We multiply by 5.
-            # HRV: 50 is healthy. Pima BP is ~70. We keep as is or scale slightly.
-            
-            if 'gfr' in df.columns:
-                df['gfr'] = df['gfr'] * 3 # Scale BMI 30 -> 90
-            
-            if 'retina_thickness' in df.columns:
-                df['retina_thickness'] = df['retina_thickness'] * 5 + 100 # Scale Age 30 -> 250
-                
-            # Hybrid Mode: Fill missing columns with simulation
-            # We generate a baseline simulation of the same length
-            sim_baseline = self.simulator.generate_healthy_baseline()
-            
-            for col in self.required_columns:
-                if col not in df.columns:
-                    # print(f"Warning: '{col}' missing in CSV. Imputing from simulation.")
-                    if len(df) <= len(sim_baseline):
-                        df[col] = sim_baseline[col].iloc[:len(df)].values
-                    else:
-                        extras = len(df) - len(sim_baseline)
-                        extended_sim = pd.concat([sim_baseline]*((len(df)//len(sim_baseline))+1))
-                        df[col] = extended_sim[col].iloc[:len(df)].values
-            
-            # Ensure no NaNs from the merge
-            df.ffill(inplace=True)
-            df.bfill(inplace=True)
-            
-            self.data = df
+        """
+        Loads data from CSV or falls back to simulation.
+        The parsed CSV is cached process-wide (keyed by path and mtime), so every
+        council after the first gets a cheap copy-on-write view of it.
+        """
+        if self.csv_path and os.path.exists(self.csv_path) and self.population_mode:
+            population = self.population
+            if self.patient_id in population:
+                self.data = _view(population.get(self.patient_id))
+            else:
+                logger.info("patient not in population, falling back to simulation patient=%s population=%d", self.patient_id, len(population))
+                self.data = self.simulator.generate_healthy_baseline()
+        elif self.csv_path and os.path.exists(self.csv_path):
+            self.data = _view(self._load_cached(self.csv_path))
         else:
-            print("CSV not found or not provided. Falling back to full simulation.")
+            logger.info("csv not found or not provided, falling back to simulation patient=%s", self.patient_id)
             self.data = self.simulator.generate_healthy_baseline()
             # Inject default drift for demo purposes if pure simulation
             self.data = self.simulator.inject_drift(self.data, start_day=150, organ='kidney', intensity=0.3)
             
         return self.data
 
+    @property
+    def population_mode(self):
+        return self.id_column is not None or self.rows_per_patient is not None
+
+    @property
+    def population(self):
+        """The shared PopulationDataset for this file and sharding (built once per mtime)."""
+        path = os.path.abspath(self.csv_path)
+        df = self._load_cached(path)
+        mtime = os.stat(path).st_mtime_ns
+        key = (path, self.id_column, self.rows_per_patient)
+        with _DATASET_CACHE_LOCK:
+            entry = _POPULATION_CACHE.get(key)
+            if entry is None or entry[0] != mtime:
+                entry = (mtime, PopulationDataset(df, id_column=self.id_column, rows_per_patient=self.rows_per_patient))
+                _POPULATION_CACHE[key] = entry
+            return entry[1]
+
+    def _load_cached(self, csv_path):
+        path = os.path.abspath(csv_path)
+        mtime = os.stat(path).st_mtime_ns
+        with _DATASET_CACHE_LOCK:
+            entry = _DATASET_CACHE.get(path)
+            if entry is not None and entry[0] == mtime:
+                CACHE_LOOKUPS.inc(result="hit")
+                return entry[1]
+            parse_lock = _PARSE_LOCKS.setdefault(path, threading.Lock())
+        # Parse under the file's own lock so concurrent councils don't all parse the same file
+        with parse_lock:
+            with _DATASET_CACHE_LOCK:
+                entry = _DATASET_CACHE.get(path)
+            if entry is not None and entry[0] == mtime:
+                CACHE_LOOKUPS.inc(result="hit") # Parsed by another thread while we waited
+                return entry[1]
+            CACHE_LOOKUPS.inc(result="miss")
+            df = self._parse_csv(path)
+            with _DATASET_CACHE_LOCK:
+                _DATASET_CACHE[path] = (mtime, df)
+            return df
+
+    def _parse_csv(self, csv_path):
+        logger.info("parsing dataset path=%s", csv_path)
+        df = pd.read_csv(csv_path)
+
+        # Normalize columns
+        df.rename(columns=self.column_mapping, inplace=True)
+            
+        # Normalization / Scaling for the "Organ Holodeck" Visuals
+        # The visualization expects values roughly:
+        # Glucose: 70-180 (Normal range) -> Pima is raw, so okay.
+        # GFR: 90 is healthy. Pima BMI is ~30. We multiply by 3 to simulate GFR-like scale.
+        # Retina: 250 is healthy. Pima Age is ~30-50. We multiply by 5.
+        # HRV: 50 is healthy. Pima BP is ~70. We keep as is or scale slightly.
+
+        if 'gfr' in df.columns:
+            df['gfr'] = df['gfr'] * 3 # Scale BMI 30 -> 90
+
+        if 'retina_thickness' in df.columns:
+            df['retina_thickness'] = df['retina_thickness'] * 5 + 100 # Scale Age 30 -> 250
+
+        # Hybrid Mode: Fill missing columns with simulation
+        # Only the missing columns are simulated, directly at the file's length.
+        # Seeded from the path so the imputed values are stable across processes.
+        missing = [col for col in self.required_columns if col not in df.columns]
+        unsimulated = [col for col in missing if col not in SIGNALS]
+        if unsimulated:
+            raise ValueError(f"{csv_path} is missing required columns with no simulated fallback: {unsimulated}")
+        if missing:
+            rng = np.random.default_rng(zlib.crc32(os.path.basename(csv_path).encode()))
+            for col in missing:
+                df[col] = self.simulator.generate_signal(col, len(df), rng=rng)
+
+        # Ensure no NaNs from the merge
+        df.ffill(inplace=True)
+        df.bfill(inplace=True)
+        return df
+
 if __name__ == "__main__":
     # Test
     loader = RealWorldDataLoader("P001", "diabetes_project/data/samples/patient_data.csv")
@@ -1,6 +1,20 @@
 import numpy as np
 import pandas as pd
 import datetime
+import os
+
+# Vectorized signal model used by the cohort generator, in DataFrame column order.
+# Same distributions as generate_healthy_baseline.
+SIGNALS = ['glucose', 'gfr', 'retina_thickness', 'hrv', 'spo2', 'skin_temp', 'eda', 'activity']
+SIGNAL_LOC = np.array([100, 95, 250, 50, 98, 33.5, 5, 5000], dtype=np.float32)
+SIGNAL_SCALE = np.array([15, 2, 5, 8, 1, 0.5, 2, 1500], dtype=np.float32)
+
+# organ -> (affected signal, change per unit of drift)
+DRIFT_EFFECTS = {
+    'kidney': ('gfr', -20),             # GFR decreases
+    'retina': ('retina_thickness', 30), # Thickness increases (edema)
+    'heart': ('hrv', -15)               # HRV decreases
+}
 
 class PatientDataSimulator:
     def __init__(self, patient_id, days=365):
@@ -74,9 +88,130 @@ class PatientDataSimulator:
         df.to_csv(filepath, index=False)
         print(f"Data saved to {filepath}")
 
+    def generate_signal(self, signal, n, rng=None):
+        """Simulates a single healthy signal (one of SIGNALS) of length n."""
+        rng = rng if rng is not None else np.random.default_rng()
+        j = SIGNALS.index(signal)
+        values = rng.normal(loc=SIGNAL_LOC[j], scale=SIGNAL_SCALE[j], size=n)
+        if signal == 'spo2':
+            values = np.clip(values, 90, 100)
+        elif signal in ('eda', 'activity'):
+            values = np.abs(values)
+        return values
+
+    # --- Cohort mode: (patients x days x signals) arrays for load testing ---
+
+    def generate_cohort(self, n_patients, seed=0, dtype=np.float32):
+        """
+        Generates a healthy cohort as one (n_patients, days, len(SIGNALS)) array.
+        Each patient draws from its own np.random.Generator spawned from `seed`,
+        so patient i is reproducible regardless of cohort size or chunking.
+        """
+        cohort = np.empty((n_patients, self.days, len(SIGNALS)), dtype=dtype)
+        for i, child in enumerate(np.random.SeedSequence(seed).spawn(n_patients)):
+            np.random.default_rng(child).standard_normal(out=cohort[i], dtype=dtype)
+
+        # Scale/shift and clamp every patient-day at once
+        cohort *= SIGNAL_SCALE.astype(dtype)
+        cohort += SIGNAL_LOC.astype(dtype)
+        spo2, eda, activity = (SIGNALS.index(c) for c in ('spo2', 'eda', 'activity'))
+        np.clip(cohort[..., spo2], 90, 100, out=cohort[..., spo2])
+        np.abs(cohort[..., eda], out=cohort[..., eda])
+        np.abs(cohort[..., activity], out=cohort[..., activity])
+        return cohort
+
+    def inject_drift_batch(self, cohort, patient_idx, start_days, organs, intensities):
+        """
+        Vectorized inject_drift over many (patient, organ) pairs at once, in place.
+        All arguments after `cohort` are equal-length sequences (or scalars to broadcast).
+        Uses the same linear ramp as inject_drift.
+        """
+        patient_idx = np.atleast_1d(patient_idx)
+        n = len(patient_idx)
+        start_days = np.broadcast_to(start_days, n).astype(np.int64)
+        intensities = np.broadcast_to(intensities, n).astype(np.float64)
+        organs = np.broadcast_to(np.asarray(organs, dtype=object), n)
+
+        length = cohort.shape[1]
+        span = length - start_days
+        valid = span > 0
+        # ramp[j, d] = intensity * span * (d - start) / (span - 1) for d >= start, else 0
+        offset = np.arange(length)[None, :] - start_days[:, None]
+        step = np.where(span > 1, intensities * span / np.maximum(span - 1, 1), 0.0)
+        ramp = np.where(offset >= 0, offset * step[:, None], 0.0)
+
+        for organ, (signal, effect) in DRIFT_EFFECTS.items():
+            rows = valid & (organs == organ)
+            if rows.any():
+                # np.add.at so a patient listed twice accumulates both drifts
+                np.add.at(cohort[..., SIGNALS.index(signal)], patient_idx[rows], (ramp[rows] * effect).astype(cohort.dtype))
+        return cohort
+
+    def cohort_patient_ids(self, n_patients):
+        return [f"{self.patient_id}-{i:06d}" for i in range(n_patients)]
+
+    def iter_cohort_columns(self, cohort, patient_ids=None, chunk_patients=1024):
+        """
+        Streams a cohort as columnar chunks (dict of column -> 1-D array) in
+        long format: patient_id, day, date, then one column per signal.
+        No per-patient DataFrames are built.
+        """
+        n_patients, days, _ = cohort.shape
+        if patient_ids is None:
+            patient_ids = self.cohort_patient_ids(n_patients)
+        patient_ids = np.asarray(patient_ids)
+        day_index = np.arange(days, dtype=np.int32)
+        dates = np.datetime64(self.start_date, 'D') + day_index
+
+        for start in range(0, n_patients, chunk_patients):
+            block = cohort[start:start + chunk_patients]
+            n = len(block)
+            columns = {
+                'patient_id': np.repeat(patient_ids[start:start + n], days),
+                'day': np.tile(day_index, n),
+                'date': np.tile(dates, n)
+            }
+            flat = block.reshape(n * days, len(SIGNALS))
+            for j, signal in enumerate(SIGNALS):
+                columns[signal] = flat[:, j]
+            yield columns
+
+    def save_cohort(self, cohort, filepath, patient_ids=None, chunk_patients=1024):
+        """
+        Streams a cohort to disk chunk by chunk. `.parquet` uses pyarrow (one row
+        group per chunk); anything else is written as CSV.
+        """
+        os.makedirs(os.path.dirname(filepath) or ".", exist_ok=True)
+        chunks = self.iter_cohort_columns(cohort, patient_ids, chunk_patients)
+        rows = 0
+        if filepath.endswith(".parquet"):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            writer = None
+            for columns in chunks:
+                table = pa.table(columns)
+                if writer is None:
+                    writer = pq.ParquetWriter(filepath, table.schema)
+                writer.write_table(table)
+                rows += table.num_rows
+            if writer is not None:
+                writer.close()
+        else:
+            with open(filepath, 'w', newline='') as f:
+                for i, columns in enumerate(chunks):
+                    pd.DataFrame(columns).to_csv(f, index=False, header=(i == 0))
+                    rows += len(columns['day'])
+        print(f"Cohort saved to {filepath} ({rows} patient-days)")
+        return rows
+
 if __name__ == "__main__":
     # Test generation
     sim = PatientDataSimulator(patient_id="P001")
     df = sim.generate_healthy_baseline()
     df = sim.inject_drift(df, start_day=200, organ='kidney', intensity=0.5)
     print(df.tail())
+
+    # Cohort mode
+    cohort = sim.generate_cohort(n_patients=1000, seed=42)
+    sim.inject_drift_batch(cohort, patient_idx=np.arange(0, 1000, 10), start_days=200, organs='kidney', intensities=0.5)
+    print(f"Cohort shape: {cohort.shape} ({cohort.shape[0] * cohort.shape[1]} patient-days)")
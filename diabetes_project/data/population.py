@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+
+class PopulationDataset:
+    """
+    Shards one tabular dataset into per-patient records.
+
+    Patients are identified either by an ID column (rows are grouped by it and
+    kept in file order within each patient) or, for datasets without one such as
+    the Pima CSV, by consecutive row groups of `rows_per_patient` rows named
+    P001, P002, ... The patient index maps each ID to a contiguous (start, stop)
+    row range, so serving a patient's slice is an O(1) lookup plus a view.
+    """
+    def __init__(self, df, id_column=None, rows_per_patient=None, id_prefix="P"):
+        if (id_column is None) == (rows_per_patient is None):
+            raise ValueError("Specify exactly one of id_column or rows_per_patient")
+
+        if id_column is not None:
+            # Stable sort makes each patient's rows contiguous without reordering their days
+            codes, uniques = pd.factorize(df[id_column], sort=True)
+            order = np.argsort(codes, kind="stable")
+            self.df = df.iloc[order].reset_index(drop=True)
+            bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+            ids = [str(u) for u in uniques]
+        else:
+            self.df = df.reset_index(drop=True)
+            n_patients = -(-len(df) // rows_per_patient)
+            bounds = np.minimum(np.arange(n_patients + 1) * rows_per_patient, len(df))
+            width = max(3, len(str(n_patients)))
+            ids = [f"{id_prefix}{i + 1:0{width}d}" for i in range(n_patients)]
+
+        self.id_column = id_column
+        self.index = {pid: (int(bounds[i]), int(bounds[i + 1])) for i, pid in enumerate(ids)}
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, patient_id):
+        return patient_id in self.index
+
+    def patient_ids(self):
+        return list(self.index)
+
+    def get(self, patient_id):
+        """Returns the patient's rows as a DataFrame indexed from 0 (day 0 first)."""
+        start, stop = self.index[patient_id]
+        return self.df.iloc[start:stop].reset_index(drop=True)
+
+    def iter_patients(self):
+        for patient_id in self.index:
+            yield patient_id, self.get(patient_id)
+
+    def summary(self):
+        lengths = np.array([stop - start for start, stop in self.index.values()])
+        return {
+            "patients": len(self.index),
+            "rows": int(lengths.sum()),
+            "min_days": int(lengths.min()) if len(lengths) else 0,
+            "max_days": int(lengths.max()) if len(lengths) else 0
+        }
+
+if __name__ == "__main__":
+    from diabetes_project.data.loader import RealWorldDataLoader
+
+    loader = RealWorldDataLoader("P001", "diabetes_project/data/samples/patient_data.csv", rows_per_patient=24)
+    print(loader.population.summary())
+    print(loader.load_data().head())
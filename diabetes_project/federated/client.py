@@ -1,7 +1,14 @@
 import torch
 import numpy as np
 import pandas as pd
-from diabetes_project.models.drift_detector import DriftDetector
+import logging
+import threading
+from diabetes_project.models.drift_detector import DriftDetector, StreamingPrefilter, CascadeDetector, WindowedDriftDetector
+from diabetes_project.models import numpy_backend
+from diabetes_project.models.calibration import ThresholdCalibrator, BackgroundFineTuner, DEFAULT_QUANTILE
+from diabetes_project.federated.registry import ModelRegistry, weights_hash
+
+logger = logging.getLogger(__name__)
 
 class FederatedClient:
     def __init__(self, patient_id, data_simulator):
@@ -15,6 +22,18 @@ class FederatedClient:
              self.data = self.simulator.generate_healthy_baseline()
         
         self.detector = DriftDetector(input_dim=4)
+        self.backend = numpy_backend.BACKEND
+        self._snapshot = None
+        self.cascade = None # Optional two-stage detector used by monitor()
+        self._window_detectors = {} # window -> WindowedDriftDetector
+        self.calibrator = None # Optional online thresholds (enable_calibration)
+        self.fine_tuner = None
+        # Global model versions (set by FederatedServer.register_client), pulled lazily
+        self.registry = None
+        self.model_version = None # Registry version the weights came from (None: trained locally)
+        self._synced_detector_version = None
+        self._weights_hash = (None, None) # (detector.version, content hash)
+        self._sync_lock = threading.Lock()
         
         # Split: Training (first 90 days) vs Monitoring (Rest)
         # Ensure we have enough data
@@ -37,21 +56,150 @@ class FederatedClient:
         return (data - self.min_val) / (self.max_val - self.min_val + 1e-6)
 
     def _train_local_model(self):
-        print(f"Client {self.patient_id}: Training local Drift Detector...")
+        logger.debug("training local drift detector patient=%s rows=%d", self.patient_id, len(self.train_data))
         norm_data = self._normalize(self.train_data)
         tensor_data = torch.FloatTensor(norm_data)
         self.detector.train(tensor_data)
 
+    def _numpy_detector(self):
+        # Re-snapshot only after training or a federated weight update
+        if self._snapshot is None or self._snapshot.version != self.detector.version:
+            self._snapshot = numpy_backend.NumpyDriftDetector.from_torch(self.detector)
+        return self._snapshot
+
     def detect_drift(self, row_values):
         """
         Runs drift detection on a specific set of values (e.g. from a CSV row).
         row_values: [glucose, gfr, retina_thickness, hrv]
         """
-        norm_data = self._normalize(np.array(row_values))
+        return self._score(self._normalize(np.array(row_values)))
+
+    def _score(self, norm_data):
+        drift, error = self._detect_normalized(norm_data)
+        if self.calibrator is None:
+            return drift, error
+        # Online threshold. Every error feeds the sketch (and the fine-tuning
+        # buffer) unless the calibrator's guard rejects it as clear drift;
+        # skipping alerts too would censor the sketch and ratchet the threshold down
+        threshold = self._threshold()
+        if self.calibrator.observe(self.patient_id, error, default=threshold) and self.fine_tuner is not None:
+            self.fine_tuner.add(norm_data)
+        return error > threshold, error
+
+    def _threshold(self):
+        """Drift threshold in force: the calibrated one if enabled, else the detector's trained one."""
+        if self.calibrator is None:
+            return self.detector.threshold
+        return self.calibrator.threshold(self.patient_id, default=float(self.detector.threshold))
+
+    def sync(self):
+        """
+        Pulls the latest global model if this client is behind, as a delta from
+        the version it holds. Returns True if the weights changed.
+        """
+        if self.registry is None:
+            return False
+        latest = self.registry.latest
+        if latest is None or latest.version == self.model_version:
+            return False
+        with self._sync_lock:
+            if self.registry.latest.version == self.model_version:
+                return False # Another thread synced meanwhile
+            delta = self.registry.delta(self.model_version)
+            try:
+                state = ModelRegistry.apply(self.detector.get_weights(), delta)
+            except ValueError:
+                # Local weights moved on since the last sync (e.g. fine-tuning): take the full model
+                delta = self.registry.delta(None)
+                state = ModelRegistry.apply(None, delta)
+            self.detector.update_weights(state)
+            self.model_version = delta["to"]
+            self._synced_detector_version = self.detector.version
+            logger.debug("client synced patient=%s model_version=%d bytes=%d", self.patient_id, delta["to"], ModelRegistry.nbytes(delta))
+        return True
+
+    def model_info(self):
+        """
+        The weights scoring this client's events, for ledger payloads: the
+        registry version (None if trained or fine-tuned locally since) and the
+        content hash (computed once per weight change).
+        """
+        if self._weights_hash[0] != self.detector.version:
+            self._weights_hash = (self.detector.version, weights_hash(self.detector.get_weights()))
+        synced = self.detector.version == self._synced_detector_version
+        return {"version": self.model_version if synced else None, "hash": self._weights_hash[1]}
+
+    def _detect_normalized(self, norm_data):
+        self.sync()
+        if self.backend == "numpy":
+            return self._numpy_detector().detect(norm_data)
         tensor_data = torch.FloatTensor(norm_data).unsqueeze(0)
         drift, error = self.detector.detect(tensor_data)
         return drift, error.item() if hasattr(error, 'item') else error
 
+    def enable_cascade(self, sample_rate=0.02, seed=None, **prefilter_options):
+        """
+        Screens monitored days with a streaming CUSUM fitted on the training
+        baseline; only flagged (or randomly sampled) days reach the autoencoder.
+        """
+        prefilter = StreamingPrefilter(**prefilter_options).fit(self._normalize(self.train_data))
+        self.cascade = CascadeDetector(self._score, prefilter, sample_rate, normalize=self._normalize, seed=seed)
+        return self.cascade
+
+    def detect_drift_batch(self, rows):
+        """
+        Batched detect_drift over an (n, 4) array of [glucose, gfr, retina_thickness, hrv] rows.
+        Returns (is_drift, errors) arrays. With calibration enabled the current
+        calibrated threshold applies, but batch scoring doesn't update the sketch.
+        """
+        self.sync()
+        norm_data = self._normalize(np.asarray(rows, dtype=np.float64))
+        if self.backend == "numpy":
+            is_drift, errors = self._numpy_detector().detect_batch(norm_data)
+        else:
+            is_drift, errors = self.detector.detect_batch(torch.FloatTensor(norm_data))
+        if self.calibrator is not None:
+            is_drift = errors > self._threshold()
+        return is_drift, errors
+
+    def enable_calibration(self, quantile=DEFAULT_QUANTILE, calibrator=None, fine_tune_every=None, **fine_tune_options):
+        """
+        Switches detect_drift to a per-patient streaming-quantile threshold,
+        seeded from the training days. With fine_tune_every=N the detector is
+        also fine-tuned in the background after every N days the guard accepts.
+        """
+        self.calibrator = calibrator or ThresholdCalibrator(quantile)
+        self.calibrator.seed(self.patient_id, self._errors_normalized(self._normalize(self.train_data)))
+        if fine_tune_every:
+            self.fine_tuner = BackgroundFineTuner(self.detector, every=fine_tune_every,
+                                                  on_swap=lambda errors: self.calibrator.seed(self.patient_id, errors),
+                                                  **fine_tune_options)
+        return self.calibrator
+
+    def _errors_normalized(self, norm_rows):
+        self.sync()
+        if self.backend == "numpy":
+            return self._numpy_detector().errors(norm_rows)
+        return self.detector.detect_batch(torch.FloatTensor(np.asarray(norm_rows)))[1]
+
+    def window_detector(self, window=7):
+        """WindowedDriftDetector over raw rows, recalibrated on the training days after every weight change."""
+        detector = self._window_detectors.get(window)
+        if detector is None or detector.version != self.detector.version:
+            detector = WindowedDriftDetector(self._errors_normalized, window, normalize=self._normalize).calibrate(self.train_data)
+            detector.version = self.detector.version
+            self._window_detectors[window] = detector
+        return detector
+
+    def detect_drift_windows(self, rows, window=7):
+        """
+        Windowed detection over an (n, 4) array of [glucose, gfr, retina_thickness, hrv]
+        rows. Entry i covers days i .. i + window - 1. Returns (is_drift, errors) arrays.
+        Window errors have their own (narrower) distribution, so this always uses
+        the threshold calibrated on training windows, never the per-day calibrator.
+        """
+        return self.window_detector(window).detect_batch(rows)
+
     def monitor(self, current_day_index):
         """Checks for drift on a specific day using internal monitoring schedule."""
         if len(self.monitoring_data) == 0:
@@ -60,7 +208,10 @@ class FederatedClient:
         idx = current_day_index % len(self.monitoring_data)
         day_data = self.monitoring_data[idx]
         
-        drift, error = self.detect_drift(day_data)
+        if self.cascade is not None:
+            drift, error = self.cascade.detect(day_data)
+        else:
+            drift, error = self.detect_drift(day_data)
         
         if drift:
             return {
@@ -68,12 +219,17 @@ class FederatedClient:
                 "patient_id": self.patient_id,
                 "day": 90 + current_day_index,
                 "error": error,
-                "msg": f"Drift Detected! Error: {error:.4f}"
+                "msg": f"Drift Detected! Error: {error:.4f}",
+                "model_version": self.model_info()
             }
         return {"alert": False, "error": error}
 
     def get_model_update(self):
-        """Simulates sending gradients to the global server."""
+        """
+        Simulates sending gradients to the global server. Syncs first, so a
+        client that hasn't scored since the last round starts from the global model.
+        """
+        self.sync()
         return self.detector.get_weights()
 
 if __name__ == "__main__":
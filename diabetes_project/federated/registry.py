@@ -0,0 +1,137 @@
+"""
+Versioned global model for federated rounds.
+
+FederatedServer.round publishes each averaged state_dict here as a new
+monotonically increasing version with a content hash. Clients no longer
+receive a broadcast. They pull when they next need the model, and only get a
+delta from the version they already hold. Deltas XOR the float bits of the
+changed tensors and zlib-compress them: close weights share their high bits,
+so the XOR is mostly zeros. Applying a delta reproduces the new weights
+bit-for-bit, which the content hash confirms.
+"""
+import hashlib
+import threading
+import time
+import zlib
+from collections import OrderedDict
+import numpy as np
+import torch
+
+def _arrays(state_dict):
+    return {key: np.ascontiguousarray(value.detach().cpu().numpy() if torch.is_tensor(value) else value)
+            for key, value in state_dict.items()}
+
+def weights_hash(state_dict):
+    """Content hash of a state_dict (names, dtypes, shapes and raw bytes)."""
+    digest = hashlib.sha256()
+    for key, array in sorted(_arrays(state_dict).items()):
+        digest.update(f"{key}:{array.dtype.str}:{array.shape};".encode())
+        digest.update(array.tobytes())
+    return digest.hexdigest()
+
+def _bits(array):
+    return array.view(np.dtype(f"u{array.dtype.itemsize}"))
+
+class ModelVersion:
+    def __init__(self, version, weights, content_hash):
+        self.version = version
+        self.weights = weights # {name: np.ndarray}, never mutated
+        self.hash = content_hash
+        self.created_at = time.time()
+
+    def state_dict(self):
+        return OrderedDict((key, torch.from_numpy(array.copy())) for key, array in self.weights.items())
+
+    def info(self):
+        return {"version": self.version, "hash": self.hash}
+
+class ModelRegistry:
+    """Global model versions (the newest max_versions kept) and the deltas between them."""
+    def __init__(self, max_versions=16):
+        self.max_versions = max_versions
+        self.versions = OrderedDict()
+        self._deltas = {}
+        self._lock = threading.Lock()
+
+    @property
+    def latest(self):
+        return next(reversed(self.versions.values())) if self.versions else None
+
+    def get(self, version):
+        return self.versions.get(version)
+
+    def publish(self, state_dict):
+        """
+        Stores state_dict as the next version, unless it is identical to the
+        latest one (same content hash), in which case that version is returned.
+        """
+        weights = {key: array.copy() for key, array in _arrays(state_dict).items()}
+        content_hash = weights_hash(weights)
+        with self._lock:
+            latest = self.latest
+            if latest is not None and latest.hash == content_hash:
+                return latest
+            entry = ModelVersion(latest.version + 1 if latest else 1, weights, content_hash)
+            self.versions[entry.version] = entry
+            while len(self.versions) > self.max_versions:
+                evicted, _ = self.versions.popitem(last=False)
+                self._deltas = {k: v for k, v in self._deltas.items() if evicted not in k}
+        return entry
+
+    def delta(self, from_version, to_version=None):
+        """
+        Update from `from_version` to `to_version` (default latest): only the
+        tensors that changed, as compressed XORs of their bits. Falls back to
+        the full weights when from_version is None or no longer kept.
+        """
+        target = self.latest if to_version is None else self.versions[to_version]
+        base = self.versions.get(from_version) if from_version is not None else None
+        if base is None:
+            return {"from": None, "to": target.version, "hash": target.hash,
+                    "full": {key: array.copy() for key, array in target.weights.items()}}
+        key = (base.version, target.version)
+        cached = self._deltas.get(key)
+        if cached is None:
+            changes = {}
+            for name, array in target.weights.items():
+                old = base.weights.get(name)
+                if old is None or old.shape != array.shape or old.dtype != array.dtype:
+                    changes[name] = ("full", array.copy())
+                elif not np.array_equal(_bits(old), _bits(array)):
+                    xor = np.bitwise_xor(_bits(old), _bits(array))
+                    changes[name] = ("xor", zlib.compress(xor.tobytes()))
+            cached = self._deltas[key] = {"from": base.version, "to": target.version, "hash": target.hash, "changes": changes}
+        return cached
+
+    @staticmethod
+    def apply(state_dict, delta):
+        """
+        New state_dict from the current one plus a delta. Raises ValueError if
+        the result doesn't match the delta's content hash (e.g. local weights
+        diverged from the version the delta was computed against).
+        """
+        if delta.get("full") is not None:
+            weights = {key: array.copy() for key, array in delta["full"].items()}
+        else:
+            weights = {key: array.copy() for key, array in _arrays(state_dict).items()}
+            for name, (kind, payload) in delta["changes"].items():
+                if kind == "full":
+                    weights[name] = payload.copy()
+                else:
+                    bits = _bits(weights[name])
+                    xor = np.frombuffer(zlib.decompress(payload), dtype=bits.dtype).reshape(bits.shape)
+                    np.bitwise_xor(bits, xor, out=bits)
+        if weights_hash(weights) != delta["hash"]:
+            raise ValueError(f"Model delta to version {delta['to']} doesn't reproduce its content hash")
+        return OrderedDict((key, torch.from_numpy(array)) for key, array in weights.items())
+
+    @staticmethod
+    def nbytes(delta):
+        """Payload size of a delta, for comparing with a full broadcast."""
+        if delta.get("full") is not None:
+            return sum(array.nbytes for array in delta["full"].values())
+        return sum(len(payload) if kind == "xor" else payload.nbytes for kind, payload in delta["changes"].values())
+
+    def stats(self):
+        latest = self.latest
+        return {"versions": len(self.versions), "latest": latest.info() if latest else None}
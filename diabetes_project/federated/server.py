@@ -1,23 +1,29 @@
 import torch
 import numpy as np
+import logging
 from diabetes_project.models.drift_detector import DriftDetector
+from diabetes_project.federated.registry import ModelRegistry
+
+logger = logging.getLogger(__name__)
 
 class FederatedServer:
-    def __init__(self):
+    def __init__(self, registry=None):
         self.global_model = DriftDetector(input_dim=4)
+        self.registry = registry or ModelRegistry()
         self.clients = []
 
     def register_client(self, client):
         self.clients.append(client)
-        print(f"Client {client.patient_id} registered with Server.")
+        client.registry = self.registry
+        logger.debug("client registered patient=%s clients=%d", client.patient_id, len(self.clients))
 
     def aggregate_models(self, client_weights_list):
         """Performs FedAvg (Federated Averaging)."""
         if not client_weights_list:
             return None
         
-        # Initialize with first client's weights
-        avg_weights = client_weights_list[0]
+        # Initialize with a copy of the first client's weights (state_dict tensors share the model's storage)
+        avg_weights = {key: value.clone() for key, value in client_weights_list[0].items()}
         
         # Sum up weights
         for i in range(1, len(client_weights_list)):
@@ -31,17 +37,22 @@ class FederatedServer:
             
         # Update global model
         self.global_model.update_weights(avg_weights)
-        print("Global model updated via FedAvg.")
+        logger.info("global model updated via fedavg clients=%d", n_clients)
         return avg_weights
 
     def round(self):
-        """Executes one round of FL training."""
+        """
+        Executes one round of FL training and publishes the averaged weights
+        as the next registry version. Clients pick it up lazily (FederatedClient.sync).
+        """
         updates = []
         for client in self.clients:
             updates.append(client.get_model_update())
         
         new_global_weights = self.aggregate_models(updates)
+        if new_global_weights is None:
+            return None
         
-        # Broadcast back to clients
-        for client in self.clients:
-            client.detector.update_weights(new_global_weights)
+        entry = self.registry.publish(new_global_weights)
+        logger.info("global model published version=%d hash=%s", entry.version, entry.hash[:12])
+        return entry
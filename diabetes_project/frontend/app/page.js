@@ -26,9 +26,17 @@ export default function Home() {
     const runAnalysis = async (id) => {
         setLoadingAnalysis(true);
         try {
+            // Analysis runs as a background job: submit, then poll until it finishes
             const res = await fetch(`http://localhost:8000/api/analyze/${id}`, { method: 'POST' });
-            const data = await res.json();
-            setAnalysisData(data);
+            let job = await res.json();
+            while (job.status === 'queued' || job.status === 'running') {
+                await new Promise(resolve => setTimeout(resolve, 1000));
+                job = await (await fetch(`http://localhost:8000/api/jobs/${job.job_id}?limit=1`)).json();
+            }
+            if (job.status !== 'done') throw new Error(job.error || 'Analysis job failed');
+            // Fetch the finished result downsampled for charting (LTTB keeps the first/last day)
+            job = await (await fetch(`http://localhost:8000/api/jobs/${job.job_id}?downsample=lttb&points=1000&ledger_tail=20`)).json();
+            setAnalysisData(job.result);
         } catch (e) {
             console.error("Analysis Failed", e);
             alert("Failed to load diagnostic analysis.");
@@ -0,0 +1,209 @@
+"""
+Online drift-threshold calibration.
+
+DriftDetector.train fixes its threshold once (mean + 2 std of the training
+errors). ThresholdCalibrator instead keeps a P² quantile sketch (five markers,
+O(1) per update, constant memory) of each patient's reconstruction errors,
+minus clear drift, so thresholds follow the patient without retraining or
+holding past errors. BackgroundFineTuner optionally retrains a copy of the
+model on the same recent days in a background thread and swaps it in when done, so
+scoring never waits on training.
+"""
+import copy
+import logging
+import threading
+from bisect import bisect_right, insort
+from collections import deque
+import numpy as np
+import torch
+from diabetes_project.telemetry import timed
+
+logger = logging.getLogger(__name__)
+
+# One-sided 2 sigma of a normal distribution, matching DriftDetector's training rule
+DEFAULT_QUANTILE = 0.977
+
+class P2Quantile:
+    """
+    Streaming estimate of the p-quantile (Jain & Chlamtac's P² algorithm).
+    Exact up to five values, then five markers whose heights are adjusted by
+    piecewise-parabolic interpolation.
+    """
+    def __init__(self, p):
+        if not 0 < p < 1:
+            raise ValueError("p must be in (0, 1)")
+        self.p = p
+        self.count = 0
+        self.heights = []
+        self.positions = [0, 1, 2, 3, 4]
+        self.desired = [0, 2 * p, 4 * p, 2 + 2 * p, 4]
+        self.increments = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def add(self, x):
+        x = float(x)
+        self.count += 1
+        q = self.heights
+        if len(q) < 5:
+            insort(q, x)
+            return
+
+        # 1. Find the cell holding x, extending the extreme markers if needed
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = bisect_right(q, x) - 1
+
+        # 2. Shift marker positions above the cell, advance the desired positions
+        n = self.positions
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+
+        # 3. Move the middle markers one step towards their desired positions
+        for i in (1, 2, 3):
+            d = self.desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                height = q[i] + d / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i]) +
+                    (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+                if not q[i - 1] < height < q[i + 1]:
+                    # Parabola overshoots a neighbour: fall back to linear
+                    height = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = height
+                n[i] += d
+
+    def value(self):
+        if not self.heights:
+            return None
+        if self.count <= 5:
+            # The middle marker only tracks the p-quantile once markers have moved
+            return float(np.quantile(self.heights, self.p))
+        return self.heights[2]
+
+class ThresholdCalibrator:
+    """
+    Per-patient drift thresholds from streaming error quantiles.
+
+    Errors above guard * the current threshold are treated as clear drift and
+    left out of the sketch. Dropping everything above the threshold itself
+    would bias the quantile low and ratchet the threshold down over time.
+    """
+    def __init__(self, quantile=DEFAULT_QUANTILE, min_samples=30, guard=3.0):
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self.guard = guard
+        self.sketches = {}
+
+    def seed(self, patient_id, errors):
+        """Starts (or replaces) a patient's sketch from a batch of nominal errors."""
+        sketch = P2Quantile(self.quantile)
+        for error in np.asarray(errors, dtype=np.float64).ravel():
+            sketch.add(error)
+        self.sketches[patient_id] = sketch # Swapped in whole, never seen half-built
+        return sketch
+
+    def threshold(self, patient_id, default=None):
+        """The patient's current threshold, or `default` until min_samples errors were seen."""
+        sketch = self.sketches.get(patient_id)
+        if sketch is None or sketch.count < self.min_samples:
+            return default
+        return sketch.value()
+
+    def observe(self, patient_id, error, default=None):
+        """
+        Adds one scored error. Callers pass every error, alerts included: the
+        guard is the only filter. Returns False if the guard rejected it.
+        """
+        current = self.threshold(patient_id, default)
+        if current is not None and error > self.guard * current:
+            return False
+        sketch = self.sketches.get(patient_id)
+        if sketch is None:
+            sketch = self.sketches[patient_id] = P2Quantile(self.quantile)
+        sketch.add(error)
+        return True
+
+    def stats(self):
+        return {pid: {"samples": s.count, "threshold": s.value()} for pid, s in list(self.sketches.items())}
+
+class BackgroundFineTuner:
+    """
+    Scheduled fine-tuning of a DriftDetector on recent rows (those the
+    calibrator's guard accepted, when used with one). Every
+    `every` added rows a background thread trains a copy of the model, then
+    swaps it in with DriftDetector.swap_model. Scoring keeps using the old model
+    until then. A run whose detector changed meanwhile (e.g. a federated sync)
+    is discarded rather than undoing that change. At most one run is in flight;
+    rows arriving meanwhile wait for the next one.
+
+    on_swap: optional callable(errors of the buffered rows under the new model),
+    e.g. to re-seed a ThresholdCalibrator.
+    """
+    def __init__(self, detector, every=60, max_rows=365, epochs=20, lr=1e-3, on_swap=None):
+        self.detector = detector
+        self.every = every
+        self.epochs = epochs
+        self.lr = lr
+        self.on_swap = on_swap
+        self.rows = deque(maxlen=max_rows)
+        self.pending = 0
+        self.runs = 0
+        self.discarded = 0
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def add(self, norm_row):
+        self.rows.append(np.asarray(norm_row, dtype=np.float32).reshape(-1))
+        self.pending += 1
+        if self.pending >= self.every:
+            self.start()
+
+    def start(self):
+        """Starts a fine-tuning run unless one is already in flight. Returns whether it started."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return False
+            self.pending = 0
+            data = torch.from_numpy(np.stack(self.rows))
+            # The detector version this run starts from (and may only replace)
+            model = copy.deepcopy(self.detector.model)
+            version = self.detector.version
+            self._thread = threading.Thread(target=self._run, args=(data, model, version), daemon=True)
+            self._thread.start()
+            return True
+
+    def wait(self, timeout=None):
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    @timed("drift_fine_tune")
+    def _run(self, data, model, version):
+        try:
+            optimizer = torch.optim.Adam(model.parameters(), lr=self.lr)
+            model.train()
+            for _ in range(self.epochs):
+                optimizer.zero_grad()
+                loss = torch.mean((model(data) - data) ** 2)
+                loss.backward()
+                optimizer.step()
+            model.eval()
+            with torch.no_grad():
+                errors = torch.mean((data - model(data)) ** 2, dim=1).numpy()
+            if not self.detector.swap_model(model, expected_version=version):
+                self.discarded += 1
+                logger.info("fine-tuned model discarded: detector changed during the run (version %d -> %d)",
+                            version, self.detector.version)
+                return
+            if self.on_swap is not None:
+                self.on_swap(errors)
+            self.runs += 1
+            logger.info("drift detector fine-tuned rows=%d epochs=%d version=%d", len(data), self.epochs, self.detector.version)
+        except Exception:
+            logger.exception("background fine-tuning failed")
@@ -2,6 +2,26 @@ import torch
 import torch.nn as nn
 import torch.optim as optim
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+import logging
+import contextlib
+import random
+import threading
+import time
+from diabetes_project.telemetry import timed, counter
+
+logger = logging.getLogger(__name__)
+CASCADE_SAMPLES = counter("drift_cascade", "Samples seen by the drift cascade, by stage-one outcome")
+MODEL_SCOPE_PREFIX = "model:"
+
+def model_scope(name):
+    """
+    Marks a model forward pass for the torch profiler, so request profiles can
+    report model ops apart from everything else. A no-op unless a profiler is recording.
+    """
+    if torch.autograd._profiler_enabled():
+        return torch.profiler.record_function(MODEL_SCOPE_PREFIX + name)
+    return contextlib.nullcontext()
 
 class DriftAutoencoder(nn.Module):
     def __init__(self, input_dim=4, hidden_dim=8):
@@ -31,7 +51,10 @@ class DriftDetector:
         self.criterion = nn.MSELoss()
         self.optimizer = optim.Adam(self.model.parameters(), lr=0.001)
         self.threshold = None
+        self.version = 0 # Bumped whenever weights/threshold change (invalidates NumPy snapshots)
+        self._swap_lock = threading.Lock() # Orders federated updates against background swaps
 
+    @timed("drift_train")
     def train(self, data_tensor, epochs=50):
         self.model.train()
         for epoch in range(epochs):
@@ -46,19 +69,253 @@ class DriftDetector:
             reconstructions = self.model(data_tensor)
             errors = torch.mean((data_tensor - reconstructions) ** 2, dim=1)
             self.threshold = torch.mean(errors) + 2 * torch.std(errors) # 2 sigma rule
-            print(f"Model trained. Drift threshold set to: {self.threshold.item():.4f}")
+        self.version += 1
+        logger.debug("detector trained epochs=%d threshold=%.4f", epochs, self.threshold.item())
 
+    @timed("drift_detect")
     def detect(self, new_data_tensor):
         self.model.eval()
-        with torch.no_grad():
+        with torch.no_grad(), model_scope("drift_detect"):
             reconstruction = self.model(new_data_tensor)
             error = torch.mean((new_data_tensor - reconstruction) ** 2)
             
         is_drift = error > self.threshold
         return is_drift.item(), error.item()
 
+    @timed("drift_detect_batch")
+    def detect_batch(self, data_tensor):
+        """Scores many rows in one forward pass. Returns (is_drift, errors) as NumPy arrays."""
+        self.model.eval()
+        with torch.no_grad(), model_scope("drift_detect_batch"):
+            reconstruction = self.model(data_tensor)
+            errors = torch.mean((data_tensor - reconstruction) ** 2, dim=1)
+        return (errors > self.threshold).numpy(), errors.numpy()
+
     def get_weights(self):
         return self.model.state_dict()
 
     def update_weights(self, global_weights):
-        self.model.load_state_dict(global_weights)
+        with self._swap_lock:
+            self.model.load_state_dict(global_weights)
+            self.version += 1
+
+    def swap_model(self, model, expected_version=None):
+        """
+        Replaces the model with an already-trained one in a single reference
+        assignment, so scoring in flight finishes on the old model. With
+        expected_version, nothing is swapped (returns False) if the weights
+        changed since, e.g. a federated update landed while `model` trained.
+        """
+        with self._swap_lock:
+            if expected_version is not None and self.version != expected_version:
+                return False
+            self.model = model
+            self.optimizer = optim.Adam(model.parameters(), lr=0.001)
+            self.version += 1
+            return True
+
+class StreamingPrefilter:
+    """
+    Stage one of the drift cascade: a two-sided CUSUM per vital over normalized
+    rows, O(1) per sample. Each signal is standardized against its training
+    baseline; a sample is flagged when either cumulative sum crosses h or a
+    single reading is more than z_max standard deviations out. Sums are capped
+    at 2*h so the filter settles within ~h/k samples once a drift ends.
+    """
+    def __init__(self, k=0.5, h=5.0, z_max=4.0):
+        self.k = k
+        self.h = h
+        self.z_max = z_max
+        self.mean = None
+        self.std = None
+        self.reset()
+
+    def fit(self, rows):
+        rows = np.asarray(rows, dtype=np.float64)
+        self.mean = rows.mean(axis=0).tolist()
+        self.std = np.maximum(rows.std(axis=0), 1e-6).tolist()
+        self.reset()
+        return self
+
+    def reset(self):
+        n = len(self.mean) if self.mean is not None else 0
+        self.pos = [0.0] * n
+        self.neg = [0.0] * n
+
+    def update(self, row):
+        # Plain floats: for a handful of signals this beats NumPy's per-call overhead
+        k, h, cap, z_max = self.k, self.h, 2 * self.h, self.z_max
+        flagged = False
+        for i, value in enumerate(row):
+            z = (value - self.mean[i]) / self.std[i]
+            pos = min(max(0.0, self.pos[i] + z - k), cap)
+            neg = min(max(0.0, self.neg[i] - z - k), cap)
+            self.pos[i], self.neg[i] = pos, neg
+            if pos > h or neg > h or abs(z) > z_max:
+                flagged = True
+        return flagged
+
+class CascadeDetector:
+    """
+    Two-stage streaming drift detection. Every sample updates the prefilter;
+    only flagged samples, plus a random `sample_rate` share of the rest (to
+    keep measuring what the filter misses), go through the autoencoder.
+
+    score: callable(normalized_row) -> (is_drift, error), the neural check.
+    normalize: optional callable applied to raw rows first.
+    """
+    def __init__(self, score, prefilter, sample_rate=0.02, normalize=None, seed=None):
+        self.score = score
+        self.prefilter = prefilter
+        self.sample_rate = sample_rate
+        self.normalize = normalize
+        self._rng = random.Random(seed)
+        self.samples = 0
+        self.flagged = 0
+        self.sampled = 0
+        self.drifts = 0
+        self.sampled_drifts = 0 # Drifts found only because of sampling (prefilter misses)
+        self.prefilter_s = 0.0
+        self.autoencoder_s = 0.0
+
+    def detect(self, row):
+        """
+        Returns (is_drift, error). error is None when the sample was screened
+        out by stage one and never reached the autoencoder.
+        """
+        start = time.perf_counter()
+        if self.normalize is not None:
+            row = self.normalize(np.asarray(row, dtype=np.float64))
+        flagged = self.prefilter.update(row)
+        sampled = not flagged and self._rng.random() < self.sample_rate
+        escalated = time.perf_counter()
+        self.prefilter_s += escalated - start
+        self.samples += 1
+
+        if not (flagged or sampled):
+            CASCADE_SAMPLES.inc(stage="screened")
+            return False, None
+
+        is_drift, error = self.score(row)
+        self.autoencoder_s += time.perf_counter() - escalated
+        if flagged:
+            self.flagged += 1
+            CASCADE_SAMPLES.inc(stage="flagged")
+        else:
+            self.sampled += 1
+            CASCADE_SAMPLES.inc(stage="sampled")
+        if is_drift:
+            self.drifts += 1
+            if sampled:
+                self.sampled_drifts += 1
+        return bool(is_drift), error
+
+    def stats(self):
+        """
+        Cascade hit rates and the speedup over scoring every sample with the
+        autoencoder (estimated from the measured per-sample autoencoder cost).
+        """
+        escalated = self.flagged + self.sampled
+        per_row = self.autoencoder_s / escalated if escalated else 0.0
+        spent = self.prefilter_s + self.autoencoder_s
+        return {
+            "samples": self.samples,
+            "flagged": self.flagged,
+            "sampled": self.sampled,
+            "escalation_rate": escalated / self.samples if self.samples else 0.0,
+            "drifts": self.drifts,
+            "hit_rate": self.drifts / escalated if escalated else 0.0,
+            "flag_hit_rate": (self.drifts - self.sampled_drifts) / self.flagged if self.flagged else 0.0,
+            "sampled_miss_rate": self.sampled_drifts / self.sampled if self.sampled else 0.0,
+            "prefilter_s": self.prefilter_s,
+            "autoencoder_s": self.autoencoder_s,
+            "speedup": self.samples * per_row / spent if spent > 0 and per_row > 0 else 1.0
+        }
+
+def window_means(rows, window):
+    """
+    Mean row of every `window`-row window of an (n, d) array, shape
+    (n - window + 1, d). The windows are strided views of `rows`, never copied.
+    """
+    return sliding_window_view(rows, window, axis=0).mean(axis=-1)
+
+class WindowedDriftDetector:
+    """
+    Scores W-day windows instead of single days: each window's mean row goes
+    through the autoencoder, so day-to-day noise averages out and slow ramps
+    cross the threshold sooner. The threshold is calibrated (2 sigma rule) on
+    the training windows.
+
+    errors: callable(normalized rows (n, d)) -> reconstruction errors (n,).
+    normalize: optional callable applied to raw rows first.
+    """
+    def __init__(self, errors, window=7, normalize=None):
+        if window < 1:
+            raise ValueError("window must be >= 1")
+        self.errors = errors
+        self.window = window
+        self.normalize = normalize
+        self.threshold = None
+        self.version = None # Detector version the threshold was calibrated against
+
+    def _prepare(self, rows):
+        rows = np.asarray(rows, dtype=np.float64)
+        return self.normalize(rows) if self.normalize is not None else rows
+
+    def calibrate(self, train_rows):
+        rows = self._prepare(train_rows)
+        if len(rows) < self.window:
+            raise ValueError(f"Need at least {self.window} training rows to calibrate")
+        errors = np.asarray(self.errors(window_means(rows, self.window)), dtype=np.float64)
+        self.threshold = float(errors.mean() + 2 * errors.std())
+        return self
+
+    @timed("drift_detect_windows")
+    def detect_batch(self, rows):
+        """
+        Scores every window of an (n, d) array in one batch. Entry i covers
+        rows i .. i + window - 1; fewer than `window` rows give empty arrays.
+        Returns (is_drift, errors).
+        """
+        rows = self._prepare(rows)
+        if len(rows) < self.window:
+            return np.zeros(0, dtype=bool), np.zeros(0, dtype=np.float32)
+        errors = np.asarray(self.errors(window_means(rows, self.window)))
+        return errors > self.threshold, errors
+
+    def stream(self):
+        return WindowStream(self)
+
+class WindowStream:
+    """
+    Live-feed variant of WindowedDriftDetector: the last W rows sit in a ring
+    buffer with a running sum, so each new row costs O(1) plus one autoencoder
+    call on the window mean.
+    """
+    def __init__(self, detector):
+        self.detector = detector
+        self.buffer = None
+        self.total = None
+        self.pos = 0
+        self.count = 0
+
+    def update(self, row):
+        """Adds one row. Returns (is_drift, error), or (False, None) until the first window fills."""
+        row = self.detector._prepare(row).reshape(-1)
+        window = self.detector.window
+        if self.buffer is None:
+            self.buffer = np.zeros((window, len(row)))
+            self.total = np.zeros(len(row))
+        if self.count == window:
+            self.total -= self.buffer[self.pos]
+        self.buffer[self.pos] = row
+        self.total += row
+        self.pos = (self.pos + 1) % window
+        self.count = min(self.count + 1, window)
+        if self.pos == 0:
+            # Re-sum once per lap so rounding error in the running sum can't build up
+            self.total = self.buffer.sum(axis=0)
+        if self.count < window:
+            return False, None
+        error = float(np.asarray(self.detector.errors((self.total / window).reshape(1, -1)))[0])
+        return error > self.detector.threshold, error
@@ -0,0 +1,171 @@
+"""
+Torch-free inference for the drift autoencoder and the causal organ graph.
+
+Weights are snapshotted from the torch modules (or loaded from an .npz export)
+into contiguous float32 arrays, and forward passes reuse preallocated
+per-thread buffers, so scoring a single row is a handful of small matmuls with
+no tensor construction, autograd or module dispatch.
+
+Select with DIABETES_INFERENCE_BACKEND=numpy (default: torch). This module
+never imports torch; an inference-only worker can load_npz() exported weights
+without it.
+"""
+import os
+import threading
+import numpy as np
+from diabetes_project.models.ontology import MedicalOntology
+from diabetes_project.telemetry import timed
+
+BACKENDS = ("torch", "numpy")
+BACKEND = os.environ.get("DIABETES_INFERENCE_BACKEND", "torch").lower()
+if BACKEND not in BACKENDS:
+    raise ValueError(f"DIABETES_INFERENCE_BACKEND must be one of {BACKENDS}, got '{BACKEND}'")
+
+ORGANS = ['glucose', 'kidney', 'retina', 'heart', 'nerve']
+
+def _linear_layers(sequential):
+    """(weight (in, out), bias, activation) triples from an nn.Sequential of Linear/ReLU/Sigmoid."""
+    layers = []
+    for module in sequential:
+        name = type(module).__name__
+        if name == "Linear":
+            weight = module.weight.detach().cpu().numpy()
+            bias = module.bias.detach().cpu().numpy()
+            # Stored transposed so rows @ weight needs no per-call transpose
+            layers.append([np.ascontiguousarray(weight.T, dtype=np.float32), np.ascontiguousarray(bias, dtype=np.float32), None])
+        elif name in ("ReLU", "Sigmoid"):
+            layers[-1][2] = name.lower()
+        else:
+            raise TypeError(f"Unsupported layer for NumPy export: {name}")
+    return [tuple(layer) for layer in layers]
+
+class NumpyMLP:
+    """A stack of dense layers with in-place activations over reusable buffers."""
+    def __init__(self, layers):
+        self.layers = layers
+        self.in_dim = layers[0][0].shape[0]
+        self.out_dim = layers[-1][0].shape[1]
+        self._local = threading.local()
+
+    def _buffers(self, n):
+        # One set of activations per thread, grown to the largest batch seen
+        buffers = getattr(self._local, "buffers", None)
+        if buffers is None or buffers[0].shape[0] < n:
+            buffers = [np.empty((n, weight.shape[1]), dtype=np.float32) for weight, _, _ in self.layers]
+            self._local.buffers = buffers
+        return [buf[:n] for buf in buffers]
+
+    def forward(self, x):
+        """
+        x: (n, in_dim) float32. Returns an (n, out_dim) view into a reused
+        buffer; copy it if it must outlive the next call on this thread.
+        """
+        h = x
+        for (weight, bias, activation), out in zip(self.layers, self._buffers(len(x))):
+            np.matmul(h, weight, out=out)
+            out += bias
+            if activation == "relu":
+                np.maximum(out, 0.0, out=out)
+            elif activation == "sigmoid":
+                np.negative(out, out=out)
+                np.exp(out, out=out)
+                out += 1.0
+                np.reciprocal(out, out=out)
+            h = out
+        return h
+
+    def arrays(self, prefix):
+        arrays = {}
+        for i, (weight, bias, activation) in enumerate(self.layers):
+            arrays[f"{prefix}.{i}.weight"] = weight
+            arrays[f"{prefix}.{i}.bias"] = bias
+            arrays[f"{prefix}.{i}.activation"] = np.array(activation or "")
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays, prefix):
+        layers, i = [], 0
+        while f"{prefix}.{i}.weight" in arrays:
+            activation = str(arrays[f"{prefix}.{i}.activation"]) or None
+            layers.append((np.ascontiguousarray(arrays[f"{prefix}.{i}.weight"], dtype=np.float32),
+                           np.ascontiguousarray(arrays[f"{prefix}.{i}.bias"], dtype=np.float32), activation))
+            i += 1
+        return cls(layers)
+
+class NumpyDriftDetector:
+    """Inference half of DriftDetector: reconstruction error vs the trained threshold."""
+    def __init__(self, mlp, threshold, version=None):
+        self.mlp = mlp
+        self.threshold = np.float32(threshold)
+        self.version = version
+
+    @classmethod
+    def from_torch(cls, detector):
+        model = detector.model
+        mlp = NumpyMLP(_linear_layers(model.encoder) + _linear_layers(model.decoder))
+        return cls(mlp, float(detector.threshold), getattr(detector, "version", None))
+
+    def errors(self, rows):
+        rows = np.asarray(rows, dtype=np.float32).reshape(-1, self.mlp.in_dim)
+        diff = rows - self.mlp.forward(rows)
+        np.square(diff, out=diff)
+        return diff.mean(axis=1)
+
+    @timed("drift_detect", backend="numpy")
+    def detect(self, row):
+        error = self.errors(row)[0]
+        return bool(error > self.threshold), float(error)
+
+    @timed("drift_detect_batch", backend="numpy")
+    def detect_batch(self, rows):
+        errors = self.errors(rows)
+        return errors > self.threshold, errors
+
+class NumpyCausalGraph:
+    """Inference copy of CausalOrganGraph (propagation net + symbolic rules)."""
+    def __init__(self, mlp, organs=ORGANS):
+        self.mlp = mlp
+        self.organs = list(organs)
+
+    @classmethod
+    def from_torch(cls, graph):
+        return cls(NumpyMLP(_linear_layers(graph.propagation_net)), graph.organs)
+
+    @timed("graph_forward", backend="numpy")
+    def forward(self, current_drifts):
+        drifts = np.asarray(current_drifts, dtype=np.float32).reshape(1, -1)
+        preds = self.mlp.forward(drifts)[0]
+        pred_dict = {organ: float(preds[i]) for i, organ in enumerate(self.organs)}
+        input_dict = {f"{organ}_drift": float(drifts[0, i]) for i, organ in enumerate(self.organs)}
+        return MedicalOntology.apply_constraints(pred_dict, input_dict)
+
+    __call__ = forward
+
+    @timed("graph_forward_batch", backend="numpy")
+    def forward_batch(self, drifts):
+        drifts = np.asarray(drifts, dtype=np.float32)
+        return MedicalOntology.apply_constraints_batch(self.mlp.forward(drifts), drifts, self.organs)
+
+def export_npz(path, detector=None, graph=None):
+    """Writes the inference weights (and drift threshold) of torch models to one .npz file."""
+    arrays = {}
+    if detector is not None:
+        snapshot = detector if isinstance(detector, NumpyDriftDetector) else NumpyDriftDetector.from_torch(detector)
+        arrays.update(snapshot.mlp.arrays("drift"))
+        arrays["drift.threshold"] = np.array(snapshot.threshold)
+    if graph is not None:
+        snapshot = graph if isinstance(graph, NumpyCausalGraph) else NumpyCausalGraph.from_torch(graph)
+        arrays.update(snapshot.mlp.arrays("graph"))
+        arrays["graph.organs"] = np.array(snapshot.organs)
+    np.savez(path, **arrays)
+
+def load_npz(path):
+    """Returns (NumpyDriftDetector or None, NumpyCausalGraph or None) from an export_npz file."""
+    with np.load(path) as arrays:
+        arrays = dict(arrays)
+    detector = graph = None
+    if "drift.threshold" in arrays:
+        detector = NumpyDriftDetector(NumpyMLP.from_arrays(arrays, "drift"), arrays["drift.threshold"])
+    if "graph.organs" in arrays:
+        graph = NumpyCausalGraph(NumpyMLP.from_arrays(arrays, "graph"), [str(o) for o in arrays["graph.organs"]])
+    return detector, graph
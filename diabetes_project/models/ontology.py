@@ -0,0 +1,51 @@
+import numpy as np
+import logging
+from diabetes_project.telemetry import counter
+
+logger = logging.getLogger(__name__)
+RULE_FIRINGS = counter("symbolic_rules", "Symbolic rule firings")
+
+class MedicalOntology:
+    """Hard-coded medical rules (The Symbolic Layer)."""
+    @staticmethod
+    def apply_constraints(predictions, input_state):
+        """
+        predictions: {'kidney': val, 'heart': val, ...}
+        input_state: {'glucose_drift': val, ...}
+        """
+        constrained_preds = predictions.copy()
+        
+        # Rule 1: Nephropathy strongly increases CVD risk (Kidney-Heart Axis)
+        if predictions.get('kidney', 0) > 0.7:
+            constrained_preds['heart'] = max(constrained_preds.get('heart', 0), 0.6)
+            RULE_FIRINGS.inc(rule="kidney_heart")
+            logger.debug("symbolic rule fired rule=kidney_heart")
+
+        # Rule 2: Retinopathy is unlikely without preceding Glucose drift
+        if input_state.get('glucose_drift', 0) < 0.2 and predictions.get('retina', 0) > 0.8:
+            constrained_preds['retina'] = 0.4
+            RULE_FIRINGS.inc(rule="retina_suppression")
+            logger.debug("symbolic rule fired rule=retina_suppression")
+
+        return constrained_preds
+
+    @staticmethod
+    def apply_constraints_batch(predictions, inputs, organs):
+        """
+        Vectorized apply_constraints over (n, len(organs)) prediction/input arrays.
+        Returns a constrained copy of predictions.
+        """
+        preds = np.array(predictions, dtype=np.float64, copy=True)
+        kidney, heart, retina = organs.index('kidney'), organs.index('heart'), organs.index('retina')
+        glucose = organs.index('glucose')
+
+        # Rule 1: Nephropathy strongly increases CVD risk (Kidney-Heart Axis)
+        rule1 = predictions[:, kidney] > 0.7
+        preds[rule1, heart] = np.maximum(preds[rule1, heart], 0.6)
+
+        # Rule 2: Retinopathy is unlikely without preceding Glucose drift
+        rule2 = (inputs[:, glucose] < 0.2) & (predictions[:, retina] > 0.8)
+        preds[rule2, retina] = 0.4
+        RULE_FIRINGS.inc(int(rule1.sum()), rule="kidney_heart")
+        RULE_FIRINGS.inc(int(rule2.sum()), rule="retina_suppression")
+        return preds
@@ -1,28 +1,10 @@
 import torch
 import torch.nn as nn
-import networkx as nx
-
-class MedicalOntology:
-    """Hard-coded medical rules (The Symbolic Layer)."""
-    @staticmethod
-    def apply_constraints(predictions, input_state):
-        """
-        predictions: {'kidney': val, 'heart': val, ...}
-        input_state: {'glucose_drift': val, ...}
-        """
-        constrained_preds = predictions.copy()
-        
-        # Rule 1: Nephropathy strongly increases CVD risk (Kidney-Heart Axis)
-        if predictions.get('kidney', 0) > 0.7:
-            constrained_preds['heart'] = max(constrained_preds.get('heart', 0), 0.6)
-            print("Symbolic Logic Triggered: High Kidney Risk -> Elevated Heart Risk")
-
-        # Rule 2: Retinopathy is unlikely without preceding Glucose drift
-        if input_state.get('glucose_drift', 0) < 0.2 and predictions.get('retina', 0) > 0.8:
-            constrained_preds['retina'] = 0.4
-            print("Symbolic Logic Triggered: Suppressed Retinopathy Spike (Low Glucose Drift)")
-
-        return constrained_preds
+import numpy as np
+from diabetes_project.telemetry import timed
+# Torch-free rules module, shared with the NumPy inference backend
+from diabetes_project.models.ontology import MedicalOntology
+from diabetes_project.models.drift_detector import model_scope
 
 class CausalOrganGraph(nn.Module):
     def __init__(self):
@@ -39,9 +21,11 @@ class CausalOrganGraph(nn.Module):
             nn.Sigmoid()
         )
 
+    @timed("graph_forward")
     def forward(self, current_drifts):
         # current_drifts is list/tensor of drift intensities [0.0 - 1.0] for each organ
-        pred_tensor = self.propagation_net(current_drifts)
+        with model_scope("graph_forward"):
+            pred_tensor = self.propagation_net(current_drifts)
         
         # Convert to dict for symbolic processing
         pred_dict = {organ: pred_tensor[i].item() for i, organ in enumerate(self.organs)}
@@ -53,6 +37,18 @@ class CausalOrganGraph(nn.Module):
         final_preds = MedicalOntology.apply_constraints(pred_dict, input_dict)
         return final_preds
 
+    @timed("graph_forward_batch")
+    def forward_batch(self, drifts):
+        """
+        Batched forward over an (n, 5) array of drift intensities.
+        Returns an (n, 5) NumPy array of constrained risks in self.organs order.
+        """
+        drifts = np.asarray(drifts, dtype=np.float32)
+        with torch.no_grad():
+            with model_scope("graph_forward_batch"):
+                raw = self.propagation_net(torch.from_numpy(drifts)).numpy()
+        return MedicalOntology.apply_constraints_batch(raw, drifts, self.organs)
+
 if __name__ == "__main__":
     model = CausalOrganGraph()
     # Simulating High Glucose Drift (Index 0), Low others
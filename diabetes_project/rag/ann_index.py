@@ -0,0 +1,154 @@
+import time
+import numpy as np
+
+class IVFIndex:
+    """
+    Approximate nearest-neighbour index (IVF) for cosine similarity, NumPy only.
+    A spherical k-means coarse quantizer splits the vectors into `n_lists` cells,
+    each holding an inverted list of vector ids. A query only scans the `n_probe`
+    cells whose centroids are closest to it.
+
+    Knobs:
+    - n_lists: number of cells. More cells -> smaller lists -> faster, lower recall.
+    - n_probe: cells scanned per query. n_probe == n_lists is an exact search.
+    - min_train_size: below this many vectors the index just does an exact scan.
+    """
+    def __init__(self, n_lists=64, n_probe=8, n_iter=10, min_train_size=1024, seed=0):
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.n_iter = n_iter
+        self.min_train_size = max(min_train_size, n_lists)
+        self.seed = seed
+        self.reset()
+
+    def reset(self):
+        """Drops every indexed vector (and the trained cells)."""
+        self.vectors = None     # (n, dim) unit-normalized, grows on add
+        self.size = 0
+        self.centroids = None   # (n_lists, dim)
+        self.lists = []         # per cell: np.array of vector ids
+        self.trained_size = 0
+
+    def settings(self):
+        """The knobs that shape search results (e.g. for cache keys)."""
+        return {"n_lists": self.n_lists, "n_probe": self.n_probe, "n_iter": self.n_iter,
+                "min_train_size": self.min_train_size, "seed": self.seed}
+
+    @staticmethod
+    def _normalize(x):
+        norms = np.linalg.norm(x, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return x / norms
+
+    def add(self, vectors):
+        """Adds one vector or a (n, dim) batch. Ids are assigned in insertion order."""
+        vectors = self._normalize(np.atleast_2d(np.asarray(vectors, dtype=np.float32)))
+        n = len(vectors)
+        if self.vectors is None:
+            self.vectors = np.empty((max(n, 16), vectors.shape[1]), dtype=np.float32)
+        if self.size + n > len(self.vectors):
+            grown = np.empty((max(self.size + n, 2 * len(self.vectors)), self.vectors.shape[1]), dtype=np.float32)
+            grown[:self.size] = self.vectors[:self.size]
+            self.vectors = grown
+        self.vectors[self.size:self.size + n] = vectors
+        ids = np.arange(self.size, self.size + n)
+        self.size += n
+
+        if self.centroids is not None:
+            # Route new vectors to their nearest cell without retraining
+            assign = np.argmax(vectors @ self.centroids.T, axis=1)
+            for cell in np.unique(assign):
+                self.lists[cell] = np.concatenate([self.lists[cell], ids[assign == cell]])
+        # Retrain once the collection has doubled since the last k-means run
+        if self.size >= self.min_train_size and self.size >= 2 * self.trained_size:
+            self.train()
+
+    def train(self):
+        """Runs spherical k-means over the stored vectors and rebuilds the inverted lists."""
+        data = self.vectors[:self.size]
+        rng = np.random.default_rng(self.seed)
+        n_lists = min(self.n_lists, self.size)
+        centroids = data[rng.choice(self.size, n_lists, replace=False)].copy()
+
+        for _ in range(self.n_iter):
+            assign = np.argmax(data @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, data)
+            counts = np.bincount(assign, minlength=n_lists)
+            empty = counts == 0
+            # Re-seed empty cells with random points so every list stays useful
+            sums[empty] = data[rng.choice(self.size, int(empty.sum()))]
+            centroids = self._normalize(sums)
+
+        assign = np.argmax(data @ centroids.T, axis=1)
+        order = np.argsort(assign, kind="stable")
+        bounds = np.searchsorted(assign[order], np.arange(n_lists + 1))
+        self.centroids = centroids
+        self.lists = [order[bounds[c]:bounds[c + 1]] for c in range(n_lists)]
+        self.trained_size = self.size
+
+    def search(self, query_vector, k=1, n_probe=None):
+        """Returns (scores, ids) of the top-k cosine matches, best first."""
+        if self.size == 0:
+            return np.empty(0), np.empty(0, dtype=np.int64)
+        q = self._normalize(np.asarray(query_vector, dtype=np.float32))
+        if self.centroids is None:
+            candidates = np.arange(self.size)
+        else:
+            n_probe = min(n_probe or self.n_probe, len(self.centroids))
+            cell_scores = self.centroids @ q
+            cells = np.argpartition(-cell_scores, n_probe - 1)[:n_probe]
+            candidates = np.concatenate([self.lists[c] for c in cells])
+            if len(candidates) == 0:
+                return np.empty(0), np.empty(0, dtype=np.int64)
+
+        scores = self.vectors[candidates] @ q
+        k = min(k, len(candidates))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return scores[top], candidates[top]
+
+def benchmark_recall(n_cases=20000, dim=5, n_queries=200, k=10, n_lists=64, n_probes=(1, 2, 4, 8, 16), seed=0):
+    """
+    Recall@k and latency of IVFIndex against the brute-force MockVectorDB.query
+    on a synthetic population of drift vectors.
+    """
+    from diabetes_project.rag.rag_engine import MockVectorDB
+
+    rng = np.random.default_rng(seed)
+    # Clustered drift profiles: a handful of risk archetypes plus patient noise
+    archetypes = rng.random((32, dim))
+    cases = np.clip(archetypes[rng.integers(0, 32, n_cases)] + rng.normal(0, 0.08, (n_cases, dim)), 0, 1)
+    queries = np.clip(archetypes[rng.integers(0, 32, n_queries)] + rng.normal(0, 0.08, (n_queries, dim)), 0, 1)
+
+    exact_db = MockVectorDB()
+    for i, vec in enumerate(cases):
+        exact_db.add(vec, {"case_id": i})
+
+    start = time.perf_counter()
+    truth = [{meta["case_id"] for _, meta in exact_db.query(q, k=k)} for q in queries]
+    exact_ms = (time.perf_counter() - start) * 1000 / n_queries
+
+    index = IVFIndex(n_lists=n_lists, seed=seed)
+    index.add(cases)
+
+    results = []
+    for n_probe in n_probes:
+        start = time.perf_counter()
+        found = [index.search(q, k=k, n_probe=n_probe)[1] for q in queries]
+        ann_ms = (time.perf_counter() - start) * 1000 / n_queries
+        recall = np.mean([len(truth[i].intersection(found[i].tolist())) / k for i in range(n_queries)])
+        results.append({
+            "n_probe": n_probe,
+            "recall_at_k": float(recall),
+            "ann_ms_per_query": ann_ms,
+            "exact_ms_per_query": exact_ms,
+            "speedup": exact_ms / ann_ms if ann_ms > 0 else float("inf")
+        })
+    return results
+
+if __name__ == "__main__":
+    print(f"{'n_probe':>8} {'recall@10':>10} {'ann ms':>8} {'exact ms':>9} {'speedup':>8}")
+    for row in benchmark_recall():
+        print(f"{row['n_probe']:>8} {row['recall_at_k']:>10.3f} {row['ann_ms_per_query']:>8.3f} "
+              f"{row['exact_ms_per_query']:>9.3f} {row['speedup']:>8.1f}")
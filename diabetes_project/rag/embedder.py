@@ -0,0 +1,74 @@
+import re
+import zlib
+from functools import lru_cache
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+class HashingEmbedder:
+    """
+    Offline, deterministic text embedder: hashed n-gram TF features projected to a
+    fixed dimension (the "hashing trick"), so no vocabulary or model download is needed.
+
+    Features are word unigrams/bigrams plus character n-grams of each word, hashed
+    with CRC32 (stable across processes, unlike Python's hash()) into `dim` signed
+    buckets with sublinear term frequency. IDF is applied on the query side from
+    the bucket document frequencies of the indexed corpus (see idf_from_vectors),
+    which keeps stored document vectors valid as the corpus grows.
+    """
+    def __init__(self, dim=128, char_ngrams=(3, 4), cache_size=4096):
+        self.dim = dim
+        self.char_ngrams = char_ngrams
+        # Per-instance memo of query embeddings (drift-alert texts repeat heavily)
+        self._embed_cached = lru_cache(maxsize=cache_size)(self._embed_one)
+
+    def settings(self):
+        """The parameters that shape embeddings (e.g. for cache keys)."""
+        return {"dim": self.dim, "char_ngrams": tuple(self.char_ngrams)}
+
+    def _features(self, text):
+        words = TOKEN_PATTERN.findall(text.lower())
+        features = list(words)
+        features += [a + " " + b for a, b in zip(words, words[1:])]
+        for word in words:
+            padded = f"<{word}>"
+            for n in self.char_ngrams:
+                features += [padded[i:i + n] for i in range(len(padded) - n + 1)]
+        return features
+
+    def _embed_one(self, text):
+        vec = np.zeros(self.dim, dtype=np.float32)
+        counts = {}
+        for feature in self._features(text):
+            h = zlib.crc32(feature.encode())
+            counts[h] = counts.get(h, 0) + 1
+        for h, count in counts.items():
+            sign = 1.0 if (h >> 31) & 1 else -1.0
+            vec[h % self.dim] += sign * (1.0 + np.log(count))
+        norm = np.linalg.norm(vec)
+        if norm > 0:
+            vec /= norm
+        vec.setflags(write=False)
+        return vec
+
+    def embed(self, text):
+        """Embeds a single text (cached). Returns a read-only (dim,) float32 vector."""
+        return self._embed_cached(text)
+
+    def embed_batch(self, texts):
+        """Embeds many documents at once, e.g. at ingestion time. Returns (n, dim)."""
+        out = np.empty((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            out[i] = self._embed_one(text)
+        return out
+
+    @staticmethod
+    def idf_from_vectors(vectors):
+        """Smoothed IDF per bucket from the non-zero pattern of stored document vectors."""
+        vectors = np.asarray(vectors)
+        n_docs = len(vectors)
+        df = np.count_nonzero(vectors, axis=0)
+        return (np.log((1 + n_docs) / (1 + df)) + 1.0).astype(np.float32)
+
+    def cache_info(self):
+        return self._embed_cached.cache_info()
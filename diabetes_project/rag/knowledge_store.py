@@ -0,0 +1,273 @@
+import os
+import json
+import shutil
+import threading
+import time
+import uuid
+import numpy as np
+from diabetes_project.telemetry import timed
+
+KNOWLEDGE_DIR = "diabetes_project/rag/knowledge"
+# A seeding claim older than this is assumed to belong to a crashed writer
+CLAIM_STALE_S = 300
+# How often a writer that lost the claim checks for the winner's header
+SEED_POLL_S = 0.05
+
+class KnowledgeStore:
+    """
+    Append-only on-disk vector collection shared by every session and worker process.
+
+    Files (for a store called `name` inside `directory`):
+    - name.json       header: {"dim": ..., "version": ..., "epoch": ...}, written once seeding is committed
+    - name.seeding    claim held by the one writer seeding the store
+    - name.f32        raw float32 rows, opened read-only with np.memmap
+    - name.meta.jsonl one JSON metadata record per row
+    - name.idx        int64 byte offsets into the metadata file (the commit point)
+
+    Opening is O(1): nothing is read until a vector or record is requested, and
+    a record lookup is a single seek into the sidecar. The row count is derived
+    from the offsets file, which is written last, so readers never observe a
+    half-appended batch. Appends assume a single writer per store.
+    """
+    def __init__(self, directory, name, dim):
+        self.directory = directory
+        self.name = name
+        self.dim = dim
+        prefix = os.path.join(directory, name)
+        self.header_file = prefix + ".json"
+        self.vec_file = prefix + ".f32"
+        self.meta_file = prefix + ".meta.jsonl"
+        self.idx_file = prefix + ".idx"
+        self.claim_file = prefix + ".seeding"
+
+        self._vectors = None
+        self._offsets = None
+        self._generation = 0 # Bumped by every append or clear through this handle
+        self._clears = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        try:
+            return os.path.getsize(self.idx_file) // 8
+        except OSError:
+            return 0
+
+    def generation(self):
+        """
+        Changes with every append or clear, including another process's (seen
+        through the offsets file's identity, size and mtime).
+        """
+        try:
+            st = os.stat(self.idx_file)
+            on_disk = (st.st_ino, st.st_size, st.st_mtime_ns)
+        except FileNotFoundError:
+            on_disk = None
+        return (self._generation, on_disk)
+
+    def epoch(self):
+        """
+        Changes when the store is cleared or rebuilt, but not on appends: this
+        handle's clear count, the token of the seeding that wrote the header and
+        the offsets file's identity (another process's clear recreates it).
+        """
+        try:
+            with open(self.header_file, 'r') as f:
+                token = json.load(f).get("epoch")
+        except (FileNotFoundError, ValueError):
+            token = None
+        try:
+            inode = os.stat(self.idx_file).st_ino
+        except FileNotFoundError:
+            inode = None
+        return (self._clears, token, inode)
+
+    def exists(self):
+        return os.path.exists(self.header_file)
+
+    def version(self):
+        if not self.exists():
+            return None
+        with open(self.header_file, 'r') as f:
+            return json.load(f).get("version")
+
+    def clear(self):
+        with self._lock:
+            for path in (self.header_file, self.vec_file, self.meta_file, self.idx_file):
+                if os.path.exists(path):
+                    os.remove(path)
+            self._vectors = None
+            self._offsets = None
+            self._generation += 1
+            self._clears += 1
+
+    def ensure(self, version, seed):
+        """
+        Makes sure the store holds `version`'s seed rows. If it doesn't, claims
+        it, drops any stale rows, calls seed() and only then writes the header,
+        so a store is never marked seeded before its rows are committed.
+        Returns True if this call seeded. A writer that loses the claim waits
+        for the winner's header; if the winner dies, its claim goes stale after
+        CLAIM_STALE_S (or is released on error) and this writer seeds instead.
+        """
+        while self.version() != version:
+            if not self._claim():
+                time.sleep(SEED_POLL_S)
+                continue
+            try:
+                if self.version() == version:
+                    return False # Committed by another writer since our last check
+                self.clear()
+                seed()
+                self._write_header(version)
+                return True
+            finally:
+                os.remove(self.claim_file)
+        return False
+
+    def _claim(self):
+        os.makedirs(self.directory, exist_ok=True)
+        try:
+            os.close(os.open(self.claim_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            pass
+        try:
+            if time.time() - os.path.getmtime(self.claim_file) < CLAIM_STALE_S:
+                return False
+            os.remove(self.claim_file)
+        except FileNotFoundError:
+            pass # Released meanwhile
+        return self._claim()
+
+    def _write_header(self, version):
+        tmp_file = self.header_file + ".tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump({"dim": self.dim, "version": version, "epoch": uuid.uuid4().hex}, f)
+        os.replace(tmp_file, self.header_file)
+
+    @property
+    def vectors(self):
+        """Read-only (n, dim) memmap over the committed rows."""
+        n = len(self)
+        if n == 0:
+            return np.empty((0, self.dim), dtype=np.float32)
+        if self._vectors is None or len(self._vectors) != n:
+            self._vectors = np.memmap(self.vec_file, dtype=np.float32, mode='r', shape=(n, self.dim))
+        return self._vectors
+
+    def _offset(self, i):
+        n = len(self)
+        if self._offsets is None or len(self._offsets) != n:
+            self._offsets = np.memmap(self.idx_file, dtype='<i8', mode='r', shape=(n,))
+        return int(self._offsets[i])
+
+    def meta(self, i):
+        with open(self.meta_file, 'rb') as f:
+            f.seek(self._offset(i))
+            return json.loads(f.readline())
+
+    def append(self, vectors, metas):
+        """Bulk-appends rows. vectors: (n, dim) array, metas: list of n JSON-serializable dicts."""
+        vectors = np.ascontiguousarray(np.atleast_2d(vectors), dtype=np.float32)
+        if vectors.shape[1] != self.dim or len(vectors) != len(metas):
+            raise ValueError(f"Expected {len(metas)} vectors of dim {self.dim}, got {vectors.shape}")
+
+        lines = [json.dumps(meta).encode() + b"\n" for meta in metas]
+        with self._lock:
+            with open(self.meta_file, 'ab') as f:
+                start = f.tell()
+                f.write(b"".join(lines))
+            offsets = start + np.cumsum([0] + [len(line) for line in lines[:-1]])
+            with open(self.vec_file, 'ab') as f:
+                f.write(vectors.tobytes())
+            # Offsets last: this is what makes the new rows visible to readers
+            with open(self.idx_file, 'ab') as f:
+                f.write(offsets.astype('<i8').tobytes())
+            self._generation += 1
+
+# Process-wide registry so every council shares one handle (and one page cache) per store
+_STORES = {}
+_STORES_LOCK = threading.Lock()
+
+def open_store(directory, name, dim):
+    key = (os.path.abspath(directory), name)
+    with _STORES_LOCK:
+        if key not in _STORES:
+            _STORES[key] = KnowledgeStore(directory, name, dim)
+        return _STORES[key]
+
+def reset_store_dir(directory):
+    """Deletes a knowledge base directory and forgets its open handles."""
+    root = os.path.abspath(directory)
+    with _STORES_LOCK:
+        for key in [k for k in _STORES if k[0] == root]:
+            del _STORES[key]
+    shutil.rmtree(directory, ignore_errors=True)
+
+class PersistentVectorDB:
+    """Drop-in replacement for MockVectorDB backed by a KnowledgeStore."""
+    QUERY_CHUNK = 65536
+
+    def __init__(self, store, index=None):
+        self.store = store
+        self.index = index
+        self._index_epoch = None
+
+    def __len__(self):
+        return len(self.store)
+
+    @property
+    def vectors(self):
+        return self.store.vectors
+
+    @property
+    def version(self):
+        # Bumped by every write or clear, also another process's
+        return self.store.generation()
+
+    def add(self, vector, meta):
+        self.add_batch([vector], [meta])
+
+    def add_batch(self, vectors, metas):
+        self.store.append(vectors, metas)
+
+    def _sync_index(self):
+        # Rows appended by this or another process are indexed lazily on the next query;
+        # a cleared or rebuilt store (same, fewer or more rows) is re-indexed from scratch
+        n = len(self.store)
+        epoch = self.store.epoch()
+        if epoch != self._index_epoch or self.index.size > n:
+            self.index.reset()
+            self._index_epoch = epoch
+        if self.index.size < n:
+            self.index.add(self.store.vectors[self.index.size:n])
+
+    @timed("vector_query", store="persistent")
+    def query(self, query_vector, k=1):
+        n = len(self.store)
+        if n == 0:
+            return []
+
+        if self.index is not None:
+            self._sync_index()
+            scores, ids = self.index.search(query_vector, k=k)
+            return [(float(score), self.store.meta(int(i))) for score, i in zip(scores, ids)]
+
+        # Exact cosine scan, chunked so the memmap is never fully materialized
+        q = np.asarray(query_vector, dtype=np.float32)
+        q_norm = np.linalg.norm(q)
+        vectors = self.store.vectors
+        best_scores = np.empty(0, dtype=np.float32)
+        best_ids = np.empty(0, dtype=np.int64)
+        for start in range(0, n, self.QUERY_CHUNK):
+            chunk = vectors[start:start + self.QUERY_CHUNK]
+            norms = np.linalg.norm(chunk, axis=1) * q_norm
+            scores = np.divide(chunk @ q, norms, out=np.zeros(len(chunk), dtype=np.float32), where=norms > 0)
+            best_scores = np.concatenate([best_scores, scores])
+            best_ids = np.concatenate([best_ids, np.arange(start, start + len(chunk))])
+            if len(best_scores) > k:
+                keep = np.argpartition(-best_scores, k - 1)[:k]
+                best_scores, best_ids = best_scores[keep], best_ids[keep]
+
+        order = np.argsort(-best_scores, kind="stable")[:k]
+        return [(float(best_scores[i]), self.store.meta(int(best_ids[i]))) for i in order]
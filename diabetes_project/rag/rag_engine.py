@@ -1,19 +1,72 @@
+import copy
 import numpy as np
 import json
+from diabetes_project.rag.knowledge_store import KNOWLEDGE_DIR, PersistentVectorDB, open_store
+from diabetes_project.rag.retrieval_cache import RetrievalCache, shared_cache
+from diabetes_project.rag.embedder import HashingEmbedder
+from diabetes_project.telemetry import timed
+
+# Bump when the seeded knowledge or the embedder changes so persisted stores get rebuilt
+KNOWLEDGE_VERSION = 2
+SIGNAL_DIM = 5
+TEXT_DIM = 128
+
+ORGANS = ['glucose', 'kidney', 'retina', 'heart', 'nerve']
+# Clinical vocabulary used to phrase a drift alert for literature search
+ORGAN_TERMS = {
+    'glucose': "glucose hyperglycemia glycemic",
+    'kidney': "kidney nephropathy renal",
+    'retina': "retina retinopathy",
+    'heart': "heart cardiovascular CVD",
+    'nerve': "nerve neuropathy"
+}
+
+SEED_LITERATURE = [
+    {"title": "Diabetic Nephropathy & CVD", "content": "Kidney dysfunction accelerates heart failure risks."},
+    {"title": "Retinopathy Stages", "content": "Proliferative retinopathy follows sustained hyperglycemia."},
+    {"title": "Peripheral Neuropathy", "content": "Nerve damage progresses with long-term glycemic variability."},
+    {"title": "Glycemic Control Targets", "content": "Tight glucose control delays microvascular complications."}
+]
 
 class MockVectorDB:
-    """Simulates a Vector Database (like ChromaDB) for prototype."""
-    def __init__(self):
+    """
+    Simulates a Vector Database (like ChromaDB) for prototype.
+    Optionally backed by an ANN index (e.g. IVFIndex) for large case bases;
+    without one, queries are an exact brute-force scan.
+    """
+    def __init__(self, index=None):
         self.vectors = []
         self.metadata = []
+        self.index = index
+        self.generation = 0
+
+    def __len__(self):
+        return len(self.vectors)
+
+    @property
+    def version(self):
+        # Bumped by every write
+        return self.generation
 
     def add(self, vector, meta):
         self.vectors.append(vector)
         self.metadata.append(meta)
+        self.generation += 1
+        if self.index is not None:
+            self.index.add(vector)
+
+    def add_batch(self, vectors, metas):
+        for vector, meta in zip(vectors, metas):
+            self.add(vector, meta)
 
+    @timed("vector_query", store="memory")
     def query(self, query_vector, k=1):
         if not self.vectors:
             return []
+
+        if self.index is not None:
+            scores, ids = self.index.search(query_vector, k=k)
+            return [(float(score), self.metadata[i]) for score, i in zip(scores, ids)]
         
         # Cosine Similarity
         scores = []
@@ -31,44 +84,106 @@ class MockVectorDB:
         return scores[:k]
 
 class MultimodalRAG:
-    def __init__(self):
-        self.signal_db = MockVectorDB() # For time-series embeddings
-        self.text_db = MockVectorDB()   # For medical literature embeddings
-        
-        # Seed with some dummy medical knowledge
-        self._seed_knowledge()
+    def __init__(self, signal_index=None, store_dir=KNOWLEDGE_DIR, cache=None, embedder=None):
+        """
+        signal_index: optional ANN backend (e.g. IVFIndex) for a population-scale case base
+        store_dir: persisted, memory-mapped knowledge base shared by all councils and
+                   worker processes. None keeps a private in-memory knowledge base.
+        cache: RetrievalCache for repeated drift vectors. Defaults to the cache shared
+               by all users of store_dir with the same embedder and index settings
+               (or a private one for in-memory knowledge).
+        embedder: text embedder for literature ingestion and drift-alert queries.
+        """
+        self.embedder = embedder or HashingEmbedder(dim=TEXT_DIM)
+        self._idf = None
+        self._idf_version = None
+        if cache is None:
+            cache = shared_cache(store_dir, self.embedder, signal_index) if store_dir else RetrievalCache()
+        self.cache = cache
+        if store_dir:
+            signal_store = open_store(store_dir, "signals", SIGNAL_DIM)
+            text_store = open_store(store_dir, "literature", TEXT_DIM)
+            self.signal_db = PersistentVectorDB(signal_store, index=signal_index) # For time-series embeddings
+            self.text_db = PersistentVectorDB(text_store)                         # For medical literature embeddings
+
+            # Seed each store once per knowledge version; every later construction is an O(1) open
+            signal_store.ensure(KNOWLEDGE_VERSION, self._seed_cases)
+            text_store.ensure(KNOWLEDGE_VERSION, self._seed_literature)
+        else:
+            self.signal_db = MockVectorDB(index=signal_index) # For time-series embeddings
+            self.text_db = MockVectorDB()   # For medical literature embeddings
+
+            # Seed with some dummy medical knowledge
+            self._seed_knowledge()
 
     def _seed_knowledge(self):
-        # 1. Literature
-        self.text_db.add(np.random.rand(128), {"title": "Diabetic Nephropathy & CVD", "content": "Kidney dysfunction accelerates heart failure risks."})
-        self.text_db.add(np.random.rand(128), {"title": "Retinopathy Stages", "content": "Proliferative retinopathy follows sustained hyperglycemia."})
-        
-        # 2. Historical Cases (Patient Signals)
+        self._seed_literature()
+        self._seed_cases()
+
+    def _seed_literature(self):
+        self.add_literature(SEED_LITERATURE)
+
+    def _seed_cases(self):
+        # Historical Cases (Patient Signals)
         # Vector represents [Glucose, Kidney, Retina, Heart, Nerve] drift
-        self.signal_db.add(np.array([0.8, 0.9, 0.1, 0.6, 0.1]), {"patient_id": "H001", "outcome": "Heart Attack within 6 months"})
-        self.signal_db.add(np.array([0.9, 0.2, 0.8, 0.1, 0.1]), {"patient_id": "H002", "outcome": "Blindness within 1 year"})
+        self.signal_db.add_batch(np.array([[0.8, 0.9, 0.1, 0.6, 0.1], [0.9, 0.2, 0.8, 0.1, 0.1]]), [
+            {"patient_id": "H001", "outcome": "Heart Attack within 6 months"},
+            {"patient_id": "H002", "outcome": "Blindness within 1 year"}
+        ])
+
+    def add_cases(self, drift_vectors, metas):
+        """Bulk-ingests historical cases into the (shared) signal knowledge base."""
+        self.signal_db.add_batch(np.asarray(drift_vectors, dtype=np.float32), metas)
+
+    def add_literature(self, documents):
+        """Batch-embeds documents ({"title", "content"}) and ingests them into text_db."""
+        texts = [f"{doc['title']}. {doc['content']}" for doc in documents]
+        self.text_db.add_batch(self.embedder.embed_batch(texts), documents)
+
+    @staticmethod
+    def alert_text(drift_vector, threshold=0.5):
+        """Phrases a drift vector [Glucose, Kidney, Retina, Heart, Nerve] as a drift-alert query."""
+        drifting = [organ for organ, value in zip(ORGANS, drift_vector) if value >= threshold]
+        if not drifting:
+            drifting = [ORGANS[int(np.argmax(drift_vector))]]
+        return "Drift alert: " + " ".join(ORGAN_TERMS[organ] for organ in drifting)
+
+    def _literature_idf(self):
+        # Recomputed only when the literature collection changes
+        if self._idf_version != self.text_db.version:
+            self._idf = HashingEmbedder.idf_from_vectors(self.text_db.vectors)
+            self._idf_version = self.text_db.version
+        return self._idf
 
     def retrieve_context(self, current_drift_vector):
         """
         Retrieves both similar past cases and relevant literature.
         current_drift_vector: np.array of shape (5,)
+        Repeated (quantized) drift vectors are served from the cache until the
+        knowledge base gains new entries.
         """
+        index_version = (self.signal_db.version, self.text_db.version)
+        cache_key = self.cache.key(current_drift_vector)
+        cached = self.cache.get(cache_key, index_version)
+        if cached is not None:
+            # Deep copies: callers may mutate the nested case / paper records
+            return copy.deepcopy(cached)
+
         # 1. Find similar patients (Signal Search)
-        # We project the 5-dim drift vector to 128-dim for 'embedding' simulation
-        # In reality, we'd use a Time-Series Encoder (e.g., LSTM last state)
-        # Here we just pad it for the mock
-        query_sig = np.pad(current_drift_vector, (0, 128-5))
+        # The 5-dim drift vector is compared directly against stored case profiles
         similar_cases = self.signal_db.query(current_drift_vector, k=1)
-        
+
         # 2. Find literature (Text Search)
-        # In reality, we'd embed the Drift Alert text. Here we use random for mock.
-        query_text = np.random.rand(128) 
-        literature = self.text_db.query(query_text, k=1)
+        # Embed the drift-alert text (cached per distinct alert) and IDF-weight the query
+        query_text = self.embedder.embed(self.alert_text(current_drift_vector))
+        literature = self.text_db.query(query_text * self._literature_idf(), k=1)
         
-        return {
+        context = {
             "similar_case": similar_cases[0][1] if similar_cases else None,
             "relevant_paper": literature[0][1] if literature else None
         }
+        self.cache.put(cache_key, index_version, context)
+        return copy.deepcopy(context)
 
 if __name__ == "__main__":
     rag = MultimodalRAG()
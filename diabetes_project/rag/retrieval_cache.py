@@ -0,0 +1,104 @@
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+
+class RetrievalCache:
+    """
+    LRU cache of retrieve_context results keyed on a quantized drift vector.
+
+    Drift vectors are snapped to a grid of `resolution` so patients in
+    near-identical risk states share an entry. The key also carries the
+    knowledge-base version (the generations of signal_db and text_db, bumped by
+    every write or clear); when either changes, every entry is dropped on the
+    next lookup.
+    """
+    def __init__(self, max_entries=1024, resolution=0.05):
+        self.max_entries = max_entries
+        self.resolution = resolution
+        self.entries = OrderedDict()
+        self.index_version = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+
+    def key(self, drift_vector):
+        cells = np.round(np.asarray(drift_vector, dtype=np.float64) / self.resolution).astype(np.int64)
+        return tuple(cells.tolist())
+
+    def _check_version(self, index_version):
+        if index_version != self.index_version:
+            if self.entries:
+                self.invalidations += 1
+            self.entries.clear()
+            self.index_version = index_version
+
+    def get(self, key, index_version):
+        with self._lock:
+            self._check_version(index_version)
+            value = self.entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, index_version, value):
+        with self._lock:
+            self._check_version(index_version)
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self.entries),
+            "invalidations": self.invalidations
+        }
+
+# One cache per persisted knowledge base and retrieval settings, shared by every council that opens it
+_SHARED_CACHES = {}
+_SHARED_CACHES_LOCK = threading.Lock()
+
+def _settings_key(component):
+    if component is None:
+        return None
+    return (type(component).__name__, tuple(sorted(component.settings().items())))
+
+def shared_cache(store_dir, embedder=None, index=None):
+    """
+    The cache for store_dir under this embedder and signal index. Components
+    without settings() can't be compared, so they get a private cache.
+    """
+    if any(c is not None and not hasattr(c, "settings") for c in (embedder, index)):
+        return RetrievalCache()
+    key = (os.path.abspath(store_dir), _settings_key(embedder), _settings_key(index))
+    with _SHARED_CACHES_LOCK:
+        if key not in _SHARED_CACHES:
+            _SHARED_CACHES[key] = RetrievalCache()
+        return _SHARED_CACHES[key]
+
+def shared_cache_stats(store_dir):
+    """stats() summed over every shared cache of store_dir (one per retrieval settings)."""
+    root = os.path.abspath(store_dir)
+    with _SHARED_CACHES_LOCK:
+        caches = [cache for key, cache in _SHARED_CACHES.items() if key[0] == root]
+    totals = {"hits": 0, "misses": 0, "entries": 0, "invalidations": 0}
+    for cache in caches:
+        stats = cache.stats()
+        for name in totals:
+            totals[name] += stats[name]
+    lookups = totals["hits"] + totals["misses"]
+    totals["hit_rate"] = totals["hits"] / lookups if lookups else 0.0
+    return totals
@@ -0,0 +1,207 @@
+"""
+Lightweight in-process instrumentation.
+
+    from diabetes_project.telemetry import timed, counter
+
+    @timed("drift_detect")              # histogram diabetes_drift_detect_seconds
+    def detect(...): ...
+
+    with timed("vector_query", store="memory"):
+        ...
+
+    counter("blocks_mined").inc()       # counter diabetes_blocks_mined_total
+
+Everything lands in the process-wide REGISTRY, rendered in the Prometheus text
+format by REGISTRY.render() (served at GET /metrics). Set DIABETES_METRICS=0 to
+make @timed a no-op (functions are returned undecorated).
+"""
+import bisect
+import functools
+import logging
+import os
+import threading
+import time
+
+ENABLED = os.environ.get("DIABETES_METRICS", "1") != "0"
+PREFIX = "diabetes_"
+
+# Seconds; spans sub-millisecond NumPy calls up to multi-second mining/training
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Histogram:
+    def __init__(self, name, help="", buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.series = {}  # label key -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[i] += 1
+            series[-1] += value
+
+    def summary(self, **labels):
+        series = self.series.get(_label_key(labels))
+        if series is None:
+            return {"count": 0, "sum": 0.0}
+        count = sum(series[:-1])
+        return {"count": count, "sum": series[-1], "mean": series[-1] / count}
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(key, list(series)) for key, series in self.series.items()]
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(key, [('le', bound)])} {cumulative}")
+            cumulative += series[len(self.buckets)]
+            lines.append(f"{self.name}_bucket{_format_labels(key, [('le', '+Inf')])} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {series[-1]!r}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {cumulative}")
+        return lines
+
+class Counter:
+    def __init__(self, name, help=""):
+        self.name = name
+        self.help = help
+        self.series = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self.series[key] = self.series.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self.series.get(_label_key(labels), 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = list(self.series.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(key)} {_format_value(value)}")
+        return lines
+
+class Registry:
+    """
+    Named histograms and counters, plus collectors: callables returning
+    {metric_name: value} gauges read at scrape time (executor queue depth,
+    cache hit rates, ...).
+    """
+    def __init__(self):
+        self.metrics = {}
+        self.collectors = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, help, **kwargs):
+        with self._lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(name, help, **kwargs)
+            return metric
+
+    def histogram(self, name, help="", buckets=DEFAULT_BUCKETS):
+        return self._get(Histogram, PREFIX + name + "_seconds", help, buckets=buckets)
+
+    def counter(self, name, help=""):
+        return self._get(Counter, PREFIX + name + "_total", help)
+
+    def register_collector(self, name, fn):
+        """fn() -> {gauge_name: number}; exported as diabetes_<name>_<gauge_name>."""
+        self.collectors[name] = fn
+
+    def render(self):
+        lines = []
+        for metric in list(self.metrics.values()):
+            lines += metric.render()
+        for name, fn in list(self.collectors.items()):
+            try:
+                gauges = fn()
+            except Exception as e:
+                logging.getLogger(__name__).warning("collector %s failed: %s", name, e)
+                continue
+            for gauge, value in gauges.items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                metric = f"{PREFIX}{name}_{gauge}"
+                lines += [f"# TYPE {metric} gauge", f"{metric} {_format_value(value)}"]
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+def counter(name, help=""):
+    return REGISTRY.counter(name, help)
+
+class timed:
+    """Times a block or function into the diabetes_<name>_seconds histogram."""
+    def __init__(self, name, help="", **labels):
+        self.histogram = REGISTRY.histogram(name, help or f"Latency of {name}")
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if ENABLED:
+            self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+    def __call__(self, fn):
+        if not ENABLED:
+            return fn
+        histogram, labels = self.histogram, self.labels
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start, **labels)
+        return wrapper
+
+def configure_logging(level=None):
+    """
+    Sets up key=value log lines for the diabetes_project loggers. Level comes
+    from DIABETES_LOG_LEVEL (default WARNING), so per-call debug/info records
+    are dropped before any formatting happens.
+    """
+    level = level or os.environ.get("DIABETES_LOG_LEVEL", "WARNING")
+    logger = logging.getLogger("diabetes_project")
+    logger.setLevel(level.upper() if isinstance(level, str) else level)
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(asctime)s level=%(levelname)s logger=%(name)s %(message)s"))
+        logger.addHandler(handler)
+    return logger
+
+if __name__ == "__main__":
+    @timed("demo_sleep")
+    def nap():
+        time.sleep(0.002)
+    for _ in range(5):
+        nap()
+    counter("demo_calls").inc(5)
+    print(REGISTRY.render())
@@ -0,0 +1,275 @@
+import sys
+import os
+import io
+import time
+import numpy as np
+import torch
+import pytest
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from fastapi.testclient import TestClient
+from diabetes_project.api.main import app, get_session
+from diabetes_project.blockchain.ledger import BlockchainLedger
+from diabetes_project.data.patient_simulator import PatientDataSimulator
+
+client = TestClient(app)
+
+@pytest.fixture(autouse=True, scope="module")
+def event_loop_client():
+    # Jobs run as tasks on the app's event loop, so keep one loop alive across requests
+    with client:
+        yield client
+
+def make_session(patient_id, tmp_path, days=60):
+    """Uploads a short simulated history and points the ledger at a scratch chain."""
+    # Seeded: the session's detector is trained (and so drift is found) deterministically
+    np.random.seed(0)
+    torch.manual_seed(0)
+    sim = PatientDataSimulator(patient_id, days=days)
+    # Steep enough that GFR leaves the training range by far, whatever the session's model
+    df = sim.inject_drift(sim.generate_healthy_baseline(), start_day=days // 2, organ='kidney', intensity=2.0)
+    csv = io.BytesIO(df.drop(columns=['date']).to_csv(index=False).encode())
+    res = client.post(f"/api/upload_data/{patient_id}", files={"file": ("data.csv", csv, "text/csv")})
+    assert res.json()["status"] == "success"
+    get_session(patient_id)["council"].ledger = BlockchainLedger(chain_file=str(tmp_path / f"{patient_id}.json"), difficulty=1)
+
+def wait_for(job_id, timeout=120):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = client.get(f"/api/jobs/{job_id}").json()
+        if job["status"] in ("done", "failed"):
+            return job
+        time.sleep(0.1)
+    raise TimeoutError(job_id)
+
+def test_analysis_job(tmp_path):
+    print("Testing background analysis jobs...")
+    make_session("T001", tmp_path)
+    res = client.post("/api/analyze/T001")
+    assert res.status_code == 202
+    job = wait_for(res.json()["job_id"])
+    assert job["status"] == "done", job.get("error")
+    assert job["progress"]["days_processed"] == 60
+    assert len(job["result"]["history"]) == 60
+    # Every drift day got its (batch-mined) block
+    assert all((h["block_hash"] != "0") == h["is_anomaly"] for h in job["result"]["history"])
+    # Blocks record which weights scored the event, not the weights themselves
+    blocks = get_session("T001")["council"].ledger.chain[1:]
+    assert blocks and all(len(b.data["model_version"]["hash"]) == 64 for b in blocks)
+    assert all("commitment" in b.data["zk_proof"] for b in blocks), "Each drift block keeps its proof"
+    # The prover's weight commitment is cached under the same content hash
+    assert ("drift_detector", blocks[0].data["model_version"]["hash"]) in get_session("T001")["zk_prover"]._weight_hashes
+    summary = job["result"]["summary"]
+    assert set(summary["projected_risks"]["kidney"]["bands"]) == {"1m", "3m", "6m", "12m"}
+    assert isinstance(summary["projected_risks"]["kidney"]["12m"], float)
+    # A fixed scenario count, so bands are reproducible across workers
+    assert summary["risk_projection"]["scenarios"] == 4096
+
+    # Same data -> cached job; new upload -> fresh job
+    assert client.post("/api/analyze/T001").json() == {"job_id": job["job_id"], "status": "done", "cached": True}
+    make_session("T001", tmp_path)
+    assert client.post("/api/analyze/T001").json()["job_id"] != job["job_id"]
+
+    assert client.get("/api/jobs/missing").status_code == 404
+
+def test_history_shaping(tmp_path):
+    print("\nTesting downsampled / paginated / columnar history...")
+    make_session("T002", tmp_path, days=120)
+    job = wait_for(client.post("/api/analyze/T002").json()["job_id"])
+
+    lttb = client.get(f"/api/jobs/{job['job_id']}?downsample=lttb&points=30").json()["result"]
+    days = [h["day"] for h in lttb["history"]]
+    assert len(days) == 30 and days[0] == 0 and days[-1] == 119 and days == sorted(days)
+
+    minmax = client.get(f"/api/jobs/{job['job_id']}?downsample=minmax&points=20").json()["result"]
+    errors = [h["drift_error"] for h in job["result"]["history"]]
+    assert max(errors) in [h["drift_error"] for h in minmax["history"]], "Min/max bucketing must keep the global peak"
+
+    # Follow cursors through the raw days
+    seen, cursor = [], None
+    while True:
+        url = f"/api/jobs/{job['job_id']}?limit=50&layout=columnar" + (f"&cursor={cursor}" if cursor else "")
+        result = client.get(url).json()["result"]
+        seen += result["history"]["day"]
+        cursor = result["history_page"]["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == list(range(120))
+    assert client.get(f"/api/jobs/{job['job_id']}?cursor=garbage").status_code == 400
+    # Only numeric scalar fields can drive downsampling
+    for field in ("vitals", "predictions", "block_hash"):
+        assert client.get(f"/api/jobs/{job['job_id']}?downsample=lttb&field={field}").status_code == 400
+
+def test_binary_encoding(tmp_path):
+    print("\nTesting Accept-negotiated binary encoding...")
+    msgpack = pytest.importorskip("msgpack")
+    make_session("T003", tmp_path)
+    job = wait_for(client.post("/api/analyze/T003").json()["job_id"])
+
+    res = client.get(f"/api/jobs/{job['job_id']}", headers={"Accept": "application/msgpack"})
+    assert res.headers["content-type"] == "application/msgpack"
+    history = msgpack.unpackb(res.content)["result"]["history"]
+    errors = np.frombuffer(history["drift_error"]["data"], dtype=history["drift_error"]["dtype"])
+    expected = [h["drift_error"] for h in job["result"]["history"]]
+    assert np.allclose(errors, expected, rtol=1e-6)
+    assert len(res.content) < len(client.get(f"/api/jobs/{job['job_id']}").content)
+
+    # JSON stays the default
+    assert client.get(f"/api/jobs/{job['job_id']}", headers={"Accept": "*/*"}).headers["content-type"] == "application/json"
+
+def test_explain_empty_knowledge(tmp_path):
+    print("\nTesting explanations before the knowledge base has entries...")
+    from diabetes_project.rag.rag_engine import MockVectorDB
+    from diabetes_project.rag.retrieval_cache import RetrievalCache
+    make_session("T006", tmp_path)
+    rag = get_session("T006")["council"].rag
+    rag.signal_db, rag.text_db, rag.cache = MockVectorDB(), MockVectorDB(), RetrievalCache()
+    res = client.post("/api/explain", json={"patient_id": "T006", "organ_drifts": {"kidney": 0.9}})
+    assert res.status_code == 200
+    assert res.json()["similar_case"] is None and res.json()["source"] is None
+
+def test_json_non_finite():
+    print("\nTesting strict JSON for non-finite floats...")
+    import json
+    from diabetes_project.api.encoding import dumps_json
+    payload = {"summary": {"mse_drift": float("nan"), "risk_score": np.float32("inf")},
+               "history": [{"day": 0, "drift_error": np.array([1.0, -np.inf])}]}
+    decoded = json.loads(dumps_json(payload), parse_constant=lambda name: pytest.fail(f"emitted {name}"))
+    assert decoded == {"summary": {"mse_drift": None, "risk_score": None},
+                       "history": [{"day": 0, "drift_error": [1.0, None]}]}
+
+def test_session_executor():
+    print("\nTesting per-patient serialization and the concurrency limit...")
+    import asyncio
+    from diabetes_project.api.execution import SessionExecutor
+
+    executor = SessionExecutor(max_workers=4, max_concurrency=2)
+    active, peak = {"A": 0, "all": 0}, {"A": 0, "all": 0}
+    def work(patient_id):
+        for key in (patient_id, "all"):
+            active[key] = active.get(key, 0) + 1
+            peak[key] = max(peak.get(key, 0), active[key])
+        time.sleep(0.05)
+        for key in (patient_id, "all"):
+            active[key] -= 1
+
+    async def main():
+        await asyncio.gather(*[executor.run(work, p, patient_id=p) for p in ["A", "A", "A", "B", "C"]])
+    asyncio.run(main())
+    executor.shutdown()
+
+    assert peak["A"] == 1, "One patient's work must never overlap"
+    assert peak["all"] <= 2
+    stats = executor.stats()
+    assert stats["completed"] == 5 and stats["queued"] == 0 and stats["running"] == 0
+    import gc
+    gc.collect()
+    assert len(executor._locks) == 0, "Idle patients' locks must not accumulate"
+
+    # Session creation locks are dropped once the session exists
+    import threading
+    from diabetes_project.api import main
+    sessions = []
+    threads = [threading.Thread(target=lambda: sessions.append(get_session("T007"))) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(sessions) == 4 and all(s is sessions[0] for s in sessions)
+    assert "T007" not in main._session_locks
+
+    assert client.get("/api/executor").json()["max_concurrency"] >= 1
+
+def test_metrics(tmp_path):
+    print("\nTesting /metrics exposition...")
+    make_session("T004", tmp_path)
+    wait_for(client.post("/api/analyze/T004").json()["job_id"])
+
+    res = client.get("/metrics")
+    assert res.headers["content-type"].startswith("text/plain")
+    text = res.text
+    for metric in ["diabetes_drift_train_seconds_count", "diabetes_drift_detect_seconds_bucket",
+                   "diabetes_graph_forward_seconds_sum", "diabetes_mine_block_seconds_count",
+                   "diabetes_save_chain_seconds_count", "diabetes_blocks_mined_total",
+                   "diabetes_executor_running", "diabetes_jobs_done"]:
+        assert metric in text, metric
+    assert 'route="/api/analyze/{patient_id}"' in text
+
+    # Buckets are cumulative and end at +Inf == count
+    lines = [l for l in text.splitlines() if l.startswith("diabetes_analysis_seconds_")]
+    counts = [float(l.rsplit(" ", 1)[1]) for l in lines if "_bucket" in l]
+    assert counts == sorted(counts)
+    assert counts[-1] == float([l for l in lines if "_count" in l][0].rsplit(" ", 1)[1])
+
+def test_profiling(tmp_path):
+    print("\nTesting opt-in request profiling...")
+    from diabetes_project.api import profiling
+    from diabetes_project.models import numpy_backend
+    make_session("T005", tmp_path)
+
+    # Disabled by config: the switch is ignored
+    assert "profile_id" not in client.post("/api/analyze/T005?profile=sampling").json()
+
+    enabled = profiling.ENABLED
+    profiling.ENABLED = True
+    try:
+        for mode in ("sampling", "cprofile"):
+            res = client.post("/api/analyze/T005", headers={"X-Profile": mode, "X-Request-ID": f"req-{mode}"}).json()
+            assert res["profile_id"] == f"req-{mode}" and res["cached"] is False
+            assert wait_for(res["job_id"])["status"] == "done"
+            report = client.get(f"/api/profiles/req-{mode}").json()
+            assert report["status"] == "done" and report["mode"] == mode
+            if numpy_backend.BACKEND == "torch":
+                assert any(op["op"].startswith("aten::") for op in report["torch_ops"])
+
+        collapsed = client.get("/api/profiles/req-sampling?format=collapsed").text
+        assert "run_analysis" in collapsed
+        assert "run_analysis" in client.get("/api/profiles/req-cprofile?format=pstats").text
+        assert client.get("/api/profiles/req-sampling?format=pstats").status_code == 400
+
+        # A client-chosen ID can't overwrite another request's profile
+        res = client.post("/api/analyze/T005", headers={"X-Profile": "sampling", "X-Request-ID": "req-sampling"})
+        assert res.status_code == 409
+
+        # Overlapping sessions: only one records torch ops, neither fails
+        first = profiling.ProfileStore().start("sampling", "analyze")
+        second = profiling.ProfileStore().start("sampling", "analyze")
+        with first.section(), second.section():
+            pass
+        if first.torch_ops:
+            assert (first.torch_ops_skipped, second.torch_ops_skipped) == (0, 1)
+    finally:
+        profiling.ENABLED = enabled
+    assert client.get("/api/profiles/missing").status_code == 404
+
+def test_startup():
+    print("\nTesting lazy imports and warm-up configuration...")
+    import subprocess
+    from diabetes_project.api.warmup import parse_targets
+    assert parse_targets("0") == []
+    assert parse_targets("all") == ["dataset", "models", "ledger"]
+    assert parse_targets("ledger,dataset") == ["dataset", "ledger"]
+    with pytest.raises(ValueError):
+        parse_targets("everything")
+
+    # Importing the API must not pull in torch or pandas
+    code = "import sys, diabetes_project.api.main; print('torch' in sys.modules, 'pandas' in sys.modules)"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                         cwd=os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+    assert out.stdout.split() == ["False", "False"]
+
+    stats = client.get("/api/startup").json()
+    assert stats["first_response_s"] >= stats["ready_s"] >= stats["import_s"] > 0
+
+if __name__ == "__main__":
+    import tempfile, pathlib
+    with client:
+        test_analysis_job(pathlib.Path(tempfile.mkdtemp()))
+        test_history_shaping(pathlib.Path(tempfile.mkdtemp()))
+        test_explain_empty_knowledge(pathlib.Path(tempfile.mkdtemp()))
+        test_json_non_finite()
+        test_session_executor()
+        test_metrics(pathlib.Path(tempfile.mkdtemp()))
+        test_profiling(pathlib.Path(tempfile.mkdtemp()))
+        test_startup()
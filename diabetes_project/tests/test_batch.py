@@ -0,0 +1,69 @@
+import sys
+import os
+import json
+import numpy as np
+import pytest
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from diabetes_project.batch import run_batch, iter_synthetic_units, bounded_map, main
+from diabetes_project.blockchain.ledger import BlockchainLedger
+
+def test_batch_scoring(tmp_path):
+    print("Testing offline batch scoring...")
+    ledger = BlockchainLedger(chain_file=str(tmp_path / "chain.json"), difficulty=1)
+    units = iter_synthetic_units(n_patients=6, days=120, chunk_size=4)
+    stats = run_batch(units, str(tmp_path / "out"), workers=1, ledger=ledger)
+    print(stats)
+
+    assert stats["patients"] == 6 and stats["patient_days"] == 720
+    with open(tmp_path / "out" / "patients.jsonl") as f:
+        summaries = [json.loads(line) for line in f]
+    assert [s["patient_id"] for s in summaries] == [f"S{i:07d}" for i in range(6)]
+    with open(tmp_path / "out" / "days.jsonl") as f:
+        assert sum(1 for _ in f) == 720
+    assert len(ledger.chain) == 1 + stats["blocks"], "One block per drifting patient"
+    assert ledger.verify_chain()
+
+    # Windowed detection adds a per-day flag for the window ending that day
+    units = iter_synthetic_units(n_patients=2, days=120, chunk_size=2)
+    stats = run_batch(units, str(tmp_path / "windowed"), workers=1, window=7)
+    with open(tmp_path / "windowed" / "days.jsonl") as f:
+        days = [json.loads(line) for line in f]
+    assert not any(d["window_anomaly"] for d in days[:6])
+    assert stats["window_anomalies"] == sum(d["window_anomaly"] for d in days)
+
+def test_short_patients(tmp_path):
+    print("\nTesting patients too short to score...")
+    rng = np.random.default_rng(0)
+    values = lambda days: (rng.random((days, 4)) * [100, 90, 250, 50] + [50, 45, 125, 25]).astype(np.float32)
+    units = [[("EMPTY", values(0)), ("ONE", values(1)), ("OK", values(60))]]
+    stats = run_batch(units, str(tmp_path / "out"), workers=1)
+    assert stats["patients"] == 1 and stats["skipped"] == 2 and stats["patient_days"] == 60
+
+    # Window sizes below 2 are rejected up front
+    with pytest.raises(SystemExit):
+        main(["--synthetic", "2", "--window", "1", "--out", str(tmp_path / "w")])
+
+def test_bounded_submission():
+    print("\nTesting bounded work-unit submission...")
+    from concurrent.futures import ThreadPoolExecutor
+    pulled = []
+    def units():
+        for i in range(100):
+            pulled.append(i)
+            yield i
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        results = []
+        for result in bounded_map(pool, lambda x: x * x, units(), max_in_flight=4):
+            # Never more than 4 units pulled ahead of the consumer
+            assert len(pulled) - len(results) <= 4
+            results.append(result)
+    assert results == [i * i for i in range(100)]
+
+if __name__ == "__main__":
+    import tempfile, pathlib
+    test_batch_scoring(pathlib.Path(tempfile.mkdtemp()))
+    test_short_patients(pathlib.Path(tempfile.mkdtemp()))
+    test_bounded_submission()
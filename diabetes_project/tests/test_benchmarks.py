@@ -0,0 +1,27 @@
+import sys
+import os
+import json
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from diabetes_project.benchmarks.run import run_benchmarks, compare
+
+def test_benchmark_results():
+    print("Testing quick benchmark run...")
+    doc = run_benchmarks(only=["graph", "chain"], quick=True)
+    json.dumps(doc) # Must be JSON-serializable
+    assert set(doc["results"]) == {"graph", "chain"}
+    assert doc["results"]["chain"]["blocks_100"]["verify_s"] > 0
+    assert doc["meta"]["quick"] is True
+
+    # A run twice as slow everywhere is flagged; an identical run isn't
+    slower = {"results": {"graph": {case: {m: (v * 2 if m.endswith("_s") and not m.endswith("_per_s") else v / 2)
+                                          for m, v in metrics.items()}
+                                   for case, metrics in doc["results"]["graph"].items()}}}
+    _, regressions = compare(slower, doc)
+    assert "graph.rows_365.batched_s" in regressions
+    assert "graph.rows_365.batched_rows_per_s" in regressions
+    assert compare(doc, doc)[1] == []
+
+if __name__ == "__main__":
+    test_benchmark_results()
@@ -0,0 +1,89 @@
+import sys
+import os
+import numpy as np
+import pandas as pd
+import pytest
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from diabetes_project.data.patient_simulator import PatientDataSimulator, SIGNALS
+from diabetes_project.data.loader import RealWorldDataLoader, _DATASET_CACHE, CACHE_LOOKUPS, clear_dataset_cache
+from diabetes_project.data.population import PopulationDataset
+
+def test_cohort_generator():
+    print("Testing vectorized cohort generator...")
+    sim = PatientDataSimulator("C", days=120)
+    cohort = sim.generate_cohort(n_patients=50, seed=7)
+    assert cohort.shape == (50, 120, len(SIGNALS))
+    assert np.array_equal(cohort[:5], sim.generate_cohort(n_patients=5, seed=7)), "Patients must be reproducible per seed"
+    assert cohort[..., SIGNALS.index('spo2')].max() <= 100
+
+def test_batch_drift_matches_inject_drift():
+    print("\nTesting batch drift injection against inject_drift...")
+    sim = PatientDataSimulator("C", days=120)
+    df = sim.generate_healthy_baseline()
+    cohort = np.stack([df[SIGNALS].values.astype(np.float64)] * 2)
+
+    expected = sim.inject_drift(df.copy(), start_day=60, organ='retina', intensity=0.2)
+    sim.inject_drift_batch(cohort, patient_idx=[1], start_days=[60], organs=['retina'], intensities=[0.2])
+    assert np.allclose(cohort[1], expected[SIGNALS].values)
+    assert np.allclose(cohort[0], df[SIGNALS].values), "Other patients must be untouched"
+
+def test_loader_shared_cache(tmp_path):
+    print("\nTesting shared parsed-dataset cache...")
+    csv_path = str(tmp_path / "pima.csv")
+    with open(csv_path, "w") as f:
+        f.write("Glucose,BMI,Age,BloodPressure,SkinThickness\n")
+        f.write("".join(f"{100 + i},30,40,70,20\n" for i in range(30)))
+
+    first = RealWorldDataLoader("P001", csv_path).load_data()
+    second = RealWorldDataLoader("P002", csv_path).load_data()
+    assert os.path.abspath(csv_path) in _DATASET_CACHE
+    assert first.equals(second), "Councils should share the cached parse"
+    assert {'spo2', 'skin_temp', 'eda', 'activity'} <= set(first.columns)
+
+    first.loc[0, 'glucose'] = -1
+    assert RealWorldDataLoader("P003", csv_path).load_data().loc[0, 'glucose'] == 100, "Views must not write through to the cache"
+
+    # Rewriting the file invalidates the entry
+    with open(csv_path, "a") as f:
+        f.write("200,30,40,70,20\n")
+    os.utime(csv_path, ns=(0, os.stat(csv_path).st_mtime_ns + 10**9))
+    assert len(RealWorldDataLoader("P001", csv_path).load_data()) == 31
+
+    # Only simulated signals are imputed; other missing required columns are an error
+    bad_path = str(tmp_path / "no_nerve.csv")
+    with open(bad_path, "w") as f:
+        f.write("Glucose,BMI,Age,BloodPressure\n100,30,40,70\n")
+    with pytest.raises(ValueError, match="nerve"):
+        RealWorldDataLoader("P001", bad_path).load_data()
+
+    # Concurrent first loads parse the file once
+    import threading
+    clear_dataset_cache()
+    misses = CACHE_LOOKUPS.value(result="miss")
+    threads = [threading.Thread(target=RealWorldDataLoader("P001", csv_path).load_data) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert CACHE_LOOKUPS.value(result="miss") == misses + 1
+
+def test_population_sharding():
+    print("\nTesting population ingestion...")
+    loader = RealWorldDataLoader("P002", "diabetes_project/data/samples/patient_data.csv", rows_per_patient=24)
+    population = loader.population
+    assert len(population) == 32 and "P032" in population
+    p2 = loader.load_data()
+    assert len(p2) == 24
+    assert p2['glucose'].tolist() == population.df['glucose'].iloc[24:48].tolist()
+    assert not p2.equals(RealWorldDataLoader("P001", loader.csv_path, rows_per_patient=24).load_data())
+
+    df = pd.DataFrame({"pid": ["b", "a", "b", "a", "c"], "glucose": [1, 2, 3, 4, 5]})
+    by_id = PopulationDataset(df, id_column="pid")
+    assert by_id.get("b")['glucose'].tolist() == [1, 3], "Rows keep their order within a patient"
+    assert by_id.patient_ids() == ["a", "b", "c"]
+
+if __name__ == "__main__":
+    test_cohort_generator()
+    test_batch_drift_matches_inject_drift()
@@ -0,0 +1,57 @@
+import sys
+import os
+import numpy as np
+import torch
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from diabetes_project.data.patient_simulator import PatientDataSimulator
+from diabetes_project.federated.client import FederatedClient
+from diabetes_project.federated.server import FederatedServer
+from diabetes_project.federated.registry import ModelRegistry, weights_hash
+
+def test_versioned_rounds():
+    print("Testing versioned federated rounds...")
+    torch.manual_seed(0)
+    np.random.seed(0)
+    server = FederatedServer()
+    clients = [FederatedClient(f"P00{i}", PatientDataSimulator(f"P00{i}").generate_healthy_baseline()) for i in range(3)]
+    for client in clients:
+        server.register_client(client)
+    local = clients[0].detector.get_weights()["encoder.0.weight"].clone()
+
+    v1 = server.round()
+    assert v1.version == 1 and server.registry.publish(v1.state_dict()) is v1 # Same content, same version
+    assert torch.equal(clients[0].detector.get_weights()["encoder.0.weight"], local) # Averaging leaves clients untouched
+    assert clients[0].model_info()["version"] is None
+
+    # Clients pull lazily, on their next detection
+    clients[0].detect_drift(clients[0].monitoring_data[0])
+    assert clients[0].model_version == 1 and clients[0].model_info() == v1.info()
+    assert clients[1].model_version is None
+    # Updates for the next round come from the global model, even without scoring in between
+    assert weights_hash(clients[2].get_model_update()) == v1.hash
+
+    # Small updates travel as compressed XOR deltas and apply bit-exactly
+    state = v1.state_dict()
+    state["decoder.2.bias"] += 1e-4
+    v2 = server.registry.publish(state)
+    delta = server.registry.delta(1)
+    assert list(delta["changes"]) == ["decoder.2.bias"]
+    assert ModelRegistry.nbytes(delta) < ModelRegistry.nbytes(server.registry.delta(None))
+    assert clients[0].sync() and not clients[0].sync()
+    assert weights_hash(clients[0].detector.get_weights()) == v2.hash
+
+    # A client whose weights diverged locally falls back to the full model
+    clients[0].detector.update_weights({k: v + 1 for k, v in clients[0].detector.get_weights().items()})
+    assert clients[0].model_info()["version"] is None
+    state["decoder.2.bias"] += 1e-4
+    v3 = server.registry.publish(state)
+    assert clients[0].sync() and clients[0].model_info() == v3.info()
+
+    # A client that never synced gets the full latest model on first use
+    clients[1].detect_drift(clients[1].monitoring_data[0])
+    assert clients[1].model_info() == v3.info()
+
+if __name__ == "__main__":
+    test_versioned_rounds()
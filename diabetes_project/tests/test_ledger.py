@@ -0,0 +1,104 @@
+import sys
+import os
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from diabetes_project.blockchain.ledger import BlockchainLedger
+from diabetes_project.blockchain.zk_proof import ZKProver, ZKVerifier
+from diabetes_project.blockchain.contracts import ContractEngine, ContractRule, default_rules
+
+def test_batch_proofs(tmp_path):
+    print("Testing batched ZK proofs...")
+    prover = ZKProver("P001")
+    calls = []
+    class Weights:
+        def __str__(self):
+            calls.append(1)
+            return "weights-v1"
+
+    proofs = prover.generate_proofs(Weights(), [f"hash_{day}" for day in range(300)], model_version=1)
+    proofs += prover.generate_proofs(Weights(), ["hash_300"], model_version=1)
+    assert len(proofs) == 301
+    assert len(calls) == 1, "Weights must be committed once per model version"
+    assert len({p["challenge"] for p in proofs}) == 301
+
+    proofs[7]["response"] = "0" * 64
+    proofs[42]["timestamp"] -= 3600
+    del proofs[99]["challenge"]
+    ok, failures = ZKVerifier.verify_batch(proofs)
+    assert not ok
+    assert failures == {7: "Invalid ZK-Proof", 42: "Proof Expired", 99: "Malformed ZK-Proof"}
+    assert ZKVerifier.verify_batch(proofs[:5]) == (True, {})
+
+    # The ledger verifies Model Update proofs in one pass and rejects only the bad ones
+    ledger = BlockchainLedger(chain_file=str(tmp_path / "chain.json"), difficulty=1)
+    updates = [{"event": "Model Update", "round": i} for i in range(3)]
+    good = prover.generate_proofs(Weights(), ["r0", "r1", "r2"], model_version=2)
+    good[1]["response"] = "f" * 64
+    blocks = ledger.add_blocks(updates, good)
+    assert blocks[0] is not None and blocks[1] is None and blocks[2] is not None
+    assert ledger.verify_chain() and len(ledger.chain) == 3
+
+    # Proofs on other events are optional, but checked and kept when given
+    alerts = [{"day": 1, "error": 0.5}, {"day": 2, "error": 0.5}, {"day": 3, "error": 0.5}]
+    proofs = prover.generate_proofs(Weights(), ["d1", "d2"], model_version=2) + [None]
+    proofs[1]["response"] = "f" * 64
+    blocks = ledger.add_blocks(alerts, proofs)
+    assert blocks[0].data["zk_proof"] == proofs[0] and blocks[1] is None
+    assert blocks[2] is not None and "zk_proof" not in blocks[2].data
+
+def test_contract_engine(tmp_path):
+    print("\nTesting indexed smart contract rules...")
+    engine = ContractEngine(default_rules())
+    engine.register(ContractRule("critical_drift", "Drift Alert", "PAGE_ON_CALL", "Critical Drift > 0.95",
+                                 field="error", threshold=0.95, priority=10))
+    engine.register(ContractRule("cascade", "Drift Alert", "REVIEW_CASCADE", "Multi-organ drift",
+                                 predicate=lambda d: len(d.get("organs", [])) >= 2))
+    engine.register(ContractRule("low_glucose", "Glucose Reading", "ALERT_HYPO", "Glucose < 70", field="glucose", op="<", threshold=70))
+
+    payloads = [
+        {"event": "Drift Alert", "error": 0.99},
+        {"event": "Drift Alert", "error": 0.85},
+        {"event": "Drift Alert", "error": 0.3, "organs": ["kidney", "heart"]},
+        {"event": "Drift Alert", "error": "n/a"},
+        {"event": "Glucose Reading", "glucose": 55},
+        {"event": "Model Update", "error": 0.99},
+        {"day": 3, "error": 0.99}
+    ]
+    expected = ["PAGE_ON_CALL", "ESCALATE_TO_SPECIALIST", "REVIEW_CASCADE", None, "ALERT_HYPO", None, None]
+    batch = [r["contract_action"] if r else None for r in engine.execute_batch(payloads)]
+    single = [r["contract_action"] if r else None for r in map(engine.execute, payloads)]
+    assert batch == single == expected
+
+    # The ledger attaches the actions when mining
+    ledger = BlockchainLedger(chain_file=str(tmp_path / "chain.json"), difficulty=1, contracts=engine)
+    blocks = ledger.add_blocks([dict(p) for p in payloads[:2]])
+    assert [b.data["smart_contract_execution"]["contract_action"] for b in blocks] == expected[:2]
+    assert BlockchainLedger.SmartContract.execute({"event": "Drift Alert", "error": 0.9})["contract_action"] == "ESCALATE_TO_SPECIALIST"
+
+def test_shared_chain_file(tmp_path):
+    print("\nTesting concurrent writers on one chain file...")
+    import json
+    import threading
+    chain_file = str(tmp_path / "chain.json")
+    ledgers = [BlockchainLedger(chain_file=chain_file, difficulty=1) for _ in range(4)]
+    def write(ledger):
+        for day in range(20):
+            ledger.add_block({"event": "Drift Alert", "day": day, "error": 0.5})
+    threads = [threading.Thread(target=write, args=(ledger,)) for ledger in ledgers]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    # Whole-file replaces: the file is one writer's complete chain, no temp files left behind
+    with open(chain_file) as f:
+        assert len(json.load(f)) == 21
+    assert os.listdir(tmp_path) == ["chain.json"]
+    assert BlockchainLedger(chain_file=chain_file, difficulty=1).verify_chain()
+
+if __name__ == "__main__":
+    import tempfile, pathlib
+    test_batch_proofs(pathlib.Path(tempfile.mkdtemp()))
+    test_contract_engine(pathlib.Path(tempfile.mkdtemp()))
+    test_shared_chain_file(pathlib.Path(tempfile.mkdtemp()))
@@ -0,0 +1,217 @@
+import sys
+import os
+import subprocess
+import numpy as np
+import torch
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from numpy.lib.stride_tricks import sliding_window_view
+from diabetes_project.models.drift_detector import DriftDetector, StreamingPrefilter, window_means
+from diabetes_project.data.patient_simulator import PatientDataSimulator
+from diabetes_project.federated.client import FederatedClient
+from diabetes_project.models.propagation_graph import CausalOrganGraph
+from diabetes_project.models.calibration import P2Quantile, ThresholdCalibrator
+from diabetes_project.models.projection import RiskProjector, estimate_dynamics, HORIZONS
+from diabetes_project.models.numpy_backend import NumpyDriftDetector, NumpyCausalGraph, export_npz, load_npz
+
+def test_numpy_backend_parity(tmp_path):
+    print("Testing NumPy inference parity with torch...")
+    torch.manual_seed(0)
+    rng = np.random.default_rng(0)
+    train = torch.from_numpy(rng.random((90, 4), dtype=np.float32))
+    detector = DriftDetector(input_dim=4)
+    detector.train(train)
+    rows = rng.random((500, 4), dtype=np.float32) * 1.5
+
+    snapshot = NumpyDriftDetector.from_torch(detector)
+    torch_drift, torch_errors = detector.detect_batch(torch.from_numpy(rows))
+    np_drift, np_errors = snapshot.detect_batch(rows)
+    assert np.allclose(np_errors, torch_errors, rtol=1e-5, atol=1e-7)
+    assert (np_drift == torch_drift).all()
+    for row in rows[:20]:
+        t_drift, t_error = detector.detect(torch.from_numpy(row).unsqueeze(0))
+        n_drift, n_error = snapshot.detect(row)
+        assert n_drift == t_drift and abs(n_error - t_error) < 1e-6
+
+    graph = CausalOrganGraph()
+    np_graph = NumpyCausalGraph.from_torch(graph)
+    drifts = rng.random((200, 5), dtype=np.float32)
+    assert np.allclose(np_graph.forward_batch(drifts), graph.forward_batch(drifts), atol=1e-6)
+    # Single-row path includes the symbolic rules
+    drifts[0] = [0.1, 0.9, 0.1, 0.1, 0.1]
+    with torch.no_grad():
+        expected = graph(torch.from_numpy(drifts[0]))
+    actual = np_graph(drifts[0])
+    assert all(abs(actual[organ] - expected[organ]) < 1e-6 for organ in expected)
+
+    # Export -> load round trip, without torch objects
+    path = str(tmp_path / "weights.npz")
+    export_npz(path, detector=detector, graph=graph)
+    loaded_detector, loaded_graph = load_npz(path)
+    assert np.allclose(loaded_detector.detect_batch(rows)[1], np_errors)
+    assert np.allclose(loaded_graph.forward_batch(drifts), np_graph.forward_batch(drifts))
+
+def test_numpy_backend_is_torch_free():
+    print("\nTesting that the NumPy backend does not import torch...")
+    code = "import sys, diabetes_project.models.numpy_backend; print('torch' in sys.modules)"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                         cwd=os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+    assert out.stdout.strip() == "False"
+
+def test_drift_cascade():
+    print("\nTesting the prefilter -> autoencoder drift cascade...")
+    prefilter = StreamingPrefilter(k=0.5, h=5.0, z_max=4.0).fit(np.random.default_rng(0).normal(size=(200, 2)))
+    assert not any(prefilter.update([0.1, -0.2]) for _ in range(50))
+    assert prefilter.update([0.0, 6.0]) # One reading far out of range escalates immediately
+    prefilter.reset()
+    assert [prefilter.update([2.0, 0.0]) for _ in range(4)] == [False, False, False, True] # Sustained shift accumulates
+
+    torch.manual_seed(0)
+    np.random.seed(0)
+    sim = PatientDataSimulator("P001")
+    data = sim.inject_drift(sim.generate_healthy_baseline(), start_day=150, organ='kidney', intensity=0.3)
+    client = FederatedClient("P001", data)
+    full = np.array([client.detect_drift(row)[0] for row in client.monitoring_data])
+    cascade = client.enable_cascade(sample_rate=0.0, seed=0)
+    alerts = [client.monitor(day) for day in range(len(client.monitoring_data))]
+    screened = np.array([status["alert"] for status in alerts])
+
+    stats = cascade.stats()
+    print(stats)
+    assert stats["samples"] == len(full)
+    assert stats["escalation_rate"] < 1.0
+    assert not (screened & ~full).any() # The cascade never invents alerts
+    assert (screened & full).sum() >= 0.9 * full[60:].sum() # Sustained drift is still caught
+    assert sum(status["error"] is None for status in alerts) == stats["samples"] - stats["flagged"] # Screened days skip the autoencoder
+
+def test_windowed_detection():
+    print("\nTesting sliding-window drift detection...")
+    rows = np.random.default_rng(0).random((30, 4))
+    assert np.shares_memory(sliding_window_view(rows, 7, axis=0), rows)
+    assert np.allclose(window_means(rows, 7), [rows[i:i + 7].mean(axis=0) for i in range(24)])
+
+    torch.manual_seed(0)
+    np.random.seed(0)
+    sim = PatientDataSimulator("P001")
+    data = sim.inject_drift(sim.generate_healthy_baseline(), start_day=150, organ='retina', intensity=0.01)
+    client = FederatedClient("P001", data)
+    values = data[['glucose', 'gfr', 'retina_thickness', 'hrv']].to_numpy()
+    daily, _ = client.detect_drift_batch(values)
+    windowed, errors = client.detect_drift_windows(values, window=7)
+    assert len(windowed) == len(values) - 6
+
+    def sustained(flags, offset, run=5):
+        # First day >= 150 from which `run` consecutive days are flagged
+        runs = sliding_window_view(flags[150 - offset:].astype(int), run).sum(axis=1) == run
+        return int(np.argmax(runs)) if runs.any() else len(flags)
+    print(f"Sustained detection after {sustained(daily, 0)} days (daily) vs {sustained(windowed, 6)} days (7-day windows)")
+    assert sustained(windowed, 6) < sustained(daily, 0)
+
+    # The ring-buffer stream reproduces the batched window scores
+    stream = client.window_detector(7).stream()
+    streamed = [stream.update(row) for row in values]
+    assert all(error is None for _, error in streamed[:6])
+    assert np.allclose([error for _, error in streamed[6:]], errors, rtol=1e-4)
+    assert [drift for drift, _ in streamed[6:]] == windowed.tolist()
+
+def test_threshold_calibration():
+    print("\nTesting streaming quantile thresholds...")
+    errors = np.random.default_rng(0).lognormal(size=20000)
+    sketch = P2Quantile(0.977)
+    for error in errors:
+        sketch.add(error)
+    assert abs(sketch.value() / np.quantile(errors, 0.977) - 1) < 0.02
+    assert len(sketch.heights) == 5 # Constant memory
+
+    # Up to five values the quantile is exact, not the middle marker
+    small = P2Quantile(0.9)
+    for value in [1, 2, 3, 4, 5]:
+        small.add(value)
+    assert small.value() == np.quantile([1, 2, 3, 4, 5], 0.9)
+
+    calibrator = ThresholdCalibrator(quantile=0.9, min_samples=10)
+    assert calibrator.threshold("A", default=1.0) == 1.0
+    calibrator.seed("A", np.linspace(0, 1, 101))
+    calibrator.seed("B", np.linspace(0, 10, 101))
+    assert abs(calibrator.threshold("A") - 0.9) < 0.02 and abs(calibrator.threshold("B") - 9.0) < 0.2
+    assert not calibrator.observe("A", 50.0) # Clear drift never enters the sketch
+
+    torch.manual_seed(0)
+    np.random.seed(0)
+    client = FederatedClient("P001", PatientDataSimulator("P001").generate_healthy_baseline())
+    version = client.detector.version
+    client.enable_calibration(fine_tune_every=100, epochs=5)
+    for row in client.monitoring_data[:150]:
+        client.detect_drift(row)
+    client.fine_tuner.wait(timeout=30)
+    print(client.calibrator.stats())
+    assert client.fine_tuner.runs == 1
+    assert client.detector.version == version + 1 # Swapped in by the background run
+    assert client.calibrator.threshold("P001") is not None
+    drift, error = client.detect_drift(client.monitoring_data[0]) # Scores against the new model
+    assert isinstance(error, float)
+
+    # A federated update landing mid-run wins: the fine-tuned copy is discarded
+    tuner = client.fine_tuner
+    for row in client._normalize(client.monitoring_data[:100]):
+        tuner.rows.append(np.asarray(row, dtype=np.float32))
+    pulled = client.detector.get_weights()
+    original_run = tuner._run
+    def run_after_sync(data, model, version):
+        client.detector.update_weights(pulled) # e.g. FederatedClient.sync()
+        original_run(data, model, version)
+    tuner._run = run_after_sync
+    synced_version = client.detector.version + 1
+    assert tuner.start()
+    tuner.wait(timeout=30)
+    assert tuner.discarded == 1 and tuner.runs == 1
+    assert client.detector.version == synced_version
+
+    # Nominal traffic keeps the alert rate near 1 - quantile: the threshold must not ratchet down
+    torch.manual_seed(0)
+    client = FederatedClient("P002", PatientDataSimulator("P002").generate_healthy_baseline())
+    client.enable_calibration()
+    start = client.calibrator.threshold("P002")
+    nominal = client.train_data[np.random.default_rng(0).integers(0, len(client.train_data), 3000)]
+    alerts = np.array([client.detect_drift(row)[0] for row in nominal])
+    print(f"threshold {start:.3f} -> {client.calibrator.threshold('P002'):.3f}, alert rate {alerts[-1000:].mean():.3f}")
+    assert client.calibrator.threshold("P002") > 0.8 * start
+    assert alerts[-1000:].mean() < 3 * (1 - 0.977)
+    batch_drift, _ = client.detect_drift_batch(nominal[:100])
+    assert (batch_drift == (client.detect_drift_batch(nominal[:100])[1] > client.calibrator.threshold("P002"))).all()
+
+def test_risk_projection():
+    print("\nTesting Monte Carlo risk projection...")
+    torch.manual_seed(0)
+    graph = NumpyCausalGraph.from_torch(CausalOrganGraph())
+    history = np.tile([0.5, 0.1, 0.2, 0.1, 0.1], (180, 1))
+    history[90:, 1] = np.linspace(0.1, 0.8, 90)
+    x0, velocity, volatility = estimate_dynamics(history)
+    assert velocity[1] > 0 and abs(velocity[0]) < 1e-9 # Kidney trends up, glucose is flat
+
+    # No budget cap: the bands depend on the seed alone
+    result = RiskProjector(graph, scenarios=2048, budget_s=float("inf")).project(x0, velocity, volatility, seed=0)
+    assert result["scenarios"] == 2048
+    for organ, entry in result["organs"].items():
+        for horizon in HORIZONS:
+            band = entry["bands"][horizon]
+            assert 0.0 <= band["p5"] <= band["p50"] <= band["p95"] <= 1.0
+            assert entry[horizon] == band["p50"] # Plain numbers stay where the frontend reads them
+    assert RiskProjector(graph, scenarios=2048, budget_s=float("inf")).project(x0, velocity, volatility, seed=0)["organs"] == result["organs"]
+
+    # A budget caps the count up front (at least one chunk), and the same count every time
+    rushed = RiskProjector(graph, scenarios=100000, chunk=256, budget_s=0.0).project(x0, velocity, volatility, seed=0)
+    assert rushed["scenarios"] == 256
+    budgeted = RiskProjector(graph, scenarios=100000, chunk=256, budget_s=0.05)
+    first = budgeted.project(x0, velocity, volatility, seed=0)
+    assert first == dict(budgeted.project(x0, velocity, volatility, seed=0), elapsed_s=first["elapsed_s"])
+
+if __name__ == "__main__":
+    import tempfile, pathlib
+    test_numpy_backend_parity(pathlib.Path(tempfile.mkdtemp()))
+    test_numpy_backend_is_torch_free()
+    test_drift_cascade()
+    test_windowed_detection()
+    test_threshold_calibration()
+    test_risk_projection()
@@ -0,0 +1,162 @@
+import sys
+import os
+import numpy as np
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from diabetes_project.rag.ann_index import IVFIndex, benchmark_recall
+from diabetes_project.rag.rag_engine import MockVectorDB, MultimodalRAG
+from diabetes_project.rag.knowledge_store import reset_store_dir
+from diabetes_project.rag.embedder import HashingEmbedder
+
+def test_ivf_full_probe_matches_exact():
+    print("Testing IVFIndex exhaustive probe against brute force...")
+    rng = np.random.default_rng(1)
+    cases = rng.random((2000, 5))
+
+    exact_db = MockVectorDB()
+    ivf_db = MockVectorDB(index=IVFIndex(n_lists=16, min_train_size=256))
+    for i, vec in enumerate(cases):
+        exact_db.add(vec, {"case_id": i})
+        ivf_db.add(vec, {"case_id": i})
+
+    assert ivf_db.index.centroids is not None, "Index was never trained"
+    for q in rng.random((20, 5)):
+        expected = [meta["case_id"] for _, meta in exact_db.query(q, k=5)]
+        scores, ids = ivf_db.index.search(q, k=5, n_probe=16)
+        assert ids.tolist() == expected, "Exhaustive IVF search must equal the exact scan"
+
+def test_ivf_recall_benchmark():
+    print("\nRunning IVF recall benchmark...")
+    results = benchmark_recall(n_cases=5000, n_queries=50, n_lists=32, n_probes=(1, 8, 32))
+    for row in results:
+        print(row)
+    recalls = [row["recall_at_k"] for row in results]
+    assert recalls == sorted(recalls), "Recall should not drop when probing more cells"
+    assert recalls[-1] == 1.0, "Probing every cell should give perfect recall"
+
+def test_rag_with_ann_backend():
+    rag = MultimodalRAG(signal_index=IVFIndex(n_lists=4, min_train_size=4), store_dir=None)
+    context = rag.retrieve_context(np.array([0.8, 0.9, 0.1, 0.6, 0.1]))
+    assert context["similar_case"]["patient_id"] == "H001"
+
+def test_persistent_knowledge_base(tmp_path):
+    print("\nTesting memory-mapped knowledge base...")
+    store_dir = str(tmp_path / "knowledge")
+    rag = MultimodalRAG(store_dir=store_dir)
+    assert len(rag.signal_db) == 2 and len(rag.text_db) == 4
+
+    # A second council reuses the persisted files instead of re-seeding
+    rag2 = MultimodalRAG(store_dir=store_dir)
+    assert len(rag2.signal_db) == 2, "Knowledge base was seeded twice"
+
+    rag.add_cases([[0.1, 0.1, 0.1, 0.9, 0.9]], [{"patient_id": "H003", "outcome": "Neuropathy"}])
+    context = rag2.retrieve_context(np.array([0.1, 0.1, 0.1, 0.9, 0.9]))
+    assert context["similar_case"]["patient_id"] == "H003", "Appends must be visible to other readers"
+
+    in_memory = MultimodalRAG(store_dir=None)
+    assert np.allclose(np.array(in_memory.text_db.vectors), rag.text_db.vectors), "Seeded embeddings must be reproducible"
+    reset_store_dir(store_dir)
+
+    # Stores seed independently: a crash that lost the case base doesn't leave it empty
+    MultimodalRAG(store_dir=store_dir)
+    signals = os.path.join(store_dir, "signals")
+    for suffix in (".json", ".f32", ".meta.jsonl", ".idx"):
+        os.remove(signals + suffix)
+    rag = MultimodalRAG(store_dir=store_dir)
+    assert len(rag.signal_db) == 2 and len(rag.text_db) == 4
+
+    # A seeder that died mid-seed left rows but no header: its stale claim is taken over
+    os.remove(signals + ".json")
+    open(signals + ".seeding", "w").close()
+    os.utime(signals + ".seeding", (0, 0))
+    rag = MultimodalRAG(store_dir=store_dir)
+    assert len(rag.signal_db) == 2 and not os.path.exists(signals + ".seeding")
+    reset_store_dir(store_dir)
+
+    # A writer that loses the claim waits for the winner's seed rows instead of serving an empty store
+    import threading, time
+    from diabetes_project.rag.knowledge_store import KnowledgeStore
+    winner, loser = KnowledgeStore(store_dir, "cases", 5), KnowledgeStore(store_dir, "cases", 5)
+    claimed = threading.Event()
+    def slow_seed():
+        claimed.set()
+        time.sleep(0.3)
+        winner.append(np.ones((3, 5)), [{"i": i} for i in range(3)])
+    thread = threading.Thread(target=winner.ensure, args=(1, slow_seed))
+    thread.start()
+    claimed.wait()
+    assert loser.ensure(1, lambda: None) is False
+    assert len(loser) == 3 and loser.version() == 1
+    thread.join()
+    reset_store_dir(store_dir)
+
+def test_retrieval_cache():
+    print("\nTesting quantized retrieval cache...")
+    rag = MultimodalRAG(store_dir=None)
+    first = rag.retrieve_context(np.array([0.80, 0.90, 0.10, 0.60, 0.10]))
+    second = rag.retrieve_context(np.array([0.81, 0.89, 0.10, 0.60, 0.11]))
+    assert second == first
+    assert rag.cache.stats()["hits"] == 1 and rag.cache.stats()["misses"] == 1
+
+    # New knowledge invalidates cached answers
+    rag.add_cases([[0.8, 0.9, 0.1, 0.6, 0.1]], [{"patient_id": "H004", "outcome": "Exact match"}])
+    third = rag.retrieve_context(np.array([0.80, 0.90, 0.10, 0.60, 0.10]))
+    assert third["similar_case"]["patient_id"] in ("H001", "H004")
+    assert rag.cache.stats()["misses"] == 2, "Cache must be invalidated when signal_db grows"
+    print(rag.cache.stats())
+
+    # Callers get their own copy of a cached answer
+    third["similar_case"]["outcome"] = "edited"
+    assert rag.retrieve_context(np.array([0.80, 0.90, 0.10, 0.60, 0.10]))["similar_case"]["outcome"] != "edited"
+
+def test_shared_retrieval_cache(tmp_path):
+    print("\nTesting the retrieval cache shared per knowledge base...")
+    store_dir = str(tmp_path / "knowledge")
+    rag = MultimodalRAG(store_dir=store_dir)
+    assert MultimodalRAG(store_dir=store_dir).cache is rag.cache
+    # Different embedder or index settings answer differently: separate caches
+    assert MultimodalRAG(store_dir=store_dir, embedder=HashingEmbedder(dim=128, char_ngrams=(3,))).cache is not rag.cache
+    assert MultimodalRAG(store_dir=store_dir, signal_index=IVFIndex(n_lists=4)).cache is not rag.cache
+
+    # Rebuilding the store with the same row count still invalidates cached answers
+    drift = np.array([0.8, 0.9, 0.1, 0.6, 0.1])
+    assert rag.retrieve_context(drift)["similar_case"]["patient_id"] == "H001"
+    store = rag.signal_db.store
+    store.clear()
+    store.append(np.array([[0.8, 0.9, 0.1, 0.6, 0.1], [0.9, 0.2, 0.8, 0.1, 0.1]]),
+                 [{"patient_id": "R001", "outcome": "Rebuilt"}, {"patient_id": "R002", "outcome": "Rebuilt"}])
+    assert rag.retrieve_context(drift)["similar_case"]["patient_id"] == "R001"
+
+    # An ANN index over the store is rebuilt too, not left holding the old vectors
+    from diabetes_project.rag.knowledge_store import PersistentVectorDB
+    db = PersistentVectorDB(store, index=IVFIndex(n_lists=2, n_probe=2, min_train_size=2))
+    assert db.query(drift, k=1)[0][1]["patient_id"] == "R001"
+    store.clear()
+    store.append(np.array([[0.1, 0.1, 0.9, 0.1, 0.1]]), [{"patient_id": "N001", "outcome": "Smaller store"}])
+    results = db.query(drift, k=2)
+    assert [meta["patient_id"] for _, meta in results] == ["N001"]
+    reset_store_dir(store_dir)
+
+def test_deterministic_literature_search():
+    print("\nTesting hashed n-gram literature embeddings...")
+    embedder = HashingEmbedder(dim=128)
+    batch = embedder.embed_batch(["Retinopathy follows hyperglycemia", "Kidney dysfunction"])
+    assert np.allclose(batch[0], embedder.embed("Retinopathy follows hyperglycemia"))
+    assert np.isclose(np.linalg.norm(batch[1]), 1.0)
+
+    rag = MultimodalRAG(store_dir=None)
+    retina_drift = np.array([0.9, 0.2, 0.8, 0.1, 0.1])
+    titles = {rag.retrieve_context(retina_drift)["relevant_paper"]["title"] for _ in range(3)}
+    assert titles == {"Retinopathy Stages"}, f"Literature search should be deterministic, got {titles}"
+    nerve_drift = np.array([0.1, 0.1, 0.1, 0.1, 0.9])
+    assert rag.retrieve_context(nerve_drift)["relevant_paper"]["title"] == "Peripheral Neuropathy"
+
+if __name__ == "__main__":
+    import tempfile, pathlib
+    test_ivf_full_probe_matches_exact()
+    test_ivf_recall_benchmark()
+    test_rag_with_ann_backend()
+    test_retrieval_cache()
+    test_shared_retrieval_cache(pathlib.Path(tempfile.mkdtemp()))
+    test_deterministic_literature_search()